@@ -117,6 +117,7 @@ class TaskSummaryReportNewAdmin(admin.ModelAdmin):
             'fields': (
                 'total_attempt_failed',
                 'attempt_failed_errors',
+                'attempt_failed_error_counts',
                 'failed_attempt_error_logs',
             ),
         }),
@@ -127,6 +128,7 @@ class TaskSummaryReportNewAdmin(admin.ModelAdmin):
                 'total_storage_uploads',
                 'failed_to_download_file_count',
                 'failed_downloads_details',
+                'failed_downloads_counts',
                 'storage_upload_failed',
                 'task_completion_status',
                 'has_billing_exception',
@@ -139,10 +141,13 @@ class TaskSummaryReportNewAdmin(admin.ModelAdmin):
             'classes': ('collapse',),
             'fields': (
                 'login_exceptions_summary',
+                'login_exceptions_counts',
                 'login_exceptions_count',
                 'page_detection_exceptions_summary',
+                'page_detection_exceptions_counts',
                 'page_detection_exceptions_count',
                 'locate_element_exceptions_summary',
+                'locate_element_exceptions_counts',
                 'locate_element_exceptions_count',
             ),
         }),
@@ -168,12 +173,14 @@ class TaskSummaryReportNewAdmin(admin.ModelAdmin):
             'fields': (
                 'total_critical_events',
                 'critical_events_summary',
+                'critical_events_counts',
             ),
         }),
         ('Meta', {
             'fields': (
                 'updated_at',
                 'last_alerted_at',
+                'last_processed_report_sequence',
             ),
         }),
     )
@@ -194,6 +201,9 @@ class TaskSummaryReportNewAdmin(admin.ModelAdmin):
         'latest_report_start_datetime', 'latest_report_end_datetime',
         'latest_total_task_runtime', 'run_id_of_latest_report',
         'has_next_page_info', 'updated_at', 'last_alerted_at',
+        'last_processed_report_sequence',
+        'critical_events_counts', 'attempt_failed_error_counts', 'login_exceptions_counts',
+        'page_detection_exceptions_counts', 'locate_element_exceptions_counts', 'failed_downloads_counts',
 
         # ✅ New readonly scrape fields
         'total_users_scraped',
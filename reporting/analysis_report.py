@@ -1,6 +1,6 @@
 import json
 from datetime import timedelta
-from typing import Any, Dict, List, Set
+from typing import Any, Dict, Iterable, List, Optional, Set
 
 
 def seconds_to_hms(seconds: float) -> str:
@@ -38,16 +38,20 @@ def try_get(d: Dict[str, Any], key: str, default: Any = 0):
     return v if v is not None else default
 
 
+def init_page_load_totals() -> Dict[str, Any]:
+    return {
+        "start_attempts": 0,
+        "success_page_load": 0,
+        "total_page_load_time": 0.0,
+        "refresh_success": 0,
+        "refresh_failed": 0,
+        "load_failed": 0,
+    }
+
+
 def aggregate_page_loads_overall(agg: Dict[str, Any], page_load_details: Dict[str, Any]) -> None:
     for url, details in (page_load_details or {}).items():
-        url_agg = agg.setdefault(url, {
-            "start_attempts": 0,
-            "success_page_load": 0,
-            "total_page_load_time": 0.0,
-            "refresh_success": 0,
-            "refresh_failed": 0,
-            "load_failed": 0,
-        })
+        url_agg = agg.setdefault(url, init_page_load_totals())
         url_agg["start_attempts"] += try_get(details, "start_attempts", 0)
         url_agg["success_page_load"] += try_get(details, "success_page_load", 0)
         url_agg["total_page_load_time"] += safe_float(try_get(details, "total_page_load_time", 0.0))
@@ -90,8 +94,9 @@ def init_main_report() -> Dict[str, Any]:
     }
 
 
-def process_report(report: Dict[str, Any], main_report: Dict[str, Any], detailed_reports: List[Dict[str, Any]],
+def process_report(report: Dict[str, Any], main_report: Dict[str, Any], detailed_reports: Optional[List[Dict[str, Any]]],
                    aggregate_page_loads: Dict[str, Any], global_sets: Dict[str, Set[str]]) -> None:
+    """Folds one report into the totals; `detailed_reports` None skips its detail entry."""
     total_login_attempts = try_get(report, "total_login_attempts", 0)
     successful_logins = try_get(report, "successful_logins", 0)
     failed_logins = try_get(report, "failed_logins", 0)
@@ -122,6 +127,8 @@ def process_report(report: Dict[str, Any], main_report: Dict[str, Any], detailed
     page_load_details = report.get("page_load_details", {}) or {}
     aggregate_page_loads_overall(aggregate_page_loads, page_load_details)
 
+    if detailed_reports is None:
+        return
     detailed_entry = {
         "task": report.get("task_id"),
         "run_id": report.get("run_id"),
@@ -150,36 +157,92 @@ def process_report(report: Dict[str, Any], main_report: Dict[str, Any], detailed
     detailed_reports.append(detailed_entry)
 
 
-def compile_reports(reports: List[Dict[str, Any]]) -> Dict[str, Any]:
-    main_report = init_main_report()
-    detailed_reports: List[Dict[str, Any]] = []
-    aggregate_page_loads: Dict[str, Any] = {}
-    global_sets = {"critical_event_types": set(), "attempts_failed_reasons": set()}
+class ReportAccumulator:
+    """
+    Partial compile_reports() result that reports are folded into one at a time.
+
+    Accumulators over disjoint report ranges can be merged, so ranges can be
+    compiled separately (e.g. in other processes) and combined; merging them in
+    report order gives compile_reports()'s output, except that float totals may
+    differ in the last digits because they are added in a different order.
+
+    Detail entries are kept in `detailed_reports` by default. With
+    keep_details=False they are not built at all, and with a `detail_sink`
+    (anything with an append() method, such as a list or a writer) each entry
+    goes there instead of being kept, so memory does not grow with the number
+    of reports.
+    """
 
-    for rep in reports:
-        if isinstance(rep, dict):
-            process_report(rep, main_report, detailed_reports, aggregate_page_loads, global_sets)
+    def __init__(self, keep_details: bool = True, detail_sink=None):
+        self.main_report = init_main_report()
+        self.aggregate_page_loads: Dict[str, Any] = {}
+        self.global_sets = {"critical_event_types": set(), "attempts_failed_reasons": set()}
+        self.detailed_reports: List[Dict[str, Any]] = []
+        if detail_sink is not None:
+            self._details = detail_sink
+        else:
+            self._details = self.detailed_reports if keep_details else None
+
+    def add(self, report: Dict[str, Any]) -> None:
+        if isinstance(report, dict):
+            process_report(report, self.main_report, self._details, self.aggregate_page_loads, self.global_sets)
+
+    def merge(self, other: "ReportAccumulator") -> "ReportAccumulator":
+        """Folds in `other`, which covers reports after the ones in this accumulator."""
+        for key, value in other.main_report.items():
+            self.main_report[key] += value
+        for url, totals in other.aggregate_page_loads.items():
+            url_agg = self.aggregate_page_loads.setdefault(url, init_page_load_totals())
+            for key, value in totals.items():
+                url_agg[key] += value
+        for name, values in other.global_sets.items():
+            self.global_sets[name] |= values
+        if self._details is not None:
+            for entry in other.detailed_reports:
+                self._details.append(entry)
+        return self
+
+    def result(self) -> Dict[str, Any]:
+        """The compile_reports() structure for everything folded so far."""
+        main_report = dict(self.main_report)
+        main_report["total_login_time"] = seconds_to_hms(main_report["total_login_time_seconds"])
+        main_report["total_2fa_time"] = seconds_to_hms(main_report["total_2fa_time_seconds"])
+        main_report["final_logins"] = f"{main_report['final_logins_count']} out of {main_report['total_reports_count']}"
+        del main_report["final_logins_count"]
+
+        main_report["unique_critical_event_types"] = sorted(list(self.global_sets["critical_event_types"]))
+        main_report["unique_attempts_failed_reasons"] = sorted(list(self.global_sets["attempts_failed_reasons"]))
+
+        return {
+            "main_report": main_report,
+            "aggregate_page_loads": self.aggregate_page_loads,
+            "detailed_reports": self.detailed_reports
+        }
 
-    main_report["total_login_time"] = seconds_to_hms(main_report["total_login_time_seconds"])
-    main_report["total_2fa_time"] = seconds_to_hms(main_report["total_2fa_time_seconds"])
-    main_report["final_logins"] = f"{main_report['final_logins_count']} out of {main_report['total_reports_count']}"
-    del main_report["final_logins_count"]
 
-    main_report["unique_critical_event_types"] = sorted(list(global_sets["critical_event_types"]))
-    main_report["unique_attempts_failed_reasons"] = sorted(list(global_sets["attempts_failed_reasons"]))
+def accumulate_reports(reports: Iterable[Dict[str, Any]], keep_details: bool = True,
+                       detail_sink=None) -> ReportAccumulator:
+    """Folds any iterable of report dicts (e.g. a generator over the database) into a ReportAccumulator."""
+    accumulator = ReportAccumulator(keep_details=keep_details, detail_sink=detail_sink)
+    for rep in reports:
+        accumulator.add(rep)
+    return accumulator
 
-    return {
-        "main_report": main_report,
-        "aggregate_page_loads": aggregate_page_loads,
-        "detailed_reports": detailed_reports
-    }
+
+def compile_reports(reports: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Compiles main_report, aggregate_page_loads and detailed_reports. Use
+    accumulate_reports() to stream reports without keeping them, or to leave
+    out detailed_reports.
+    """
+    return accumulate_reports(reports).result()
 
 
-def generate_task_report_summary(reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+def generate_task_report_summary(reports: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
     """
     Public function to generate a compiled task report from a list of task report dicts.
 
-    :param reports: List of report dictionaries
+    :param reports: List (or any iterable) of report dictionaries
     :return: Final report with main_report, aggregate_page_loads, and detailed_reports
     """
     return compile_reports(reports)
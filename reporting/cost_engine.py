@@ -0,0 +1,101 @@
+# reporting_and_analytics/cost_engine.py
+
+import logging
+import time
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from .models import CostUnitConfig
+from .redis_utils import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Task and job cost from CostUnitConfig rates.
+#
+# A task costs sum(rate * counter) over the cost units that map to a summary
+# counter (COST_UNIT_SUMMARY_FIELDS), in Decimal and rounded to COST_QUANTUM.
+# Costs are computed from a summary's cumulative counters whenever it changes and
+# roll up into JobAnalysisReport.total_job_cost like the other job totals (see
+# job_rollup), so a task is always priced at the rates current when it last
+# changed; backfill_job_costs reprices existing tasks and jobs.
+#
+# Rates are loaded once per process. Saving or deleting a CostUnitConfig clears
+# them here and bumps a Redis generation counter that every other process checks
+# every few seconds (like the known-task cache); without Redis, rates are
+# reloaded at that interval instead.
+
+RATES_GENERATION_KEY = 'reporting:cost_rates:generation'
+GENERATION_CHECK_SECONDS = getattr(settings, 'COST_RATE_GENERATION_CHECK_SECONDS', 5)
+
+# CostUnitConfig.unit_name -> TaskSummaryReportNew counter it is charged on
+UNIT_SUMMARY_FIELDS = getattr(settings, 'COST_UNIT_SUMMARY_FIELDS', {
+    'per_user_scraped': 'total_users_scraped',
+    'per_file_downloaded': 'total_downloaded_files',
+    'per_storage_upload': 'total_storage_uploads',
+    'per_login_attempt': 'total_login_attempts',
+    'per_2fa_attempt': 'total_2fa_attempts',
+    'per_report': 'total_reports_considered',
+})
+
+COST_QUANTUM = Decimal('0.0001')
+
+
+class CostRateCache:
+    def __init__(self):
+        self._rates = None
+        self._generation = None
+        self._next_generation_check = 0.0
+
+    def _sync_with_shared(self) -> None:
+        now = time.monotonic()
+        if now < self._next_generation_check:
+            return
+        self._next_generation_check = now + GENERATION_CHECK_SECONDS
+        try:
+            generation = get_redis().get(RATES_GENERATION_KEY)
+        except RedisError as e:
+            logger.warning(f"Cost rate generation unavailable, reloading rates: {e}")
+            generation = object()  # never equal: reload
+        if generation != self._generation:
+            self._rates = None
+            self._generation = generation
+
+    def rates(self) -> dict:
+        """{unit_name: Decimal rate} of every CostUnitConfig."""
+        self._sync_with_shared()
+        rates = self._rates
+        if rates is None:
+            rates = dict(CostUnitConfig.objects.values_list('unit_name', 'cost_per_unit'))
+            self._rates = rates
+        return rates
+
+    def invalidate(self) -> None:
+        """Drops the rates here and, through the generation counter, in every other process."""
+        self._rates = None
+        try:
+            get_redis().incr(RATES_GENERATION_KEY)
+        except RedisError as e:
+            logger.warning(f"Could not invalidate shared cost rates: {e}")
+
+
+cost_rates = CostRateCache()
+
+
+def priced_fields(rates: dict) -> list:
+    """(summary field, rate) pairs of the units in `rates` that map to a summary counter."""
+    return [(UNIT_SUMMARY_FIELDS[unit], rate) for unit, rate in rates.items() if unit in UNIT_SUMMARY_FIELDS]
+
+
+def summary_cost(summary, fields) -> Decimal:
+    """Cost of one summary for priced_fields() `fields`."""
+    total = sum((rate * getattr(summary, field) for field, rate in fields), Decimal(0))
+    return total.quantize(COST_QUANTUM, rounding=ROUND_HALF_UP)
+
+
+def price_summaries(summaries) -> None:
+    """Sets task_cost on every summary at the current rates (the caller saves it)."""
+    fields = priced_fields(cost_rates.rates())
+    for summary in summaries:
+        summary.task_cost = summary_cost(summary, fields)
@@ -0,0 +1,93 @@
+# reporting_and_analytics/dedupe.py
+
+import datetime
+import hashlib
+import logging
+import uuid
+
+from django.conf import settings
+from django.utils import timezone
+from redis.exceptions import RedisError
+
+from .models import TaskReport
+from .redis_utils import get_redis
+from .report_reader import stream_chunks
+
+logger = logging.getLogger(__name__)
+
+# Fast-path duplicate filter for report ingestion.
+#
+# Every (run_id, task_uuid, data_point) that is known to be stored gets a small
+# Redis key with a TTL, so retried posts are rejected with one MGET per batch
+# instead of a SELECT per report. The filter is only an optimisation: a key that
+# has expired (or a Redis outage) just means the report reaches the database,
+# where the unique constraint on TaskReport stays the authoritative check.
+
+KEY_PREFIX = 'reporting:dedupe:'
+DEDUPE_TTL_SECONDS = getattr(settings, 'REPORT_DEDUPE_TTL_SECONDS', 3 * 24 * 60 * 60)
+WARM_HOURS = getattr(settings, 'REPORT_DEDUPE_WARM_HOURS', 24)
+_WARM_CHUNK_SIZE = 5000
+
+
+def dedupe_key(run_id, task_uuid, data_point) -> str:
+    """Redis key for one report identity; run_id and task_uuid may be UUIDs or strings."""
+    identity = f"{str(run_id).lower()}|{str(task_uuid).lower()}|{'' if data_point is None else '=' + str(data_point)}"
+    return KEY_PREFIX + hashlib.sha1(identity.encode()).hexdigest()
+
+
+def raw_report_dedupe_key(report_data):
+    """dedupe_key() for a raw bot report dict, or None if it has no valid identity."""
+    try:
+        run_id = uuid.UUID(str(report_data.get('run_id')))
+        task_uuid = uuid.UUID(str(report_data.get('task_uuid')))
+    except (AttributeError, ValueError):
+        return None
+    return dedupe_key(run_id, task_uuid, report_data.get('data_point'))
+
+
+def seen_keys(keys) -> set:
+    """Returns the subset of `keys` already recorded as stored reports."""
+    keys = list(keys)
+    if not keys:
+        return set()
+    try:
+        values = get_redis().mget(keys)
+    except RedisError as e:
+        logger.warning(f"Dedupe filter unavailable, falling back to the database: {e}")
+        return set()
+    return {key for key, value in zip(keys, values) if value is not None}
+
+
+def mark_seen(keys) -> None:
+    """Records reports that are now stored in TaskReport."""
+    keys = list(keys)
+    if not keys:
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for key in keys:
+            pipe.set(key, 1, ex=DEDUPE_TTL_SECONDS)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Could not update dedupe filter: {e}")
+
+
+def warm_from_recent_reports(hours: int = None) -> int:
+    """
+    Seeds the filter with the identities of reports ingested in the last `hours`
+    hours, so a freshly started Redis does not send every retry to the database.
+    """
+    hours = WARM_HOURS if hours is None else hours
+    since = timezone.now() - datetime.timedelta(hours=hours)
+    identities = (
+        TaskReport.objects.filter(created_at__gte=since)
+        .values_list('run_id', 'task_id', 'data_point')
+    )
+
+    warmed = 0
+    for chunk in stream_chunks(identities, chunk_size=_WARM_CHUNK_SIZE):
+        mark_seen([dedupe_key(run_id, task_id, data_point) for run_id, task_id, data_point in chunk])
+        warmed += len(chunk)
+
+    logger.info(f"Warmed report dedupe filter with {warmed} reports from the last {hours}h.")
+    return warmed
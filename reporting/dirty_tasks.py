@@ -0,0 +1,109 @@
+# reporting_and_analytics/dirty_tasks.py
+
+import logging
+import time
+import uuid
+
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from .redis_utils import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Tasks whose summaries need refreshing.
+#
+# Ingestion adds the UUID of every task that received reports to a Redis sorted
+# set, scored with the time it first became dirty (ZADD NX keeps the earliest
+# score). The periodic sweep pops members whose score is older than the debounce
+# window, so a task that keeps receiving reports is summarized once per window
+# instead of once per report batch.
+#
+# Popping moves a task into a second sorted set of leases, scored with the lease
+# expiry, in the same MULTI. The sweep ack()s a task once its summary job has
+# been dispatched, or release()s it if dispatching failed; a lease that is never
+# settled (the sweep died) expires and the task becomes due again. A task can at
+# worst be summarized twice, which the watermarked fold makes harmless.
+
+DIRTY_KEY = 'reporting:summary:dirty'
+LEASE_KEY = 'reporting:summary:dispatching'
+
+DEBOUNCE_SECONDS = getattr(settings, 'SUMMARY_DIRTY_DEBOUNCE_SECONDS', 30)
+MAX_DISPATCH = getattr(settings, 'SUMMARY_DIRTY_MAX_DISPATCH', 5000)
+LEASE_SECONDS = getattr(settings, 'SUMMARY_DIRTY_LEASE_SECONDS', 300)
+
+
+def mark_dirty(task_uuids) -> None:
+    """Records tasks that received new reports. Losing a mark only delays the summary."""
+    members = {str(task_uuid): time.time() for task_uuid in task_uuids}
+    if not members:
+        return
+    try:
+        get_redis().zadd(DIRTY_KEY, members, nx=True)
+    except RedisError as e:
+        logger.warning(f"Could not mark {len(members)} tasks dirty for summarization: {e}")
+
+
+def _make_due(redis, members) -> None:
+    """Moves leased `members` back into the dirty set, due at once."""
+    pipe = redis.pipeline(transaction=True)
+    pipe.zadd(DIRTY_KEY, dict.fromkeys(members, 0), lt=True)
+    pipe.zrem(LEASE_KEY, *members)
+    pipe.execute()
+
+
+def _requeue_expired_leases(redis, now: float) -> None:
+    expired = redis.zrangebyscore(LEASE_KEY, '-inf', now)
+    if expired:
+        logger.warning(f"Summary dispatch of {len(expired)} tasks was never confirmed; marking them dirty again.")
+        _make_due(redis, expired)
+
+
+def pop_due(debounce_seconds: float = None, limit: int = None) -> list:
+    """
+    Removes and returns the UUIDs of tasks that have been dirty for at least
+    `debounce_seconds`, oldest first, leasing them until ack() or release().
+    Concurrent sweeps never return the same task twice. Raises RedisError if
+    Redis is unreachable.
+    """
+    debounce_seconds = DEBOUNCE_SECONDS if debounce_seconds is None else debounce_seconds
+    limit = limit or MAX_DISPATCH
+    redis = get_redis()
+    now = time.time()
+    _requeue_expired_leases(redis, now)
+
+    due = redis.zrangebyscore(DIRTY_KEY, '-inf', now - debounce_seconds, start=0, num=limit)
+    if not due:
+        return []
+
+    pipe = redis.pipeline(transaction=True)
+    for member in due:
+        pipe.zrem(DIRTY_KEY, member)
+    pipe.zadd(LEASE_KEY, dict.fromkeys(due, now + LEASE_SECONDS))
+    removed = pipe.execute()[:-1]
+
+    return [uuid.UUID(member.decode()) for member, was_removed in zip(due, removed) if was_removed]
+
+
+def ack(task_uuids) -> None:
+    """Ends the lease of tasks whose summary job was dispatched."""
+    members = [str(task_uuid) for task_uuid in task_uuids]
+    if not members:
+        return
+    try:
+        get_redis().zrem(LEASE_KEY, *members)
+    except RedisError as e:
+        # The leases expire and the tasks are summarized once more.
+        logger.warning(f"Could not confirm summary dispatch of {len(members)} tasks: {e}")
+
+
+def release(task_uuids) -> None:
+    """Makes leased tasks due again at once (their summary job was not dispatched)."""
+    members = [str(task_uuid) for task_uuid in task_uuids]
+    if not members:
+        return
+    try:
+        _make_due(get_redis(), members)
+    except RedisError as e:
+        # The leases expire instead.
+        logger.warning(f"Could not release {len(members)} tasks for summarization: {e}")
@@ -0,0 +1,162 @@
+# reporting_and_analytics/fast_serializers.py
+
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+# Read path for list endpoints that skips per-row serializer work.
+#
+# Serializing a page through a ModelSerializer instantiates model objects, walks
+# every field's get_attribute() and to_representation() and builds an ordered
+# dict per row. A ValuesSerializer looks at the serializer's fields once and
+# turns them into a plan: the .values() columns to read and, per output field,
+# the column and a converter (None where DRF's to_representation does
+# not change a database value, e.g. ints, strings, booleans and JSON). Rows are
+# then read as dicts and converted without any per-row objects. ISO 8601
+# datetimes look up the current timezone once per page rather than per value.
+#
+# Supported fields are plain model fields, primary-key relations and nested
+# ModelSerializers of forward relations. SerializerMethodFields are declared on
+# the serializer in `values_sources` as {name: (column, converter)}; anything
+# else raises ImproperlyConfigured when the plan is built. The parity tests in
+# tests.py check the output against the serializer's own.
+
+# DRF fields whose to_representation() returns database values unchanged
+_IDENTITY_FIELDS = (
+    serializers.IntegerField, serializers.FloatField, serializers.CharField,
+    serializers.BooleanField, serializers.JSONField, PrimaryKeyRelatedField,
+)
+
+
+class _DateTimeConverter:
+    """DateTimeField.to_representation() for ISO 8601 output, bound to a timezone per page."""
+
+    def __init__(self, field):
+        self.fallback = field.to_representation
+
+    def bind(self, tz):
+        fallback = self.fallback
+
+        def convert(value):
+            if tz is None or value.tzinfo is None:
+                return fallback(value)
+            text = value.astimezone(tz).isoformat()
+            return text[:-6] + 'Z' if text.endswith('+00:00') else text
+        return convert
+
+
+def _converter(field):
+    kind = type(field)
+    if kind in _IDENTITY_FIELDS:
+        return None
+    if kind is serializers.UUIDField and field.uuid_format == 'hex_verbose':
+        return str
+    if (kind is serializers.DateTimeField and not hasattr(field, 'timezone')
+            and str(getattr(field, 'format', api_settings.DATETIME_FORMAT)).lower() == ISO_8601):
+        return _DateTimeConverter(field)
+    return field.to_representation
+
+
+class ValuesSerializer:
+    """Precomputed .values() read path for a ModelSerializer class; see the module comment."""
+
+    def __init__(self, serializer_class, fields=None):
+        self.serializer_class = serializer_class
+        self.columns = []
+        self.plan = self._build_plan(serializer_class(), '', fields)
+
+    def _column(self, name: str) -> str:
+        if name not in self.columns:
+            self.columns.append(name)
+        return name
+
+    def _build_plan(self, serializer, prefix: str, selected=None) -> list:
+        model = serializer.Meta.model
+        declared = getattr(serializer, 'values_sources', {})
+        plan = []
+        for name, field in serializer.fields.items():
+            if field.write_only or (selected is not None and name not in selected):
+                continue
+            if name in declared:
+                column, converter = declared[name]
+                plan.append((name, self._column(prefix + column), converter, None))
+            elif isinstance(field, serializers.ModelSerializer):
+                relation = field.source
+                nested = self._build_plan(field, f'{prefix}{relation}__')
+                # A missing related row (NULL foreign key) renders as None.
+                pk_column = self._column(f'{prefix}{relation}__{field.Meta.model._meta.pk.attname}')
+                plan.append((name, pk_column, None, nested))
+            elif field.source == '*' or '.' in field.source:
+                raise ImproperlyConfigured(
+                    f"{type(serializer).__name__}.{name} cannot be read from .values(); declare it in values_sources."
+                )
+            else:
+                model._meta.get_field(field.source)  # FieldDoesNotExist for properties
+                plan.append((name, self._column(prefix + field.source), _converter(field), None))
+        return plan
+
+    def values(self, queryset, extra_columns=()):
+        """`queryset` as .values() rows with the plan's columns plus `extra_columns` (e.g. pagination keys)."""
+        return queryset.values(*self.columns, *(column for column in extra_columns if column not in self.columns))
+
+    def _bind(self, plan, tz) -> list:
+        return [
+            (
+                name, column,
+                converter.bind(tz) if isinstance(converter, _DateTimeConverter) else converter,
+                None if nested is None else self._bind(nested, tz),
+            )
+            for name, column, converter, nested in plan
+        ]
+
+    def _represent(self, plan, row) -> dict:
+        data = {}
+        for name, column, converter, nested in plan:
+            value = row[column]
+            if value is None:
+                data[name] = None
+            elif nested is not None:
+                data[name] = self._represent(nested, row)
+            else:
+                data[name] = value if converter is None else converter(value)
+        return data
+
+    def to_representation(self, rows) -> list:
+        """Output of serializer_class(many=True).data for .values() `rows` (dicts from values())."""
+        plan = self._bind(self.plan, timezone.get_current_timezone() if settings.USE_TZ else None)
+        return [self._represent(plan, row) for row in rows]
+
+
+@lru_cache(maxsize=64)
+def values_serializer_for(serializer_class, fields=None) -> ValuesSerializer:
+    """Cached ValuesSerializer of `serializer_class` restricted to the `fields` tuple (None: all)."""
+    return ValuesSerializer(serializer_class, fields)
+
+
+class ValuesListMixin:
+    """
+    ListAPIView mixin rendering GET lists through a ValuesSerializer instead of
+    one serializer instance per row. Works with SparseFieldsMixin selections and
+    with KeysetPagination, whose key columns are read along with the plan's.
+    """
+
+    def list(self, request, *args, **kwargs):
+        get_selected_fields = getattr(self, 'get_selected_fields', None)
+        selected = get_selected_fields() if get_selected_fields is not None else None
+        values_serializer = values_serializer_for(self.get_serializer_class(), tuple(selected) if selected is not None else None)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        key_columns = getattr(self.paginator, 'key_columns', None)
+        extra_columns = key_columns(queryset, request, self) if key_columns is not None else ()
+        rows = values_serializer.values(queryset, extra_columns)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(values_serializer.to_representation(page))
+        return Response(values_serializer.to_representation(rows))
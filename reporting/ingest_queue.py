@@ -0,0 +1,188 @@
+# reporting_and_analytics/ingest_queue.py
+
+import datetime
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+
+from django.conf import settings
+from redis.exceptions import ResponseError
+
+from .ingestion import bulk_ingest_reports, RESULT_CREATED, RESULT_DUPLICATE, RESULT_ERROR
+from .redis_utils import get_redis
+
+logger = logging.getLogger(__name__)
+
+STREAM_KEY = 'reporting:ingest:reports'
+CONSUMER_GROUP = 'report-ingest'
+BATCH_KEY_PREFIX = 'reporting:ingest:batch:'
+
+# How long batch progress stays queryable after the last update.
+BATCH_STATUS_TTL_SECONDS = getattr(settings, 'REPORT_INGEST_BATCH_TTL_SECONDS', 24 * 60 * 60)
+# Stream entries read (and bulk inserted) per round by the consumer.
+DRAIN_BATCH_SIZE = getattr(settings, 'REPORT_INGEST_DRAIN_BATCH_SIZE', 2000)
+# Entries left unacknowledged this long by a dead consumer are claimed by another one.
+CLAIM_IDLE_MS = getattr(settings, 'REPORT_INGEST_CLAIM_IDLE_MS', 5 * 60 * 1000)
+
+BATCH_QUEUED = 'queued'
+BATCH_PROCESSING = 'processing'
+BATCH_COMPLETED = 'completed'
+
+_COUNT_FIELDS = {RESULT_CREATED: 'created', RESULT_DUPLICATE: 'duplicates', RESULT_ERROR: 'errors'}
+
+
+def _batch_key(batch_id: str) -> str:
+    return f"{BATCH_KEY_PREFIX}{batch_id}"
+
+
+def enqueue_reports(reports: list) -> str:
+    """
+    Appends raw reports to the ingestion stream and returns the new batch id.
+    Progress for the batch is tracked in a Redis hash (see get_batch_status()).
+    """
+    batch_id = str(uuid.uuid4())
+    batch_key = _batch_key(batch_id)
+    redis = get_redis()
+
+    pipe = redis.pipeline(transaction=False)
+    pipe.hset(batch_key, mapping={
+        'total': len(reports),
+        'processed': 0,
+        'created': 0,
+        'duplicates': 0,
+        'errors': 0,
+        'queued_at': datetime.datetime.now(tz=datetime.timezone.utc).isoformat(),
+    })
+    pipe.expire(batch_key, BATCH_STATUS_TTL_SECONDS)
+    for report in reports:
+        pipe.xadd(STREAM_KEY, {'batch_id': batch_id, 'report': json.dumps(report)})
+    pipe.execute()
+
+    logger.info(f"Queued {len(reports)} reports for async ingestion in batch {batch_id}.")
+    return batch_id
+
+
+def get_batch_status(batch_id: str):
+    """Returns the progress dict of a queued batch, or None if it is unknown or expired."""
+    raw = get_redis().hgetall(_batch_key(batch_id))
+    if not raw:
+        return None
+
+    values = {key.decode(): value.decode() for key, value in raw.items()}
+    batch = {
+        'batch_id': batch_id,
+        'total': int(values.get('total', 0)),
+        'processed': int(values.get('processed', 0)),
+        'created': int(values.get('created', 0)),
+        'duplicates': int(values.get('duplicates', 0)),
+        'errors': int(values.get('errors', 0)),
+        'queued_at': values.get('queued_at'),
+    }
+    if batch['processed'] >= batch['total']:
+        batch['status'] = BATCH_COMPLETED
+    elif batch['processed']:
+        batch['status'] = BATCH_PROCESSING
+    else:
+        batch['status'] = BATCH_QUEUED
+    return batch
+
+
+def _ensure_consumer_group(redis):
+    try:
+        redis.xgroup_create(STREAM_KEY, CONSUMER_GROUP, id='0', mkstream=True)
+    except ResponseError as e:
+        if 'BUSYGROUP' not in str(e):
+            raise
+
+
+def _ingest_with_isolation(reports: list) -> list:
+    """
+    bulk_ingest_reports() for stream entries. If the set-based insert fails as a
+    whole, the reports are retried one at a time so a single bad row cannot block
+    the stream forever.
+    """
+    try:
+        return bulk_ingest_reports(reports)
+    except Exception as e:
+        logger.warning(f"Bulk insert of {len(reports)} queued reports failed ({e}); retrying individually.")
+
+    results = []
+    for index, report in enumerate(reports):
+        try:
+            result = bulk_ingest_reports([report])[0]
+        except Exception as e:
+            logger.exception(f"Failed to ingest queued report: {e}")
+            result = {"status": RESULT_ERROR, "error": str(e)}
+        result["index"] = index
+        results.append(result)
+    return results
+
+
+def _process_entries(redis, entries) -> int:
+    if not entries:
+        return 0
+
+    entry_ids, batch_ids, reports = [], [], []
+    for entry_id, fields in entries:
+        entry_ids.append(entry_id)
+        batch_ids.append(fields.get(b'batch_id', b'').decode())
+        try:
+            reports.append(json.loads(fields[b'report']))
+        except (KeyError, ValueError):
+            reports.append(None)  # rejected by build_task_report() as an error
+
+    results = _ingest_with_isolation(reports)
+
+    tallies = {}
+    for batch_id, result in zip(batch_ids, results):
+        tally = tallies.setdefault(batch_id, {RESULT_CREATED: 0, RESULT_DUPLICATE: 0, RESULT_ERROR: 0})
+        tally[result["status"]] += 1
+
+    pipe = redis.pipeline(transaction=False)
+    for batch_id, tally in tallies.items():
+        batch_key = _batch_key(batch_id)
+        pipe.hincrby(batch_key, 'processed', sum(tally.values()))
+        for result_status, count in tally.items():
+            if count:
+                pipe.hincrby(batch_key, _COUNT_FIELDS[result_status], count)
+        pipe.expire(batch_key, BATCH_STATUS_TTL_SECONDS)
+    pipe.xack(STREAM_KEY, CONSUMER_GROUP, *entry_ids)
+    pipe.xdel(STREAM_KEY, *entry_ids)
+    pipe.execute()
+
+    return len(entry_ids)
+
+
+def drain_stream(max_seconds: float = 50.0, count: int = None) -> int:
+    """
+    Consumes the ingestion stream in batches of `count` entries until it is empty
+    or `max_seconds` have passed. Several consumers can run at once; the consumer
+    group hands each of them different entries. Returns the number of entries processed.
+    """
+    count = count or DRAIN_BATCH_SIZE
+    redis = get_redis()
+    _ensure_consumer_group(redis)
+    consumer = f"{socket.gethostname()}-{os.getpid()}"
+
+    processed = 0
+    deadline = time.monotonic() + max_seconds
+
+    # First pick up entries a crashed consumer read but never acknowledged.
+    _, claimed, *_ = redis.xautoclaim(STREAM_KEY, CONSUMER_GROUP, consumer, CLAIM_IDLE_MS, start_id='0-0', count=count)
+    processed += _process_entries(redis, [entry for entry in claimed if entry[1]])
+
+    while time.monotonic() < deadline:
+        response = redis.xreadgroup(CONSUMER_GROUP, consumer, {STREAM_KEY: '>'}, count=count)
+        if not response:
+            break
+        _, entries = response[0]
+        if not entries:
+            break
+        processed += _process_entries(redis, entries)
+
+    if processed:
+        logger.info(f"Drained {processed} reports from the ingestion stream.")
+    return processed
@@ -0,0 +1,312 @@
+# reporting_and_analytics/ingestion.py
+
+import datetime
+import json
+import logging
+import uuid
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .dedupe import dedupe_key, mark_seen, seen_keys
+from .dirty_tasks import mark_dirty
+from .metrics import build_report_metrics
+from .models import Task, TaskReport, TaskReportMetrics
+from .task_cache import known_tasks
+
+logger = logging.getLogger(__name__)
+
+# Per-item statuses returned by bulk_ingest_reports()
+RESULT_CREATED = 'created'
+RESULT_DUPLICATE = 'duplicate'
+RESULT_ERROR = 'error'
+
+# Rows per INSERT statement; keeps each statement well under the Postgres bind-parameter limit.
+BULK_INSERT_BATCH_SIZE = getattr(settings, 'REPORT_BULK_INSERT_BATCH_SIZE', 1000)
+
+_CHAR_FIELD_MAX_LENGTH = 50  # service / end_point / data_point
+
+
+def ms_to_datetime(value):
+    """Converts a Unix timestamp in milliseconds to an aware UTC datetime, or None."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.datetime.fromtimestamp(value / 1000, tz=datetime.timezone.utc)
+    return None
+
+
+def default_task_fields(task_uuid: uuid.UUID) -> dict:
+    """Placeholder values for a Task that is first seen through one of its reports."""
+    return {
+        "name": f"AutoCreated-{task_uuid.hex[:8]}",
+        "task_type": "unknown",
+        "interact": False,
+    }
+
+
+def _parse_uuid(value, field_name):
+    if isinstance(value, uuid.UUID):
+        return value
+    if isinstance(value, str):
+        try:
+            return uuid.UUID(value)
+        except ValueError:
+            pass
+    raise ValueError(f"Missing or invalid '{field_name}'.")
+
+
+def _parse_label(report_data, field_name):
+    value = report_data.get(field_name)
+    if value is None:
+        return None
+    value = str(value)
+    if len(value) > _CHAR_FIELD_MAX_LENGTH:
+        raise ValueError(f"'{field_name}' is longer than {_CHAR_FIELD_MAX_LENGTH} characters.")
+    return value
+
+
+def build_task_report(report_data) -> TaskReport:
+    """
+    Validates one raw bot report and returns an unsaved TaskReport for it.
+    Raises ValueError for items that can never be stored, so a bulk insert
+    is not aborted by a single malformed row.
+    """
+    if not isinstance(report_data, dict):
+        raise ValueError("Report must be a JSON object.")
+
+    return TaskReport(
+        task_id=_parse_uuid(report_data.get('task_uuid'), 'task_uuid'),
+        run_id=_parse_uuid(report_data.get('run_id'), 'run_id'),
+        service=_parse_label(report_data, 'service'),
+        end_point=_parse_label(report_data, 'end_point'),
+        data_point=_parse_label(report_data, 'data_point'),
+        report_start_datetime=ms_to_datetime(report_data.get('report_start_datetime')),
+        report_end_datetime=ms_to_datetime(report_data.get('report_end_datetime')),
+        full_report=report_data,
+    )
+
+
+def report_key(report: TaskReport) -> tuple:
+    """The ('run_id', 'task', 'data_point') identity enforced by TaskReport's unique constraints."""
+    return (report.run_id, report.task_id, report.data_point)
+
+
+def stored_report_keys(keys) -> set:
+    """
+    The report_key() identities among `keys` that exist in TaskReport, looked up
+    by the unique key. A row that failed to insert is only a duplicate if its
+    identity is found here; any other failure (a missing Task, a NOT NULL
+    violation) must not be recorded as stored.
+    """
+    keys = set(keys)
+    run_ids = list({run_id for run_id, _, _ in keys})
+    found = set()
+    for start in range(0, len(run_ids), BULK_INSERT_BATCH_SIZE):
+        rows = TaskReport.objects.filter(run_id__in=run_ids[start:start + BULK_INSERT_BATCH_SIZE])
+        found.update(keys.intersection(rows.values_list('run_id', 'task_id', 'data_point')))
+    return found
+
+
+def ensure_tasks(task_uuids, use_cache: bool = True) -> None:
+    """
+    Makes sure a Task row exists for every given UUID. UUIDs found in the
+    known-task cache are skipped; the rest are inserted in a single statement.
+    Call inside the transaction that writes the reports.
+    """
+    task_uuids = set(task_uuids)
+    unknown = known_tasks.filter_unknown(task_uuids) if use_cache else task_uuids
+    if not unknown:
+        return
+    Task.objects.bulk_create(
+        [Task(uuid=task_uuid, **default_task_fields(task_uuid)) for task_uuid in unknown],
+        ignore_conflicts=True,
+    )
+    logger.debug(f"Inserted up to {len(unknown)} new Tasks.")
+    transaction.on_commit(lambda: known_tasks.remember(unknown))
+
+
+def _insert_reports(new_reports: list, use_task_cache: bool = True) -> set:
+    """
+    Inserts reports (and their TaskReportMetrics) in one transaction and returns
+    the ids of the rows that were actually inserted.
+    """
+    with transaction.atomic():
+        ensure_tasks({report.task_id for report in new_reports}, use_cache=use_task_cache)
+        TaskReport.objects.bulk_create(new_reports, batch_size=BULK_INSERT_BATCH_SIZE, ignore_conflicts=True)
+
+        # With ignore_conflicts the database does not say which rows it skipped; the
+        # ids are generated client-side, so whichever of them exist now were inserted by us.
+        inserted_ids = set()
+        for start in range(0, len(new_reports), BULK_INSERT_BATCH_SIZE):
+            chunk_ids = [report.id for report in new_reports[start:start + BULK_INSERT_BATCH_SIZE]]
+            inserted_ids.update(TaskReport.objects.filter(id__in=chunk_ids).values_list('id', flat=True))
+
+        TaskReportMetrics.objects.bulk_create(
+            [build_report_metrics(report) for report in new_reports if report.id in inserted_ids],
+            batch_size=BULK_INSERT_BATCH_SIZE,
+        )
+    return inserted_ids
+
+
+def bulk_ingest_reports(reports: list) -> list:
+    """
+    Set-based ingestion of a batch of raw bot reports.
+
+    Reports already recorded in the Redis dedupe filter are skipped without a
+    query. All referenced Tasks are upserted in one statement and the remaining
+    reports are inserted with ``bulk_create(ignore_conflicts=True)``, so the unique
+    constraints on ('run_id', 'task', 'data_point') and, for reports without a
+    data_point, on ('run_id', 'task') decide what is a duplicate: a skipped row
+    counts as one only if its identity is then found in TaskReport.
+
+    Returns one result dict per input item, in input order:
+    ``{"index": i, "status": "created" | "duplicate" | "error", ...}``.
+    """
+    results = [None] * len(reports)
+    pending = []  # (index, TaskReport) pairs to insert
+    batch_keys = set()
+
+    for index, report_data in enumerate(reports):
+        try:
+            report = build_task_report(report_data)
+        except ValueError as e:
+            results[index] = {"index": index, "status": RESULT_ERROR, "error": str(e)}
+            continue
+
+        key = report_key(report)
+        if key in batch_keys:
+            results[index] = {"index": index, "status": RESULT_DUPLICATE}
+            continue
+        batch_keys.add(key)
+        pending.append((index, report))
+
+    already_stored = seen_keys(dedupe_key(*report_key(report)) for _, report in pending)
+    if already_stored:
+        for index, report in pending:
+            if dedupe_key(*report_key(report)) in already_stored:
+                results[index] = {"index": index, "status": RESULT_DUPLICATE}
+        pending = [(index, report) for index, report in pending if results[index] is None]
+
+    if not pending:
+        return results
+
+    new_reports = [report for _, report in pending]
+    try:
+        inserted_ids = _insert_reports(new_reports)
+    except IntegrityError:
+        # ON CONFLICT DO NOTHING does not cover foreign keys: a cached task was
+        # deleted after it was cached. Re-check every task against the database once.
+        logger.warning("Known-task cache was stale; retrying batch without it.")
+        known_tasks.clear_local()
+        inserted_ids = _insert_reports(new_reports, use_task_cache=False)
+
+    confirmed = stored_report_keys(report_key(report) for report in new_reports if report.id not in inserted_ids)
+    for index, report in pending:
+        if report.id in inserted_ids:
+            results[index] = {"index": index, "status": RESULT_CREATED, "report_id": str(report.id)}
+        elif report_key(report) in confirmed:
+            results[index] = {"index": index, "status": RESULT_DUPLICATE}
+        else:
+            results[index] = {"index": index, "status": RESULT_ERROR, "error": "Report could not be stored."}
+
+    # Only identities that are in TaskReport now: a failed row must stay retryable.
+    mark_seen(
+        dedupe_key(*report_key(report)) for report in new_reports
+        if report.id in inserted_ids or report_key(report) in confirmed
+    )
+    dirty_tasks = {report.task_id for report in new_reports if report.id in inserted_ids}
+    transaction.on_commit(lambda: mark_dirty(dirty_tasks))
+
+    failed = len(pending) - len(inserted_ids) - len(confirmed)
+    if failed:
+        logger.warning(f"{failed} reports were neither inserted nor found in TaskReport.")
+    logger.info(
+        f"Bulk ingested {len(inserted_ids)} of {len(reports)} reports "
+        f"({len(confirmed)} duplicates)."
+    )
+    return results
+
+
+def count_results(results: list) -> dict:
+    """Tallies bulk_ingest_reports() results by status."""
+    counts = {RESULT_CREATED: 0, RESULT_DUPLICATE: 0, RESULT_ERROR: 0}
+    for result in results:
+        counts[result["status"]] += 1
+    return counts
+
+
+# --- Streaming (NDJSON) ingestion ---
+
+# Reports buffered before each bulk insert when reading a stream.
+STREAM_CHUNK_SIZE = getattr(settings, 'REPORT_INGEST_CHUNK_SIZE', 500)
+# Longest single NDJSON line (one report) accepted from a stream.
+STREAM_MAX_LINE_BYTES = getattr(settings, 'REPORT_NDJSON_MAX_LINE_BYTES', 10 * 1024 * 1024)
+# Only the first errors are echoed back so the response stays small for huge batches.
+STREAM_MAX_ERROR_DETAILS = 100
+
+
+def iter_ndjson(stream, max_line_bytes: int = None):
+    """
+    Yields ``(line_number, report_or_None, error_or_None)`` for every non-blank
+    line of a binary NDJSON stream, reading one line at a time.
+    """
+    max_line_bytes = max_line_bytes or STREAM_MAX_LINE_BYTES
+    line_number = 0
+    while True:
+        line = stream.readline(max_line_bytes + 1)
+        if not line:
+            return
+        line_number += 1
+
+        if len(line) > max_line_bytes and not line.endswith(b'\n'):
+            # Drain the rest of the oversized line without keeping it.
+            while line and not line.endswith(b'\n'):
+                line = stream.readline(max_line_bytes)
+            yield line_number, None, f"Line exceeds {max_line_bytes} bytes."
+            continue
+
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_number, json.loads(line), None
+        except ValueError as e:
+            yield line_number, None, f"Invalid JSON: {e}"
+
+
+def ingest_report_stream(stream, chunk_size: int = None) -> dict:
+    """
+    Reads NDJSON reports from ``stream`` and writes them through
+    bulk_ingest_reports() in fixed-size chunks, so memory use is bounded by
+    the chunk size rather than by the size of the upload.
+    """
+    chunk_size = chunk_size or STREAM_CHUNK_SIZE
+    counts = {RESULT_CREATED: 0, RESULT_DUPLICATE: 0, RESULT_ERROR: 0}
+    error_details = []
+    chunk, chunk_lines = [], []
+
+    def record_error(line_number, error):
+        counts[RESULT_ERROR] += 1
+        if len(error_details) < STREAM_MAX_ERROR_DETAILS:
+            error_details.append({"line": line_number, "error": error})
+
+    def flush():
+        for result in bulk_ingest_reports(chunk):
+            if result["status"] == RESULT_ERROR:
+                record_error(chunk_lines[result["index"]], result["error"])
+            else:
+                counts[result["status"]] += 1
+        chunk.clear()
+        chunk_lines.clear()
+
+    for line_number, report_data, error in iter_ndjson(stream):
+        if error:
+            record_error(line_number, error)
+            continue
+        chunk.append(report_data)
+        chunk_lines.append(line_number)
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+
+    return {"counts": counts, "error_details": error_details}
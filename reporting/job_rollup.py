@@ -0,0 +1,184 @@
+# reporting_and_analytics/job_rollup.py
+
+import logging
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .cost_engine import price_summaries
+from .models import JobAnalysisReport, Task, TaskSummaryReportNew
+from .report_reader import stream_chunks
+from .summary_cache import publish_versions
+
+logger = logging.getLogger(__name__)
+
+# Incremental JobAnalysisReport totals.
+#
+# Every task summary stores in `job_contribution` what it last added to its job's
+# JobAnalysisReport. When a summary changes, the difference between its new
+# contribution and the stored one is applied to the job row, so updating a job
+# costs the same whether it has ten tasks or ten thousand. A task that moved to
+# another job is subtracted from the old job and added to the new one, and a
+# deleted summary subtracts its contribution (see signals.py).
+#
+# Contributions are applied in the transaction that writes the summaries, so the
+# stored contribution and the job totals cannot drift apart; the
+# rebuild_job_rollups command recomputes everything from the summaries if they
+# ever do (e.g. after editing rows by hand).
+
+SUCCESS_STATUSES = {status.lower() for status in getattr(settings, 'JOB_ROLLUP_SUCCESS_STATUSES', ('completed', 'success'))}
+
+# JobAnalysisReport counters maintained from task summaries
+COUNTER_FIELDS = ('total_tasks_in_job', 'tasks_completed_successfully', 'total_users_scraped', 'total_requests_failed')
+# Decimal totals; contributions hold them as strings
+DECIMAL_FIELDS = ('total_job_cost',)
+
+_JOB_FIELDS = COUNTER_FIELDS + DECIMAL_FIELDS + ('billing_issue_tasks', 'has_any_billing_issue', 'updated_at')
+
+
+def task_contribution(summary: TaskSummaryReportNew, job_uuid) -> dict:
+    """What one task summary adds to the JobAnalysisReport of `job_uuid`."""
+    if job_uuid is None:
+        return {}
+    return {
+        'job_uuid': str(job_uuid),
+        'total_tasks_in_job': 1,
+        'tasks_completed_successfully': int((summary.latest_task_status or '').lower() in SUCCESS_STATUSES),
+        'total_users_scraped': summary.total_users_scraped,
+        'total_requests_failed': summary.failed_to_download_file_count + summary.total_attempt_failed,
+        'billing_issue': bool(summary.has_billing_exception),
+        'total_job_cost': str(summary.task_cost),
+    }
+
+
+def _add_delta(deltas: dict, task_id, contribution: dict, sign: int) -> None:
+    job_delta = deltas.setdefault(contribution['job_uuid'], {
+        'counters': dict(dict.fromkeys(COUNTER_FIELDS, 0), **dict.fromkeys(DECIMAL_FIELDS, Decimal(0))),
+        'billing': {},
+    })
+    for field in COUNTER_FIELDS:
+        job_delta['counters'][field] += sign * contribution[field]
+    for field in DECIMAL_FIELDS:
+        # Contributions stored before a field existed count as 0.
+        job_delta['counters'][field] += sign * Decimal(contribution.get(field, 0))
+    if contribution['billing_issue']:
+        job_delta['billing'][str(task_id)] = sign > 0
+
+
+def _apply_deltas(deltas: dict, now) -> None:
+    """Applies {job_uuid: {'counters': {field: delta}, 'billing': {task: present}}} to the job rows."""
+    deltas = {
+        job_uuid: delta for job_uuid, delta in deltas.items()
+        if delta['billing'] or any(delta['counters'].values())
+    }
+    if not deltas:
+        return
+    JobAnalysisReport.objects.bulk_create(
+        [JobAnalysisReport(job_uuid=job_uuid) for job_uuid in deltas], ignore_conflicts=True,
+    )
+    jobs = list(JobAnalysisReport.objects.select_for_update().filter(job_uuid__in=list(deltas)).order_by('pk'))
+    for job in jobs:
+        delta = deltas[str(job.job_uuid)]
+        for field, value in delta['counters'].items():
+            setattr(job, field, getattr(job, field) + value)
+        billing_tasks = set(job.billing_issue_tasks or [])
+        for task_id, present in delta['billing'].items():
+            if present:
+                billing_tasks.add(task_id)
+            else:
+                billing_tasks.discard(task_id)
+        job.billing_issue_tasks = sorted(billing_tasks)
+        job.has_any_billing_issue = bool(billing_tasks)
+        # bulk_update() does not apply auto_now.
+        job.updated_at = now
+    JobAnalysisReport.objects.bulk_update(jobs, _JOB_FIELDS)
+
+
+def apply_job_deltas(summaries, now=None) -> list:
+    """
+    Prices each summary (task_cost, see cost_engine), applies the change in its
+    contribution to its job and stores the new contribution on the summary. The
+    caller saves 'task_cost' and 'job_contribution' in the same transaction.
+    Returns the summaries whose contribution or cost changed.
+    """
+    summaries = list(summaries)
+    if not summaries:
+        return []
+    previous_costs = [summary.task_cost for summary in summaries]
+    price_summaries(summaries)
+    job_by_task = dict(
+        Task.objects.filter(uuid__in=[summary.task_id for summary in summaries]).values_list('uuid', 'job_uuid')
+    )
+    deltas = {}
+    changed = []
+    for summary, previous_cost in zip(summaries, previous_costs):
+        contribution = task_contribution(summary, job_by_task.get(summary.task_id))
+        previous = summary.job_contribution or {}
+        if contribution == previous:
+            if summary.task_cost != previous_cost:
+                changed.append(summary)
+            continue
+        if previous:
+            _add_delta(deltas, summary.task_id, previous, -1)
+        if contribution:
+            _add_delta(deltas, summary.task_id, contribution, 1)
+        summary.job_contribution = contribution
+        changed.append(summary)
+    with transaction.atomic():
+        _apply_deltas(deltas, now or timezone.now())
+    return changed
+
+
+def retract_job_contribution(summary: TaskSummaryReportNew) -> None:
+    """Subtracts a (deleted) summary's stored contribution from its job."""
+    if summary.job_contribution:
+        deltas = {}
+        _add_delta(deltas, summary.task_id, summary.job_contribution, -1)
+        with transaction.atomic():
+            _apply_deltas(deltas, timezone.now())
+
+
+def roll_up_summaries(summaries_qs, chunk_size: int = None) -> int:
+    """
+    apply_job_deltas() for every summary in `summaries_qs`, a chunk at a time with
+    the summaries locked like the summary fold does. Summaries whose contribution
+    is already applied (at the current rates) cost nothing. Returns the number of
+    summaries changed.
+    """
+    changed = 0
+    for chunk in stream_chunks(summaries_qs.order_by('pk').values_list('pk', flat=True), chunk_size=chunk_size):
+        with transaction.atomic():
+            now = timezone.now()
+            summaries = TaskSummaryReportNew.objects.select_for_update().filter(pk__in=chunk).order_by('pk')
+            updated = apply_job_deltas(summaries, now=now)
+            for summary in updated:
+                # bulk_update() does not apply auto_now.
+                summary.updated_at = now
+            TaskSummaryReportNew.objects.bulk_update(updated, ['task_cost', 'job_contribution', 'updated_at'])
+            publish_versions(updated)
+        changed += len(updated)
+    if changed:
+        logger.info(f"Applied job rollup changes of {changed} task summaries.")
+    return changed
+
+
+def reset_job_rollups() -> None:
+    """
+    Zeroes the maintained job totals and forgets every stored contribution. The
+    reset summaries get a new updated_at, published to the summary cache like
+    any other summary write.
+    """
+    with transaction.atomic():
+        now = timezone.now()
+        JobAnalysisReport.objects.update(
+            **dict.fromkeys(COUNTER_FIELDS + DECIMAL_FIELDS, 0), billing_issue_tasks=[], has_any_billing_issue=False,
+            updated_at=now,
+        )
+        reset = dict(
+            TaskSummaryReportNew.objects.select_for_update().exclude(job_contribution={}).values_list('pk', 'task_id')
+        )
+        # update() does not apply auto_now.
+        TaskSummaryReportNew.objects.filter(pk__in=list(reset)).update(job_contribution={}, updated_at=now)
+        publish_versions([TaskSummaryReportNew(task_id=task_id, updated_at=now) for task_id in reset.values()])
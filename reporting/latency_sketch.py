@@ -0,0 +1,211 @@
+# reporting_and_analytics/latency_sketch.py
+
+import math
+
+from django.conf import settings
+
+# Mergeable latency quantile sketches.
+#
+# A LatencySketch is a log-bucketed histogram in the style of DDSketch: a value v
+# is counted in bucket ceil(log_gamma(v)) with gamma = (1 + a) / (1 - a), so every
+# quantile it reports is within relative error `a` (RELATIVE_ACCURACY) of a value
+# actually observed. Merging two sketches adds their bucket counts, which is
+# exact and order-independent, so per-task sketches can be combined into job- or
+# service-level ones without reading any report again.
+#
+# Buckets are stored densely from the lowest used index; a sketch spanning more
+# than MAX_BUCKETS buckets folds its lowest ones together, which only costs
+# accuracy in the fastest percentiles. Zero values are counted separately and
+# negative or non-numeric values are ignored.
+
+RELATIVE_ACCURACY = getattr(settings, 'LATENCY_SKETCH_RELATIVE_ACCURACY', 0.01)
+MAX_BUCKETS = getattr(settings, 'LATENCY_SKETCH_MAX_BUCKETS', 2048)
+MAX_URLS = getattr(settings, 'LATENCY_SKETCH_MAX_URLS', 200)
+OTHER_URL_KEY = '__other__'
+
+PERCENTILES = (50, 90, 99)
+# Keys of a summary's latency_sketches; 'page_load' holds one sketch per URL.
+SKETCH_KEYS = ('login', '2fa')
+PAGE_LOAD_KEY = 'page_load'
+
+
+def is_latency(value) -> bool:
+    """True for finite non-negative numbers (not bools), the values a sketch counts."""
+    return not isinstance(value, bool) and isinstance(value, (int, float)) and 0 <= value < math.inf
+
+
+class LatencySketch:
+    """Quantile sketch of non-negative values; see the module comment."""
+
+    def __init__(self, relative_accuracy: float = None):
+        self.relative_accuracy = relative_accuracy or RELATIVE_ACCURACY
+        self.gamma = (1 + self.relative_accuracy) / (1 - self.relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.count = 0
+        self.zero_count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.offset = 0
+        self.counts = []
+
+    def _index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, index: int) -> float:
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def _add_to_bucket(self, index: int, count: int) -> None:
+        if not self.counts:
+            self.offset = index
+            self.counts = [0]
+        elif index < self.offset:
+            self.counts[:0] = [0] * (self.offset - index)
+            self.offset = index
+        elif index >= self.offset + len(self.counts):
+            self.counts.extend([0] * (index - self.offset - len(self.counts) + 1))
+        self.counts[index - self.offset] += count
+
+    def _collapse(self) -> None:
+        excess = len(self.counts) - MAX_BUCKETS
+        if excess > 0:
+            collapsed = sum(self.counts[:excess + 1])
+            del self.counts[:excess]
+            self.counts[0] = collapsed
+            self.offset += excess
+
+    def add(self, value, count: int = 1) -> None:
+        if not is_latency(value):
+            return
+        value = float(value)
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if value == 0:
+            self.zero_count += count
+            return
+        self._add_to_bucket(self._index(value), count)
+        self._collapse()
+
+    def merge(self, other: "LatencySketch") -> "LatencySketch":
+        if not other.count:
+            return self
+        self.count += other.count
+        self.zero_count += other.zero_count
+        self.total += other.total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        rebucket = other.relative_accuracy != self.relative_accuracy  # stored before a change of accuracy
+        for position, count in enumerate(other.counts):
+            if count:
+                index = other.offset + position
+                self._add_to_bucket(self._index(other._value(index)) if rebucket else index, count)
+        self._collapse()
+        return self
+
+    def quantile(self, q: float):
+        """Estimated q-quantile (0 <= q <= 1), or None for an empty sketch."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        for position, count in enumerate(self.counts):
+            seen += count
+            if seen > rank:
+                return min(max(self._value(self.offset + position), self.min), self.max)
+        return self.max
+
+    def percentiles(self) -> dict:
+        """p50/p90/p99 plus count, mean, min and max."""
+        result = {f"p{p}": self.quantile(p / 100) for p in PERCENTILES}
+        result.update(
+            count=self.count,
+            mean=self.total / self.count if self.count else None,
+            min=self.min,
+            max=self.max,
+        )
+        return result
+
+    def to_dict(self) -> dict:
+        """Compact JSON form: {'a', 'n', 'z', 's', 'lo', 'hi', 'o', 'c'}."""
+        return {
+            "a": self.relative_accuracy, "n": self.count, "z": self.zero_count, "s": self.total,
+            "lo": self.min, "hi": self.max, "o": self.offset, "c": self.counts,
+        }
+
+    @classmethod
+    def from_dict(cls, data) -> "LatencySketch":
+        """Inverse of to_dict(); anything else gives an empty sketch."""
+        if not isinstance(data, dict) or not data.get("n"):
+            return cls()
+        sketch = cls(data["a"])
+        sketch.count = data["n"]
+        sketch.zero_count = data["z"]
+        sketch.total = data["s"]
+        sketch.min = data["lo"]
+        sketch.max = data["hi"]
+        sketch.offset = data["o"]
+        sketch.counts = list(data["c"])
+        return sketch
+
+
+class LatencySketches:
+    """
+    The latency sketches of one summary: login and 2FA times plus per-URL page
+    load times (at most MAX_URLS URLs; later ones share OTHER_URL_KEY).
+    """
+
+    def __init__(self, data=None):
+        data = data if isinstance(data, dict) else {}
+        self.sketches = {key: LatencySketch.from_dict(data.get(key)) for key in SKETCH_KEYS}
+        self.page_loads = {
+            url: LatencySketch.from_dict(sketch) for url, sketch in (data.get(PAGE_LOAD_KEY) or {}).items()
+        }
+
+    def add(self, key: str, value) -> None:
+        self.sketches[key].add(value)
+
+    def _page_load_sketch(self, url: str) -> LatencySketch:
+        if url not in self.page_loads and len(self.page_loads) >= MAX_URLS:
+            url = OTHER_URL_KEY
+        return self.page_loads.setdefault(url, LatencySketch())
+
+    def add_page_load(self, url: str, value) -> None:
+        if is_latency(value):
+            self._page_load_sketch(url).add(value)
+
+    def add_page_load_details(self, page_load_details) -> None:
+        """Adds each URL's total_page_load_time from one report's page_load_details."""
+        if not isinstance(page_load_details, dict):
+            return
+        for url, details in page_load_details.items():
+            if isinstance(details, dict):
+                self.add_page_load(url, details.get('total_page_load_time'))
+
+    def merge(self, other: "LatencySketches") -> "LatencySketches":
+        for key, sketch in other.sketches.items():
+            self.sketches[key].merge(sketch)
+        for url, sketch in other.page_loads.items():
+            self._page_load_sketch(url).merge(sketch)
+        return self
+
+    def to_dict(self) -> dict:
+        data = {key: sketch.to_dict() for key, sketch in self.sketches.items()}
+        data[PAGE_LOAD_KEY] = {url: sketch.to_dict() for url, sketch in self.page_loads.items()}
+        return data
+
+    def percentiles(self) -> dict:
+        result = {key: sketch.percentiles() for key, sketch in self.sketches.items()}
+        result[PAGE_LOAD_KEY] = {url: sketch.percentiles() for url, sketch in self.page_loads.items()}
+        return result
+
+
+def merge_latency_sketches(sketch_dicts) -> LatencySketches:
+    """Merges stored latency_sketches values (e.g. of every summary of a job)."""
+    merged = LatencySketches()
+    for data in sketch_dicts:
+        merged.merge(LatencySketches(data))
+    return merged
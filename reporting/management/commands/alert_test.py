@@ -9,10 +9,24 @@ import logging
 
 # Import models from the 'reporting' app
 from reporting.models import TaskSummaryReport, TaskAnalysisReport, Task
+from reporting.report_reader import stream
 from reporting.slack_utils import send_structured_slack_message
 
 logger = logging.getLogger(__name__)
 
+# Columns the alert checks read. The checks need the latest_* summaries and the
+# all_* error lists, so most JSON columns are still loaded; only
+# aggregated_scraped_data, aggregated_data_enrichment and
+# all_failed_downloads_summary (and the unused scalar columns) are skipped.
+SUMMARY_FIELDS = (
+    'task', 'task__name', 'task__uuid', 'updated_at', 'last_alerted_at',
+    'latest_overall_task_status', 'latest_overall_bot_login_status',
+    'latest_billing_issue_resolution_status', 'latest_report_end_datetime', 'run_id_of_latest_report',
+    'latest_scraped_data_summary', 'latest_data_enrichment_summary',
+    'all_exceptions', 'all_specific_exception_reasons', 'all_non_fatal_errors',
+    'total_runs_failed_exception', 'total_failed_download_count',
+)
+
 # Configuration for Alert Throttling (no longer directly used for deduplication, but kept for context)
 ALERT_COOLDOWN_PERIOD_HOURS = 6
 
@@ -62,7 +76,7 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING("No recently updated TaskSummaryReports found to check."))
             return
 
-        for report_summary in reports_to_check:
+        for report_summary in stream(reports_to_check, SUMMARY_FIELDS):
             self.stdout.write(f"\n--- Checking Task: {report_summary.task.name or report_summary.task.uuid} (Summary ID: {report_summary.pk}) ---")
 
             should_alert_dev = False
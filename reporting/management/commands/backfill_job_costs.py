@@ -0,0 +1,48 @@
+# reporting_and_analytics/management/commands/backfill_job_costs.py
+
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Sum
+
+from reporting.cost_engine import COST_QUANTUM
+from reporting.job_rollup import roll_up_summaries
+from reporting.models import JobAnalysisReport, TaskSummaryReportNew
+
+
+class Command(BaseCommand):
+    help = (
+        'Prices every task summary at the current CostUnitConfig rates and moves each job\'s '
+        'total_job_cost by the difference. Run after changing rates to reprice historical jobs.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--job_uuid',
+            type=str,
+            help='Optional: only reprice the tasks of this job UUID.',
+            default=None,
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Summaries locked and priced per transaction (default: 500).',
+        )
+
+    def handle(self, *args, **options):
+        summaries = TaskSummaryReportNew.objects.all()
+        jobs = JobAnalysisReport.objects.all()
+        job_uuid_str = options.get('job_uuid')
+        if job_uuid_str:
+            try:
+                job_uuid = uuid.UUID(job_uuid_str)
+            except ValueError:
+                raise CommandError(f"Invalid Job UUID format: {job_uuid_str}")
+            summaries = summaries.filter(task__job_uuid=job_uuid)
+            jobs = jobs.filter(job_uuid=job_uuid)
+
+        changed = roll_up_summaries(summaries, chunk_size=options['chunk_size'])
+        total = (jobs.aggregate(total=Sum('total_job_cost'))['total'] or Decimal(0)).quantize(COST_QUANTUM)
+        self.stdout.write(self.style.SUCCESS(f"Repriced {changed} task summaries; job cost now totals {total}."))
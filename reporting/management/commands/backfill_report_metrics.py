@@ -0,0 +1,38 @@
+# reporting_and_analytics/management/commands/backfill_report_metrics.py
+
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reporting.metrics import backfill_missing_metrics
+from reporting.models import TaskReport
+
+
+class Command(BaseCommand):
+    help = 'Extracts TaskReportMetrics for TaskReports ingested before typed metric columns existed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--task_uuid',
+            type=str,
+            help='Optional: only backfill reports of this Task UUID.',
+            default=None,
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Reports read and metrics rows inserted per round trip (default: 1000).',
+        )
+
+    def handle(self, *args, **options):
+        reports = TaskReport.objects.all()
+        task_uuid_str = options.get('task_uuid')
+        if task_uuid_str:
+            try:
+                reports = reports.filter(task_id=uuid.UUID(task_uuid_str))
+            except ValueError:
+                raise CommandError(f"Invalid Task UUID format: {task_uuid_str}")
+
+        created = backfill_missing_metrics(reports, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Created metrics for {created} reports."))
@@ -8,10 +8,23 @@ import logging
 
 # Import models from the 'reporting' app
 from reporting.models import TaskSummaryReport, Task
+from reporting.report_reader import stream
 from reporting.slack_utils import send_structured_slack_message
 
 logger = logging.getLogger(__name__)
 
+# Columns the client alert checks read. The latest_* and aggregated_* JSON
+# columns are still loaded; only the all_* error lists (and the unused scalar
+# columns) are skipped.
+SUMMARY_FIELDS = (
+    'task', 'task__name', 'task__uuid', 'last_alerted_at',
+    'latest_overall_task_status', 'latest_overall_bot_login_status',
+    'latest_billing_issue_resolution_status', 'latest_report_end_datetime', 'latest_total_task_runtime_text',
+    'latest_scraped_data_summary', 'latest_data_enrichment_summary',
+    'aggregated_scraped_data', 'aggregated_data_enrichment',
+    'total_runs_completed', 'total_saved_file_count',
+)
+
 class Command(BaseCommand):
     help = 'Sends client-specific performance reports and critical issue alerts, with deduplication disabled.'
 
@@ -59,7 +72,7 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING("No recently updated TaskSummaryReports found to check for client alerts."))
             return
 
-        for report_summary in reports_to_check:
+        for report_summary in stream(reports_to_check, SUMMARY_FIELDS):
             self.stdout.write(f"\n--- Checking Task for Client: {report_summary.task.name or report_summary.task.uuid} (Summary ID: {report_summary.pk}) ---")
 
             client_performance_metrics = []
@@ -0,0 +1,83 @@
+# reporting_and_analytics/management/commands/compile_reports.py
+
+import json
+import os
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from reporting.parallel_reports import PARTITIONS, compile_reports_parallel
+
+
+class Command(BaseCommand):
+    help = 'Compiles main_report / aggregate_page_loads / detailed_reports over stored TaskReports in parallel.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Worker processes reading and folding report slices (default: number of CPUs).',
+        )
+        parser.add_argument(
+            '--partition',
+            choices=PARTITIONS,
+            default='task',
+            help='Split the reports into slices by task or by created_at range (default: task).',
+        )
+        parser.add_argument(
+            '--task_uuid',
+            type=str,
+            help='Optional: only compile reports of this Task UUID.',
+            default=None,
+        )
+        parser.add_argument('--since', type=str, default=None, help='Optional: reports created at or after this ISO datetime.')
+        parser.add_argument('--until', type=str, default=None, help='Optional: reports created before this ISO datetime.')
+        parser.add_argument(
+            '--no-details',
+            action='store_true',
+            help='Skip detailed_reports; only the totals are compiled.',
+        )
+        parser.add_argument('--output', type=str, default=None, help='Write the JSON result to this file instead of stdout.')
+
+    def _datetime(self, options, name):
+        value = options.get(name)
+        if value is None:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise CommandError(f"Invalid --{name} datetime: {value}")
+        return parsed
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError("--workers must be at least 1.")
+
+        filters = {}
+        task_uuid_str = options.get('task_uuid')
+        if task_uuid_str:
+            try:
+                filters['task_id'] = uuid.UUID(task_uuid_str)
+            except ValueError:
+                raise CommandError(f"Invalid Task UUID format: {task_uuid_str}")
+        since, until = self._datetime(options, 'since'), self._datetime(options, 'until')
+        if since:
+            filters['created_at__gte'] = since
+        if until:
+            filters['created_at__lt'] = until
+
+        result = compile_reports_parallel(
+            filters,
+            workers=options['workers'],
+            partition=options['partition'],
+            keep_details=not options['no_details'],
+        )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(result, f, default=str)
+            count = result['main_report']['total_reports_count']
+            self.stdout.write(self.style.SUCCESS(f"Compiled {count} reports into {options['output']}."))
+        else:
+            self.stdout.write(json.dumps(result, default=str))
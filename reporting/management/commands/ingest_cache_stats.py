@@ -0,0 +1,23 @@
+# reporting_and_analytics/management/commands/ingest_cache_stats.py
+
+import json
+
+from django.core.management.base import BaseCommand
+
+from reporting.task_cache import known_tasks
+
+
+class Command(BaseCommand):
+    help = 'Prints the hit/miss counters of the known-task cache used by report ingestion.'
+
+    def handle(self, *args, **options):
+        stats = known_tasks.stats()
+        shared = stats['shared']
+        if shared is None:
+            self.stdout.write(self.style.WARNING("Redis is unreachable; shared counters unavailable."))
+        else:
+            lookups = sum(shared.values())
+            hits = shared.get('local_hits', 0) + shared.get('shared_hits', 0)
+            hit_rate = f"{hits / lookups:.1%}" if lookups else "n/a"
+            self.stdout.write(self.style.SUCCESS(f"Known-task cache hit rate across all processes: {hit_rate}"))
+        self.stdout.write(json.dumps(stats, indent=2))
@@ -0,0 +1,50 @@
+# reporting_and_analytics/management/commands/rebuild_job_rollups.py
+
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reporting.job_rollup import reset_job_rollups, roll_up_summaries
+from reporting.models import TaskSummaryReportNew
+
+
+class Command(BaseCommand):
+    help = (
+        'Applies task summaries that are not yet counted in their JobAnalysisReport (e.g. summaries '
+        'written before job rollups existed). With --reset every job total is recomputed from scratch.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--job_uuid',
+            type=str,
+            help='Optional: only roll up the task summaries of this job UUID.',
+            default=None,
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Zero every job total and re-apply all summaries (job totals read low until it finishes).',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Summaries locked and applied per transaction (default: 500).',
+        )
+
+    def handle(self, *args, **options):
+        summaries = TaskSummaryReportNew.objects.all()
+        job_uuid_str = options.get('job_uuid')
+        if job_uuid_str:
+            if options['reset']:
+                raise CommandError("--reset recomputes every job and cannot be combined with --job_uuid.")
+            try:
+                summaries = summaries.filter(task__job_uuid=uuid.UUID(job_uuid_str))
+            except ValueError:
+                raise CommandError(f"Invalid Job UUID format: {job_uuid_str}")
+
+        if options['reset']:
+            reset_job_rollups()
+        changed = roll_up_summaries(summaries, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Applied {changed} task summaries to their job totals."))
@@ -0,0 +1,31 @@
+# reporting_and_analytics/management/commands/rebuild_metric_rollups.py
+
+from django.core.management.base import BaseCommand
+
+from reporting.metric_rollup import BATCH_SIZE, reset_metric_rollups, roll_up_report_metrics
+
+
+class Command(BaseCommand):
+    help = (
+        'Rolls up every report past the metric rollup watermark into the hourly and daily rollups. '
+        'With --reset the rollups are deleted and recomputed from the first report.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Delete every rollup row and the watermark first (trend queries read low until it finishes).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help=f'Reports rolled up per transaction (default: {BATCH_SIZE}).',
+        )
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            reset_metric_rollups()
+        rolled_up = roll_up_report_metrics(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rolled up metrics of {rolled_up} reports."))
@@ -0,0 +1,54 @@
+# reporting_and_analytics/management/commands/rebuild_task_summaries.py
+
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reporting.models import Task
+from reporting.summary_engine import fold_task_summaries
+from reporting.tasks import SUMMARY_BATCH_SIZE, process_task_summary_batch
+
+
+class Command(BaseCommand):
+    help = 'Recomputes TaskSummaryReportNew rows from all of their TaskReports, discarding the incremental state.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--task_uuid',
+            type=str,
+            help='Optional: only rebuild the summary of this Task UUID.',
+            default=None,
+        )
+        parser.add_argument(
+            '--async',
+            action='store_true',
+            dest='run_async',
+            help='Queue Celery rebuild batches instead of rebuilding in this process.',
+        )
+
+    def handle(self, *args, **options):
+        tasks = Task.objects.filter(reports__isnull=False).distinct()
+        task_uuid_str = options.get('task_uuid')
+        if task_uuid_str:
+            try:
+                tasks = Task.objects.filter(uuid=uuid.UUID(task_uuid_str))
+            except ValueError:
+                raise CommandError(f"Invalid Task UUID format: {task_uuid_str}")
+            if not tasks.exists():
+                raise CommandError(f"Task with UUID '{task_uuid_str}' not found.")
+
+        task_uuids = [str(task_uuid) for task_uuid in tasks.values_list('uuid', flat=True)]
+        folded = 0
+        for start in range(0, len(task_uuids), SUMMARY_BATCH_SIZE):
+            chunk = task_uuids[start:start + SUMMARY_BATCH_SIZE]
+            if options['run_async']:
+                process_task_summary_batch.delay(chunk, full_rebuild=True)
+            else:
+                results = fold_task_summaries(chunk, full_rebuild=True)
+                folded += sum(count for _, count in results.values())
+                self.stdout.write(f"Rebuilt {start + len(chunk)} of {len(task_uuids)} tasks...")
+
+        if options['run_async']:
+            self.stdout.write(self.style.SUCCESS(f"Queued rebuilds for {len(task_uuids)} tasks."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt summaries of {len(task_uuids)} tasks from {folded} reports."))
@@ -11,9 +11,16 @@ from django.db.models import Avg, Max, Min, Sum
 from django.db.models.functions import Coalesce
 
 from reporting.models import Task, TaskAnalysisReport, TaskSummaryReport
+from reporting.report_reader import stream
 
 logger = logging.getLogger(__name__)
 
+# Columns read by the per-report loop; the other JSON columns are never loaded.
+REPORT_FIELDS = (
+    'scraped_data_summary', 'data_enrichment_summary', 'non_fatal_errors_summary',
+    'exceptions_summary', 'specific_exception_reasons', 'failed_downloads_summary',
+)
+
 class Command(BaseCommand):
     help = 'Updates or creates TaskSummaryReports for tasks based on their TaskAnalysisReports. Can process all tasks or a single specified task.'
 
@@ -114,7 +121,7 @@ class Command(BaseCommand):
                 all_specific_exception_reasons_set = set()
                 all_failed_downloads_summary_set = set()
 
-                for report in all_reports_for_task:
+                for report in stream(all_reports_for_task, REPORT_FIELDS):
                     # --- FIX START ---
                     if isinstance(report.scraped_data_summary, dict):
                         for key, value in report.scraped_data_summary.items():
@@ -0,0 +1,21 @@
+# reporting_and_analytics/management/commands/warm_report_dedupe.py
+
+from django.core.management.base import BaseCommand
+
+from reporting.dedupe import WARM_HOURS, warm_from_recent_reports
+
+
+class Command(BaseCommand):
+    help = 'Seeds the Redis report dedupe filter from recently ingested TaskReports. Run at web startup.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=WARM_HOURS,
+            help=f'How many hours of recent reports to load (default: {WARM_HOURS}).',
+        )
+
+    def handle(self, *args, **options):
+        warmed = warm_from_recent_reports(hours=options['hours'])
+        self.stdout.write(self.style.SUCCESS(f"Warmed dedupe filter with {warmed} reports."))
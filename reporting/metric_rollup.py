@@ -0,0 +1,243 @@
+# reporting_and_analytics/metric_rollup.py
+
+import datetime
+import logging
+import math
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Coalesce, Trunc
+
+from .metrics import LOGIN_TIME_KEYS, SUMMED_FIELDS, backfill_missing_metrics
+from .models import ReportMetricRollupDaily, ReportMetricRollupHourly, RollupWatermark, TaskReport, TaskReportMetrics
+from .report_sequence import assign_report_sequence, lock_watermark, sequence_window
+
+logger = logging.getLogger(__name__)
+
+# Hourly and daily rollups of TaskReportMetrics.
+#
+# roll_up_report_metrics() numbers the newly visible reports (report_sequence)
+# and reads the ones past a single watermark (the sequence number of the last
+# report rolled up), a batch at a time and in sequence order, groups their
+# metrics by (task, service, end_point, UTC hour) and by the same key per UTC
+# day, and adds the sums to the rollup rows. A report that commits late is
+# numbered late and still lands in the bucket of its own created_at. The rows,
+# the watermark and the batch move together in one transaction with the
+# watermark row locked, so concurrent runs queue up instead of counting a batch
+# twice.
+#
+# Rollups only ever add: deleting reports does not reduce them. The
+# rebuild_metric_rollups command recomputes them from TaskReportMetrics.
+#
+# timeseries() answers range queries from the finest granularity whose bucket
+# count fits the caller's point budget; when even daily buckets do not fit, days
+# are merged into steps of several days.
+
+WATERMARK_NAME = 'report_metrics'
+BATCH_SIZE = getattr(settings, 'METRIC_ROLLUP_BATCH_SIZE', 5000)
+DEFAULT_MAX_POINTS = getattr(settings, 'METRIC_ROLLUP_DEFAULT_MAX_POINTS', 200)
+MAX_POINTS_LIMIT = getattr(settings, 'METRIC_ROLLUP_MAX_POINTS_LIMIT', 2000)
+
+HOUR = datetime.timedelta(hours=1)
+DAY = datetime.timedelta(days=1)
+
+# (rollup model, Trunc kind, bucket size), finest first
+GRANULARITIES = {
+    'hour': (ReportMetricRollupHourly, 'hour', HOUR),
+    'day': (ReportMetricRollupDaily, 'day', DAY),
+}
+
+# Rollup column -> TaskReportMetrics flag it counts reports with
+FLAG_COUNT_FIELDS = {
+    'storage_upload_failure_reports': 'storage_house_upload_failures',
+    'billing_exception_reports': 'has_billing_exception',
+    'logged_in_reports': 'logged_in',
+}
+
+# Everything a rollup row accumulates
+METRIC_FIELDS = ('report_count',) + tuple(SUMMED_FIELDS) + tuple(FLAG_COUNT_FIELDS)
+KEY_FIELDS = ('task_id', 'service', 'end_point', 'bucket_start')
+GROUP_BY = ('task_id', 'service', 'end_point')
+
+
+def _rollup_aggregates() -> dict:
+    aggregates = {'report_count': Count('pk')}
+    for column in SUMMED_FIELDS:
+        aggregates[column] = Coalesce(Sum(column), 0.0 if column in LOGIN_TIME_KEYS else 0)
+    for field, flag in FLAG_COUNT_FIELDS.items():
+        aggregates[field] = Count('pk', filter=Q(**{flag: True}))
+    return aggregates
+
+
+def _bucket_totals(metrics_qs, kind: str) -> dict:
+    """{(task_id, service, end_point, bucket_start): {field: sum}} for one granularity, in one query."""
+    rows = (
+        metrics_qs.order_by()
+        .annotate(
+            service=Coalesce('report__service', Value('')),
+            end_point=Coalesce('report__end_point', Value('')),
+            bucket_start=Trunc('created_at', kind, tzinfo=datetime.timezone.utc),
+        )
+        .values(*KEY_FIELDS)
+        .annotate(**_rollup_aggregates())
+    )
+    return {tuple(row.pop(key) for key in KEY_FIELDS): row for row in rows}
+
+
+def _add_to_rollups(model, totals: dict) -> None:
+    """Adds `totals` onto the rollup rows of `model`, creating the missing ones."""
+    if not totals:
+        return
+    # A batch mostly covers a short stretch of created_at, so the rows in its
+    # bucket range are few; only the ones this batch touches are updated.
+    buckets = [bucket_start for _, _, _, bucket_start in totals]
+    candidates = model.objects.select_for_update().filter(
+        task_id__in={task_id for task_id, _, _, _ in totals},
+        bucket_start__gte=min(buckets), bucket_start__lte=max(buckets),
+    ).order_by('pk')
+    existing = []
+    for row in candidates:
+        fields = totals.pop((row.task_id, row.service, row.end_point, row.bucket_start), None)
+        if fields is not None:
+            for field, value in fields.items():
+                setattr(row, field, getattr(row, field) + value)
+            existing.append(row)
+    model.objects.bulk_update(existing, METRIC_FIELDS, batch_size=BATCH_SIZE)
+    model.objects.bulk_create(
+        [model(**dict(zip(KEY_FIELDS, key)), **fields) for key, fields in totals.items()], batch_size=BATCH_SIZE,
+    )
+
+
+def _roll_up_batch(batch_size: int) -> int:
+    with transaction.atomic():
+        watermark = lock_watermark(WATERMARK_NAME)
+        after = watermark.last_report_sequence
+        batch = list(
+            TaskReport.objects.filter(sequence_window('sequence', after=after))
+            .order_by('sequence').values_list('sequence', flat=True)[:batch_size]
+        )
+        if not batch:
+            return 0
+        upto = batch[-1]
+        backfill_missing_metrics(TaskReport.objects.filter(sequence_window('sequence', after=after, upto=upto)))
+
+        metrics = TaskReportMetrics.objects.filter(sequence_window('report__sequence', after=after, upto=upto))
+        for model, kind, _ in GRANULARITIES.values():
+            _add_to_rollups(model, _bucket_totals(metrics, kind))
+
+        watermark.last_report_sequence = upto
+        watermark.save()
+    return len(batch)
+
+
+def roll_up_report_metrics(batch_size: int = None) -> int:
+    """
+    Adds every report past the rollup watermark to the hourly and daily rollups,
+    one transaction per `batch_size` reports. Returns the number of reports
+    rolled up.
+    """
+    batch_size = batch_size or BATCH_SIZE
+    assign_report_sequence()
+    rolled_up = 0
+    while True:
+        count = _roll_up_batch(batch_size)
+        rolled_up += count
+        if count < batch_size:
+            break
+    if rolled_up:
+        logger.info(f"Rolled up metrics of {rolled_up} reports.")
+    return rolled_up
+
+
+def reset_metric_rollups() -> None:
+    """Deletes every rollup row and the watermark; the next run starts from the first report."""
+    with transaction.atomic():
+        RollupWatermark.objects.filter(name=WATERMARK_NAME).delete()
+        for model, _, _ in GRANULARITIES.values():
+            model.objects.all().delete()
+
+
+def rolled_up_until():
+    """created_at of the last report (by sequence) counted in the rollups (None before the first run)."""
+    watermark = (
+        RollupWatermark.objects.filter(name=WATERMARK_NAME)
+        .values_list('last_report_sequence', flat=True).first()
+    )
+    if watermark is None:
+        return None
+    return (
+        TaskReport.objects.filter(sequence__lte=watermark).order_by('-sequence')
+        .values_list('created_at', flat=True).first()
+    )
+
+
+def _floor(moment: datetime.datetime, size: datetime.timedelta) -> datetime.datetime:
+    moment = moment.astimezone(datetime.timezone.utc)
+    if size == HOUR:
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def choose_granularity(start, end, max_points: int):
+    """
+    (granularity, step) of the finest rollup whose buckets between `start` and
+    `end` fit in `max_points`; step is the bucket size, or a whole number of
+    days when daily buckets are still too many.
+    """
+    for granularity, (_, _, size) in GRANULARITIES.items():
+        first = _floor(start, size)
+        buckets = math.ceil((end - first) / size)
+        if buckets <= max_points:
+            return granularity, size
+    return 'day', DAY * math.ceil(buckets / max_points)
+
+
+def timeseries(start, end, metrics, max_points: int = None, filters: dict = None, group_by=None) -> dict:
+    """
+    Sums of `metrics` (METRIC_FIELDS) over [start, end), per bucket of the chosen
+    granularity and optionally per `group_by` ('task_id', 'service' or
+    'end_point'). `filters` are applied to the rollup rows (e.g. task__job_uuid).
+    Every series has one point per step, zero where nothing was reported.
+    """
+    max_points = min(max_points or DEFAULT_MAX_POINTS, MAX_POINTS_LIMIT)
+    granularity, step = choose_granularity(start, end, max_points)
+    model, _, size = GRANULARITIES[granularity]
+    first = _floor(start, size)
+
+    rows = (
+        model.objects.filter(bucket_start__gte=first, bucket_start__lt=end, **(filters or {}))
+        .order_by()
+        .values(*(group_by or ()), 'bucket_start')
+        .annotate(**{metric: Sum(metric) for metric in metrics})
+    )
+    # Without grouping there is always one (possibly all-zero) series.
+    series = {} if group_by else {(): {}}
+    for row in rows:
+        bucket_start = row.pop('bucket_start')
+        key = tuple((field, row.pop(field)) for field in group_by or ())
+        point = first + step * ((bucket_start - first) // step)
+        totals = series.setdefault(key, {}).setdefault(point, dict.fromkeys(metrics, 0))
+        for metric in metrics:
+            totals[metric] += row[metric] or 0
+
+    points = []
+    point = first
+    while point < end:
+        points.append(point)
+        point += step
+    return {
+        'granularity': granularity,
+        'step_seconds': int(step.total_seconds()),
+        'start': first,
+        'end': end,
+        'rolled_up_until': rolled_up_until(),
+        'metrics': list(metrics),
+        'series': [
+            {
+                'key': {field: str(value) if field == 'task_id' else value for field, value in key},
+                'points': [dict({'bucket_start': point}, **buckets.get(point, dict.fromkeys(metrics, 0))) for point in points],
+            }
+            for key, buckets in sorted(series.items(), key=lambda item: tuple(str(value) for _, value in item[0]))
+        ],
+    }
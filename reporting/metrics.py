@@ -0,0 +1,169 @@
+# reporting_and_analytics/metrics.py
+
+import json
+import logging
+
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .models import TaskReport, TaskReportMetrics
+from .report_reader import stream_chunks
+
+logger = logging.getLogger(__name__)
+
+# TaskReportMetrics column -> key in TaskReport.full_report
+COUNTER_KEYS = {
+    'critical_events_count': 'critical_events_count',
+    'login_exceptions_count': 'login_exceptions_count',
+    'page_detection_exceptions_count': 'page_detection_exceptions_count',
+    'locate_element_exceptions_count': 'locate_element_exceptions_count',
+    'downloaded_file_count': 'downloaded_file_count',
+    'storage_house_uploads': 'storage_house_uploads',
+    'failed_to_download_file_count': 'failed_to_download_file_count',
+    'found_next_page_info_count': 'found_next_page_info_count',
+    'next_page_info_not_found_count': 'next_page_info_not_found_count',
+}
+
+# Only counted when the report carries a login block ('total_login_attempts').
+LOGIN_COUNTER_KEYS = {
+    'total_login_attempts': 'total_login_attempts',
+    'successful_logins': 'successful_logins',
+    'failed_logins': 'failed_logins',
+    'twofa_attempts': '2fa_attempts',
+    'twofa_successes': '2fa_successes',
+    'twofa_failures': '2fa_failures',
+    'total_attempt_failed': 'total_attempt_failed',
+}
+LOGIN_TIME_KEYS = {
+    'total_login_time': 'total_login_time',
+    'twofa_total_time': '2fa_total_time',
+}
+
+FLAG_KEYS = {
+    'storage_house_upload_failures': 'storage_house_upload_failures',
+    'has_billing_exception': 'has_billing_exception',
+}
+
+# Columns summed by aggregate_report_metrics()
+SUMMED_FIELDS = (
+    list(COUNTER_KEYS) + list(LOGIN_COUNTER_KEYS) + list(LOGIN_TIME_KEYS) + ['total_users_scraped']
+)
+# Boolean columns aggregated as "true in any report"
+ANY_FLAGS = list(FLAG_KEYS) + ['logged_in']
+
+_CHUNK_SIZE = 1000
+
+
+def load_full_report(full_report) -> dict:
+    """TaskReport.full_report as a dict; older rows may hold a JSON string."""
+    full = full_report or {}
+    if isinstance(full, str):
+        try:
+            full = json.loads(full)
+        except json.JSONDecodeError:
+            return {}
+    return full if isinstance(full, dict) else {}
+
+
+def _as_int(value) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _as_float(value) -> float:
+    try:
+        return float(value or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def extract_metrics(full: dict) -> dict:
+    """Typed hot-metric values of one decoded full_report, keyed by TaskReportMetrics column."""
+    values = {column: _as_int(full.get(key)) for column, key in COUNTER_KEYS.items()}
+
+    has_login_metrics = 'total_login_attempts' in full
+    for column, key in LOGIN_COUNTER_KEYS.items():
+        values[column] = _as_int(full.get(key)) if has_login_metrics else 0
+    for column, key in LOGIN_TIME_KEYS.items():
+        values[column] = _as_float(full.get(key)) if has_login_metrics else 0.0
+    values['has_login_metrics'] = has_login_metrics
+
+    scrape_summary = full.get('scraped_data_summary')
+    values['total_users_scraped'] = (
+        _as_int(scrape_summary.get('total_users_scraped')) if isinstance(scrape_summary, dict) else 0
+    )
+
+    for column, key in FLAG_KEYS.items():
+        values[column] = bool(full.get(key, False))
+    values['logged_in'] = full.get('bot_login_status_for_run') == 'Logged In'
+
+    has_next_page_info = full.get('has_next_page_info')
+    values['has_next_page_info'] = None if has_next_page_info is None else bool(has_next_page_info)
+    return values
+
+
+def build_report_metrics(report: TaskReport) -> TaskReportMetrics:
+    """Unsaved TaskReportMetrics row for a stored TaskReport."""
+    return TaskReportMetrics(
+        report_id=report.id,
+        task_id=report.task_id,
+        created_at=report.created_at,
+        **extract_metrics(load_full_report(report.full_report)),
+    )
+
+
+def backfill_missing_metrics(reports_qs, chunk_size: int = _CHUNK_SIZE) -> int:
+    """
+    Creates TaskReportMetrics for every report in `reports_qs` that has none yet.
+    Costs one (usually empty) query when everything is already extracted. On
+    Postgres the extraction runs as a single INSERT ... SELECT; only reports it
+    cannot handle are decoded in Python.
+    """
+    from . import pg_aggregation  # imports this module
+
+    created = 0
+    if pg_aggregation.is_available():
+        created = pg_aggregation.insert_missing_metrics(reports_qs)
+
+    missing = reports_qs.filter(metrics__isnull=True).order_by()
+    for chunk in stream_chunks(missing, ('id', 'task_id', 'created_at', 'full_report'), chunk_size):
+        TaskReportMetrics.objects.bulk_create(
+            [build_report_metrics(report) for report in chunk], ignore_conflicts=True,
+        )
+        created += len(chunk)
+
+    if created:
+        logger.info(f"Extracted metrics for {created} reports.")
+    return created
+
+
+def _metric_aggregates() -> dict:
+    aggregates = {
+        column: Coalesce(Sum(column), 0.0 if column in LOGIN_TIME_KEYS else 0)
+        for column in SUMMED_FIELDS
+    }
+    for flag in ANY_FLAGS:
+        aggregates[f'any_{flag}'] = Count('pk', filter=Q(**{flag: True}))
+    return aggregates
+
+
+def _flags_to_bool(totals: dict) -> dict:
+    for flag in ANY_FLAGS:
+        totals[f'any_{flag}'] = totals[f'any_{flag}'] > 0
+    return totals
+
+
+def aggregate_report_metrics(metrics_qs) -> dict:
+    """
+    One SQL aggregate over TaskReportMetrics: sums of every counter column plus
+    `any_<flag>` booleans for flags that were set in at least one report.
+    """
+    return _flags_to_bool(metrics_qs.order_by().aggregate(**_metric_aggregates()))
+
+
+def aggregate_report_metrics_by_task(metrics_qs) -> dict:
+    """aggregate_report_metrics() grouped by task in one query: {task_id: totals}."""
+    rows = metrics_qs.order_by().values('task_id').annotate(**_metric_aggregates())
+    return {row.pop('task_id'): _flags_to_bool(row) for row in rows}
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reporting', '0006_tasksummaryreportnew_failed_downloads_details_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskReportMetrics',
+            fields=[
+                ('report', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='metrics', serialize=False, to='reporting.taskreport')),
+                ('created_at', models.DateTimeField(blank=True, help_text='Copy of TaskReport.created_at.', null=True)),
+                ('critical_events_count', models.IntegerField(default=0)),
+                ('login_exceptions_count', models.IntegerField(default=0)),
+                ('page_detection_exceptions_count', models.IntegerField(default=0)),
+                ('locate_element_exceptions_count', models.IntegerField(default=0)),
+                ('has_login_metrics', models.BooleanField(default=False, help_text="True if the report carried 'total_login_attempts'.")),
+                ('total_login_attempts', models.IntegerField(default=0)),
+                ('successful_logins', models.IntegerField(default=0)),
+                ('failed_logins', models.IntegerField(default=0)),
+                ('total_login_time', models.FloatField(default=0.0)),
+                ('twofa_attempts', models.IntegerField(default=0)),
+                ('twofa_successes', models.IntegerField(default=0)),
+                ('twofa_failures', models.IntegerField(default=0)),
+                ('twofa_total_time', models.FloatField(default=0.0)),
+                ('total_attempt_failed', models.IntegerField(default=0)),
+                ('logged_in', models.BooleanField(default=False, help_text="bot_login_status_for_run was 'Logged In'.")),
+                ('total_users_scraped', models.IntegerField(default=0)),
+                ('downloaded_file_count', models.IntegerField(default=0)),
+                ('storage_house_uploads', models.IntegerField(default=0)),
+                ('failed_to_download_file_count', models.IntegerField(default=0)),
+                ('storage_house_upload_failures', models.BooleanField(default=False)),
+                ('found_next_page_info_count', models.IntegerField(default=0)),
+                ('next_page_info_not_found_count', models.IntegerField(default=0)),
+                ('has_next_page_info', models.BooleanField(blank=True, null=True)),
+                ('has_billing_exception', models.BooleanField(default=False)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_metrics', to='reporting.task')),
+            ],
+            options={
+                'verbose_name': 'Task Report Metrics',
+                'verbose_name_plural': 'Task Report Metrics',
+                'indexes': [models.Index(fields=['task', 'created_at'], name='reporting_metrics_task_ct'), models.Index(fields=['created_at'], name='reporting_metrics_created')],
+            },
+        ),
+    ]
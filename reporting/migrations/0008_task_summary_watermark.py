@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:31
+
+from django.db import migrations, models
+
+BATCH_SIZE = 5000
+
+
+def number_existing_reports(apps, schema_editor):
+    # Existing reports are all visible, so they are numbered in (created_at, id)
+    # order; reports ingested later get numbers from report_sequence.py, which
+    # continues after the highest number given here.
+    TaskReport = apps.get_model('reporting', 'TaskReport')
+    if schema_editor.connection.vendor == 'postgresql':
+        table = TaskReport._meta.db_table
+        schema_editor.execute(
+            f"UPDATE {table} r SET sequence = n.sequence "
+            f"FROM (SELECT id, row_number() OVER (ORDER BY created_at, id) AS sequence FROM {table}) n "
+            f"WHERE r.id = n.id"
+        )
+        return
+    ids = list(TaskReport.objects.order_by('created_at', 'id').values_list('id', flat=True))
+    for start in range(0, len(ids), BATCH_SIZE):
+        TaskReport.objects.bulk_update(
+            [TaskReport(id=report_id, sequence=start + offset)
+             for offset, report_id in enumerate(ids[start:start + BATCH_SIZE], start=1)],
+            ['sequence'], batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reporting', '0007_taskreportmetrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskreport',
+            name='sequence',
+            field=models.BigIntegerField(blank=True, editable=False, help_text='Commit-ordered number, assigned once the report is visible (see report_sequence.py).', null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='tasksummaryreportnew',
+            name='last_processed_report_sequence',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='taskreport',
+            index=models.Index(fields=['task', 'sequence'], name='reporting_report_task_seq'),
+        ),
+        migrations.AddIndex(
+            model_name='taskreport',
+            index=models.Index(condition=models.Q(('sequence__isnull', True)), fields=['created_at', 'id'], name='reporting_report_unnumbered'),
+        ),
+        migrations.RunPython(number_existing_reports, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:36
+
+from django.db import migrations, models
+
+
+def reset_summary_watermarks(apps, schema_editor):
+    # Existing summaries have no counts yet; without a watermark the summary
+    # engine rebuilds them from their reports on the next run.
+    TaskSummaryReportNew = apps.get_model('reporting', 'TaskSummaryReportNew')
+    TaskSummaryReportNew.objects.update(last_processed_report_sequence=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reporting', '0008_task_summary_watermark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tasksummaryreportnew',
+            name='attempt_failed_error_counts',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='tasksummaryreportnew',
+            name='critical_events_counts',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='tasksummaryreportnew',
+            name='failed_downloads_counts',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='tasksummaryreportnew',
+            name='locate_element_exceptions_counts',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='tasksummaryreportnew',
+            name='login_exceptions_counts',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='tasksummaryreportnew',
+            name='page_detection_exceptions_counts',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(reset_summary_watermarks, migrations.RunPython.noop),
+    ]
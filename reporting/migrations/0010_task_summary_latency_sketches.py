@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+def reset_summary_watermarks(apps, schema_editor):
+    # Existing summaries have no sketches yet; without a watermark the summary
+    # engine rebuilds them from their reports on the next run.
+    TaskSummaryReportNew = apps.get_model('reporting', 'TaskSummaryReportNew')
+    TaskSummaryReportNew.objects.update(last_processed_report_sequence=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reporting', '0009_task_summary_entry_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tasksummaryreportnew',
+            name='latency_sketches',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(reset_summary_watermarks, migrations.RunPython.noop),
+    ]
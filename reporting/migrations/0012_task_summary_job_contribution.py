@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reporting', '0011_task_summary_distinct_sketches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tasksummaryreportnew',
+            name='job_contribution',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reporting', '0012_task_summary_job_contribution'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tasksummaryreportnew',
+            name='task_cost',
+            field=models.DecimalField(decimal_places=4, default=0, max_digits=12),
+        ),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reporting', '0013_task_summary_task_cost'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('last_report_sequence', models.BigIntegerField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Rollup Watermark',
+                'verbose_name_plural': 'Rollup Watermarks',
+            },
+        ),
+        migrations.CreateModel(
+            name='ReportMetricRollupDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('service', models.CharField(blank=True, default='', max_length=50)),
+                ('end_point', models.CharField(blank=True, default='', max_length=50)),
+                ('bucket_start', models.DateTimeField(help_text='Start of the (UTC) bucket the reports were created in.')),
+                ('report_count', models.IntegerField(default=0)),
+                ('critical_events_count', models.IntegerField(default=0)),
+                ('login_exceptions_count', models.IntegerField(default=0)),
+                ('page_detection_exceptions_count', models.IntegerField(default=0)),
+                ('locate_element_exceptions_count', models.IntegerField(default=0)),
+                ('total_login_attempts', models.IntegerField(default=0)),
+                ('successful_logins', models.IntegerField(default=0)),
+                ('failed_logins', models.IntegerField(default=0)),
+                ('total_login_time', models.FloatField(default=0.0)),
+                ('twofa_attempts', models.IntegerField(default=0)),
+                ('twofa_successes', models.IntegerField(default=0)),
+                ('twofa_failures', models.IntegerField(default=0)),
+                ('twofa_total_time', models.FloatField(default=0.0)),
+                ('total_attempt_failed', models.IntegerField(default=0)),
+                ('total_users_scraped', models.IntegerField(default=0)),
+                ('downloaded_file_count', models.IntegerField(default=0)),
+                ('storage_house_uploads', models.IntegerField(default=0)),
+                ('failed_to_download_file_count', models.IntegerField(default=0)),
+                ('found_next_page_info_count', models.IntegerField(default=0)),
+                ('next_page_info_not_found_count', models.IntegerField(default=0)),
+                ('storage_upload_failure_reports', models.IntegerField(default=0)),
+                ('billing_exception_reports', models.IntegerField(default=0)),
+                ('logged_in_reports', models.IntegerField(default=0)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reporting.task')),
+            ],
+            options={
+                'verbose_name': 'Daily Report Metric Rollup',
+                'verbose_name_plural': 'Daily Report Metric Rollups',
+                'indexes': [models.Index(fields=['bucket_start'], name='reporting_rollup_daily_bkt')],
+                'constraints': [models.UniqueConstraint(fields=('task', 'service', 'end_point', 'bucket_start'), name='reporting_rollup_daily_key')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReportMetricRollupHourly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('service', models.CharField(blank=True, default='', max_length=50)),
+                ('end_point', models.CharField(blank=True, default='', max_length=50)),
+                ('bucket_start', models.DateTimeField(help_text='Start of the (UTC) bucket the reports were created in.')),
+                ('report_count', models.IntegerField(default=0)),
+                ('critical_events_count', models.IntegerField(default=0)),
+                ('login_exceptions_count', models.IntegerField(default=0)),
+                ('page_detection_exceptions_count', models.IntegerField(default=0)),
+                ('locate_element_exceptions_count', models.IntegerField(default=0)),
+                ('total_login_attempts', models.IntegerField(default=0)),
+                ('successful_logins', models.IntegerField(default=0)),
+                ('failed_logins', models.IntegerField(default=0)),
+                ('total_login_time', models.FloatField(default=0.0)),
+                ('twofa_attempts', models.IntegerField(default=0)),
+                ('twofa_successes', models.IntegerField(default=0)),
+                ('twofa_failures', models.IntegerField(default=0)),
+                ('twofa_total_time', models.FloatField(default=0.0)),
+                ('total_attempt_failed', models.IntegerField(default=0)),
+                ('total_users_scraped', models.IntegerField(default=0)),
+                ('downloaded_file_count', models.IntegerField(default=0)),
+                ('storage_house_uploads', models.IntegerField(default=0)),
+                ('failed_to_download_file_count', models.IntegerField(default=0)),
+                ('found_next_page_info_count', models.IntegerField(default=0)),
+                ('next_page_info_not_found_count', models.IntegerField(default=0)),
+                ('storage_upload_failure_reports', models.IntegerField(default=0)),
+                ('billing_exception_reports', models.IntegerField(default=0)),
+                ('logged_in_reports', models.IntegerField(default=0)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reporting.task')),
+            ],
+            options={
+                'verbose_name': 'Hourly Report Metric Rollup',
+                'verbose_name_plural': 'Hourly Report Metric Rollups',
+                'indexes': [models.Index(fields=['bucket_start'], name='reporting_rollup_hourly_bkt')],
+                'constraints': [models.UniqueConstraint(fields=('task', 'service', 'end_point', 'bucket_start'), name='reporting_rollup_hourly_key')],
+            },
+        ),
+    ]
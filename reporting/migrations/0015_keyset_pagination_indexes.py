@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reporting', '0014_report_metric_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='taskanalysisreport',
+            index=models.Index(fields=['report_start_datetime', 'run_id'], name='reporting_tar_start_run'),
+        ),
+        migrations.AddIndex(
+            model_name='taskreport',
+            index=models.Index(fields=['created_at', 'id'], name='reporting_report_created_id'),
+        ),
+        migrations.AddIndex(
+            model_name='tasksummaryreport',
+            index=models.Index(fields=['updated_at', 'task'], name='reporting_tsr_updated_task'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reporting', '0015_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='jobanalysisreport',
+            name='total_job_cost',
+            field=models.DecimalField(decimal_places=4, default=0.0, help_text='Total calculated cost for this entire job.', max_digits=18),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:20
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def delete_duplicate_reports(apps, schema_editor):
+    # unique_together treats NULL data_points as distinct, so a re-sent report
+    # without one could be stored twice. Keep the first copy of each and let the
+    # summaries of the affected tasks be rebuilt without the others. The
+    # constraint that prevents this is added by the next migration: Postgres
+    # cannot build an index in the transaction that deleted these rows.
+    TaskReport = apps.get_model('reporting', 'TaskReport')
+    TaskSummaryReportNew = apps.get_model('reporting', 'TaskSummaryReportNew')
+    duplicated = list(
+        TaskReport.objects.filter(data_point__isnull=True).order_by()
+        .values('run_id', 'task_id').annotate(copies=Count('id')).filter(copies__gt=1)
+    )
+    for identity in duplicated:
+        ids = list(
+            TaskReport.objects.filter(run_id=identity['run_id'], task_id=identity['task_id'], data_point__isnull=True)
+            .order_by('created_at', 'id').values_list('id', flat=True)
+        )
+        TaskReport.objects.filter(id__in=ids[1:]).delete()
+    TaskSummaryReportNew.objects.filter(task_id__in={identity['task_id'] for identity in duplicated}).update(
+        last_processed_report_sequence=None,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reporting', '0016_widen_total_job_cost'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_reports, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reporting', '0017_delete_duplicate_reports'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='taskreport',
+            constraint=models.UniqueConstraint(condition=models.Q(('data_point__isnull', True)), fields=('run_id', 'task'), name='reporting_report_run_task_no_dp'),
+        ),
+    ]
@@ -64,22 +64,181 @@ class TaskReport(models.Model):
 
     full_report = models.JSONField(help_text="Complete nested data report.")
     created_at = models.DateTimeField(auto_now_add=True)
+    sequence = models.BigIntegerField(null=True, blank=True, unique=True, editable=False,
+                                      help_text="Commit-ordered number, assigned once the report is visible (see report_sequence.py).")
 
     class Meta:
         unique_together = ('run_id', 'task', 'data_point')
+        constraints = [
+            # NULLs are distinct in unique_together: reports without a data_point
+            # are unique on (run_id, task) alone.
+            models.UniqueConstraint(fields=['run_id', 'task'], condition=models.Q(data_point__isnull=True),
+                                    name='reporting_report_run_task_no_dp'),
+        ]
         verbose_name = "Task Report"
         verbose_name_plural = "Task Reports"
+        indexes = [
+            # Keyset pagination of the report list (see pagination.py)
+            models.Index(fields=['created_at', 'id'], name='reporting_report_created_id'),
+            # Summary fold: a task's reports past its watermark
+            models.Index(fields=['task', 'sequence'], name='reporting_report_task_seq'),
+            # Reports still waiting for a sequence number
+            models.Index(fields=['created_at', 'id'], name='reporting_report_unnumbered',
+                         condition=models.Q(sequence__isnull=True)),
+        ]
 
     def __str__(self):
         return f"{self.service} / {self.data_point} ({self.run_id})"
 
+
+class TaskReportMetrics(models.Model):
+    """
+    Typed copy of the hot numeric keys of one TaskReport.full_report, extracted at
+    ingestion (see reporting/metrics.py) so summaries and analytics can use SQL
+    aggregates instead of decoding JSON. `task` and `created_at` are denormalised
+    from the report so per-task aggregates need no join.
+    """
+    report = models.OneToOneField('TaskReport', on_delete=models.CASCADE, primary_key=True, related_name='metrics')
+    task = models.ForeignKey('Task', on_delete=models.CASCADE, related_name='report_metrics')
+    created_at = models.DateTimeField(null=True, blank=True,
+                                      help_text="Copy of TaskReport.created_at.")
+
+    # --- Critical events and exceptions ---
+    critical_events_count = models.IntegerField(default=0)
+    login_exceptions_count = models.IntegerField(default=0)
+    page_detection_exceptions_count = models.IntegerField(default=0)
+    locate_element_exceptions_count = models.IntegerField(default=0)
+
+    # --- Login / 2FA (zero when the report has no login block) ---
+    has_login_metrics = models.BooleanField(default=False,
+                                            help_text="True if the report carried 'total_login_attempts'.")
+    total_login_attempts = models.IntegerField(default=0)
+    successful_logins = models.IntegerField(default=0)
+    failed_logins = models.IntegerField(default=0)
+    total_login_time = models.FloatField(default=0.0)
+    twofa_attempts = models.IntegerField(default=0)
+    twofa_successes = models.IntegerField(default=0)
+    twofa_failures = models.IntegerField(default=0)
+    twofa_total_time = models.FloatField(default=0.0)
+    total_attempt_failed = models.IntegerField(default=0)
+    logged_in = models.BooleanField(default=False,
+                                    help_text="bot_login_status_for_run was 'Logged In'.")
+
+    # --- Scraping, downloads and uploads ---
+    total_users_scraped = models.IntegerField(default=0)
+    downloaded_file_count = models.IntegerField(default=0)
+    storage_house_uploads = models.IntegerField(default=0)
+    failed_to_download_file_count = models.IntegerField(default=0)
+    storage_house_upload_failures = models.BooleanField(default=False)
+    found_next_page_info_count = models.IntegerField(default=0)
+    next_page_info_not_found_count = models.IntegerField(default=0)
+    has_next_page_info = models.BooleanField(null=True, blank=True)
+    has_billing_exception = models.BooleanField(default=False)
+
+    class Meta:
+        verbose_name = "Task Report Metrics"
+        verbose_name_plural = "Task Report Metrics"
+        indexes = [
+            models.Index(fields=['task', 'created_at'], name='reporting_metrics_task_ct'),
+            models.Index(fields=['created_at'], name='reporting_metrics_created'),
+        ]
+
+    def __str__(self):
+        return f"Metrics for report {self.report_id}"
+
+
+class ReportMetricRollup(models.Model):
+    """
+    TaskReportMetrics summed per (task, service, end_point) over one time bucket,
+    filled incrementally by reporting/metric_rollup.py so trend queries read a
+    few rows per bucket instead of every report. Reports without a service or
+    end point are rolled up under ''.
+    """
+    task = models.ForeignKey('Task', on_delete=models.CASCADE, related_name='+')
+    service = models.CharField(max_length=50, blank=True, default='')
+    end_point = models.CharField(max_length=50, blank=True, default='')
+    bucket_start = models.DateTimeField(help_text="Start of the (UTC) bucket the reports were created in.")
+    report_count = models.IntegerField(default=0)
+
+    # --- Sums of the TaskReportMetrics columns of the same name ---
+    critical_events_count = models.IntegerField(default=0)
+    login_exceptions_count = models.IntegerField(default=0)
+    page_detection_exceptions_count = models.IntegerField(default=0)
+    locate_element_exceptions_count = models.IntegerField(default=0)
+    total_login_attempts = models.IntegerField(default=0)
+    successful_logins = models.IntegerField(default=0)
+    failed_logins = models.IntegerField(default=0)
+    total_login_time = models.FloatField(default=0.0)
+    twofa_attempts = models.IntegerField(default=0)
+    twofa_successes = models.IntegerField(default=0)
+    twofa_failures = models.IntegerField(default=0)
+    twofa_total_time = models.FloatField(default=0.0)
+    total_attempt_failed = models.IntegerField(default=0)
+    total_users_scraped = models.IntegerField(default=0)
+    downloaded_file_count = models.IntegerField(default=0)
+    storage_house_uploads = models.IntegerField(default=0)
+    failed_to_download_file_count = models.IntegerField(default=0)
+    found_next_page_info_count = models.IntegerField(default=0)
+    next_page_info_not_found_count = models.IntegerField(default=0)
+
+    # --- Number of reports with the TaskReportMetrics flag set ---
+    storage_upload_failure_reports = models.IntegerField(default=0)
+    billing_exception_reports = models.IntegerField(default=0)
+    logged_in_reports = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return f"{self.__class__.__name__}(task_id={self.task_id}, {self.service}/{self.end_point} @ {self.bucket_start})"
+
+
+class ReportMetricRollupHourly(ReportMetricRollup):
+    class Meta:
+        verbose_name = "Hourly Report Metric Rollup"
+        verbose_name_plural = "Hourly Report Metric Rollups"
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'service', 'end_point', 'bucket_start'], name='reporting_rollup_hourly_key'),
+        ]
+        indexes = [
+            models.Index(fields=['bucket_start'], name='reporting_rollup_hourly_bkt'),
+        ]
+
+
+class ReportMetricRollupDaily(ReportMetricRollup):
+    class Meta:
+        verbose_name = "Daily Report Metric Rollup"
+        verbose_name_plural = "Daily Report Metric Rollups"
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'service', 'end_point', 'bucket_start'], name='reporting_rollup_daily_key'),
+        ]
+        indexes = [
+            models.Index(fields=['bucket_start'], name='reporting_rollup_daily_bkt'),
+        ]
+
+
+class RollupWatermark(models.Model):
+    """The last TaskReport (by sequence) counted by a streaming rollup job, or the last number assigned."""
+    name = models.CharField(max_length=50, primary_key=True)
+    # Highest TaskReport.sequence consumed (for 'report_sequence': assigned)
+    last_report_sequence = models.BigIntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Rollup Watermark"
+        verbose_name_plural = "Rollup Watermarks"
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_report_sequence}"
+
 class TaskSummaryReportNew(models.Model):
     
     task = models.OneToOneField('Task', on_delete=models.CASCADE, related_name='new_summary_report',null=True,blank=True)
 
     # --- Aggregated counts and summaries ---
     total_critical_events = models.IntegerField(default=0)
-    critical_events_summary = models.JSONField(default=list, blank=True)
+    critical_events_summary = models.JSONField(default=list, blank=True)  # most recent events only
+    critical_events_counts = models.JSONField(default=dict, blank=True)  # event type -> occurrences
 
     total_login_attempts = models.IntegerField(default=0)
     successful_logins = models.IntegerField(default=0)
@@ -92,19 +251,27 @@ class TaskSummaryReportNew(models.Model):
     total_2fa_time = models.FloatField(default=0.0)
 
     total_attempt_failed = models.IntegerField(default=0)
-    attempt_failed_errors = models.JSONField(default=list, blank=True)
-    failed_attempt_error_logs = models.JSONField(default=list, blank=True)
+    attempt_failed_errors = models.JSONField(default=list, blank=True)  # most recent error types only
+    attempt_failed_error_counts = models.JSONField(default=dict, blank=True)
+    failed_attempt_error_logs = models.JSONField(default=list, blank=True)  # most recent runs only
 
     login_exceptions_summary = models.JSONField(default=list, blank=True)
+    login_exceptions_counts = models.JSONField(default=dict, blank=True)
     login_exceptions_count = models.IntegerField(default=0)
 
     page_detection_exceptions_summary = models.JSONField(default=list, blank=True)
+    page_detection_exceptions_counts = models.JSONField(default=dict, blank=True)
     page_detection_exceptions_count = models.IntegerField(default=0)
 
     locate_element_exceptions_summary = models.JSONField(default=list, blank=True)
+    locate_element_exceptions_counts = models.JSONField(default=dict, blank=True)
     locate_element_exceptions_count = models.IntegerField(default=0)
 
     page_load_details = models.JSONField(default=dict, blank=True)
+    # Mergeable login / 2FA / per-URL page load time sketches (see latency_sketch.py)
+    latency_sketches = models.JSONField(default=dict, blank=True)
+    # Mergeable distinct counts of runs, page URLs and critical event types (see distinct_sketch.py)
+    distinct_sketches = models.JSONField(default=dict, blank=True)
 
     # --- Meta-Information about the aggregation ---
     total_reports_considered = models.IntegerField(default=0)
@@ -141,12 +308,21 @@ class TaskSummaryReportNew(models.Model):
     has_next_page_info = models.BooleanField(null=True, blank=True)  # Latest report info
 
     # Detailed failures and exceptions
-    failed_downloads_details = models.JSONField(default=list, blank=True)  # List of dicts or strings
+    failed_downloads_details = models.JSONField(default=list, blank=True)  # List of dicts or strings, most recent only
+    failed_downloads_counts = models.JSONField(default=dict, blank=True)
     storage_upload_failed = models.BooleanField(default=False)
     task_completion_status = models.CharField(max_length=255, blank=True, default='')  # Optional status
     has_billing_exception = models.BooleanField(default=False)
     specific_exception_reason = models.CharField(max_length=255, blank=True, default='')  # Optional description
 
+    # Cost of the task at the rates current when the summary last changed (see cost_engine.py)
+    task_cost = models.DecimalField(max_digits=12, decimal_places=4, default=0)
+    # What this summary last added to its job's JobAnalysisReport (see job_rollup.py)
+    job_contribution = models.JSONField(default=dict, blank=True)
+
+    # Watermark: the highest TaskReport.sequence folded into this summary
+    last_processed_report_sequence = models.BigIntegerField(null=True, blank=True)
+
     class Meta:
         verbose_name = "Task Summary Report"
         verbose_name_plural = "Task Summary Reports"
@@ -193,6 +369,12 @@ class TaskAnalysisReport(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the default (-report_start_datetime, -run_id) ordering
+            models.Index(fields=['report_start_datetime', 'run_id'], name='reporting_tar_start_run'),
+        ]
+
     def __str__(self):
         return f"Report for {self.report_start_datetime} - {self.overall_task_status}"
     
@@ -266,6 +448,10 @@ class TaskSummaryReport(models.Model):
         verbose_name = "Task Summary Report"
         verbose_name_plural = "Task Summary Reports"
         ordering = ['-updated_at']
+        indexes = [
+            # Keyset pagination of the default (-updated_at, -task_id) ordering
+            models.Index(fields=['updated_at', 'task'], name='reporting_tsr_updated_task'),
+        ]
 
     def __str__(self):
         return f"Summary for Task '{self.task.name}'"
@@ -309,7 +495,8 @@ class JobAnalysisReport(models.Model):
                                                 help_text="True if any task in this job had a billing issue.")
     billing_issue_tasks = models.JSONField(default=list, blank=True, null=True,
                                            help_text="List of task_uuids with billing issues in this job.")
-    total_job_cost = models.DecimalField(max_digits=10, decimal_places=4, default=0.0000,
+    # Sum of the tasks' TaskSummaryReportNew.task_cost (12 digits each), with room for many tasks
+    total_job_cost = models.DecimalField(max_digits=18, decimal_places=4, default=0.0000,
                                          help_text="Total calculated cost for this entire job.")
     
     # --- Device Metrics (aggregated or summarized) ---
@@ -0,0 +1,225 @@
+# reporting_and_analytics/pagination.py
+
+import base64
+import binascii
+import datetime
+import json
+from collections import OrderedDict
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+# Keyset (cursor) pagination for large list endpoints.
+#
+# LimitOffsetPagination runs COUNT(*) on every page and makes the database walk
+# past `offset` rows, so deep pages cost as much as the whole scan up to them.
+# KeysetPagination instead orders by the view's ordering plus the primary key
+# as a unique tiebreaker, and encodes the key of the last row returned in an
+# opaque cursor; the next page is "rows after that key", which an index on the
+# ordering columns answers directly at any depth. There is no total count.
+#
+# NULLs sort as the largest value (last ascending, first descending, Postgres'
+# default), so a plain index on the ordering columns serves both directions.
+# ?offset= still selects limit/offset pagination for small admin listings, up
+# to OFFSET_PAGINATION_MAX_OFFSET rows deep.
+
+MAX_PAGE_SIZE = getattr(settings, 'KEYSET_MAX_PAGE_SIZE', 1000)
+MAX_OFFSET = getattr(settings, 'OFFSET_PAGINATION_MAX_OFFSET', 10000)
+
+
+class CappedLimitOffsetPagination(LimitOffsetPagination):
+    """LimitOffsetPagination that refuses offsets past MAX_OFFSET."""
+    max_limit = MAX_PAGE_SIZE
+
+    def get_offset(self, request):
+        offset = super().get_offset(request)
+        if offset > MAX_OFFSET:
+            raise NotFound(f"Offsets beyond {MAX_OFFSET} are not supported; page with ?cursor= instead.")
+        return offset
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on (view ordering..., pk); see the module comment. Pages
+    are {"next": url, "previous": url, "results": [...]}; ?limit= sets the page
+    size.
+    """
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+    offset_query_param = 'offset'
+    max_limit = MAX_PAGE_SIZE
+
+    def __init__(self):
+        self.offset_paginator = None
+
+    def get_limit(self, request) -> int:
+        default = api_settings.PAGE_SIZE or 100
+        try:
+            limit = int(request.query_params.get(self.limit_query_param, default))
+        except ValueError:
+            return default
+        return min(limit, self.max_limit) if limit > 0 else default
+
+    def get_ordering(self, request, queryset, view) -> list:
+        for backend in getattr(view, 'filter_backends', ()):
+            if issubclass(backend, OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+                if ordering:
+                    return list(ordering)
+        return list(getattr(view, 'ordering', None) or queryset.query.order_by or queryset.model._meta.ordering)
+
+    def _keys(self, queryset, request, view) -> list:
+        """[(field name, descending, nullable)] of the page ordering, ending with the primary key."""
+        opts = queryset.model._meta
+        pk_name = opts.pk.attname
+        keys = []
+        for item in self.get_ordering(request, queryset, view):
+            descending = item.startswith('-')
+            name = item.lstrip('-')
+            if name == 'pk':
+                name = pk_name
+            field = opts.get_field(name)
+            name = field.attname
+            keys.append((name, descending, field.null))
+            if name == pk_name:
+                return keys
+        keys.append((pk_name, keys[0][1] if keys else False, False))
+        return keys
+
+    def key_columns(self, queryset, request, view) -> list:
+        """Columns a page row must carry for its cursor (for .values() querysets)."""
+        return [name for name, _, _ in self._keys(queryset, request, view)]
+
+    def _order_by(self, reverse: bool) -> list:
+        order_by = []
+        for name, descending, nullable in self.keys:
+            descending ^= reverse
+            if nullable:
+                order_by.append(F(name).desc(nulls_first=True) if descending else F(name).asc(nulls_last=True))
+            else:
+                order_by.append(f'-{name}' if descending else name)
+        return order_by
+
+    @staticmethod
+    def _beyond(name: str, descending: bool, nullable: bool, value):
+        """Rows whose `name` sorts strictly after `value`, or None if none can."""
+        if value is None:
+            return Q(**{f'{name}__isnull': False}) if descending else None
+        if descending:
+            return Q(**{f'{name}__lt': value})
+        beyond = Q(**{f'{name}__gt': value})
+        return beyond | Q(**{f'{name}__isnull': True}) if nullable else beyond
+
+    def _after(self, values, reverse: bool) -> Q:
+        """Keyset predicate: rows that sort after the row with key `values`."""
+        conditions = []
+        equal = Q()
+        for (name, descending, nullable), value in zip(self.keys, values):
+            beyond = self._beyond(name, descending ^ reverse, nullable, value)
+            if beyond is not None:
+                conditions.append(equal & beyond)
+            equal &= Q(**{f'{name}__isnull': True}) if value is None else Q(**{name: value})
+        return reduce(or_, conditions) if conditions else Q(pk__in=[])
+
+    def _row_key(self, row) -> list:
+        if isinstance(row, dict):
+            return [row[name] for name, _, _ in self.keys]
+        return [getattr(row, name) for name, _, _ in self.keys]
+
+    @staticmethod
+    def _jsonable(value):
+        # Full precision: a cursor rounded to milliseconds would skip or repeat rows.
+        if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+            return value.isoformat()
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        return str(value)
+
+    def encode_cursor(self, values, reverse: bool) -> str:
+        data = {'v': [self._jsonable(value) for value in values]}
+        if reverse:
+            data['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request, model):
+        """(key values, reverse) of the ?cursor= parameter, or None on the first page."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            values = data['v']
+            if len(values) != len(self.keys):
+                raise ValueError
+            opts = model._meta
+            values = [
+                None if value is None else opts.get_field(name).to_python(value)
+                for (name, _, _), value in zip(self.keys, values)
+            ]
+        except (TypeError, ValueError, KeyError, binascii.Error, ValidationError) as e:
+            raise NotFound("Invalid cursor.") from e
+        return values, bool(data.get('r'))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.offset_query_param in request.query_params:
+            self.offset_paginator = CappedLimitOffsetPagination()
+            return self.offset_paginator.paginate_queryset(queryset, request, view)
+
+        self.base_url = request.build_absolute_uri()
+        limit = self.get_limit(request)
+        self.keys = self._keys(queryset, request, view)
+        cursor = self.decode_cursor(request, queryset.model)
+        values, reverse = cursor or (None, False)
+
+        queryset = queryset.order_by(*self._order_by(reverse))
+        if values is not None:
+            queryset = queryset.filter(self._after(values, reverse))
+        rows = list(queryset[:limit + 1])
+        has_more = len(rows) > limit
+        del rows[limit:]
+        if reverse:
+            rows.reverse()
+
+        first = self._row_key(rows[0]) if rows else values
+        last = self._row_key(rows[-1]) if rows else values
+        has_previous = has_more if reverse else values is not None
+        has_next = values is not None if reverse else has_more
+        self.next_link = self.encode_cursor(last, False) if has_next and last is not None else None
+        self.previous_link = self.encode_cursor(first, True) if has_previous and first is not None else None
+        return rows
+
+    def get_next_link(self):
+        return self.next_link
+
+    def get_previous_link(self):
+        return self.previous_link
+
+    def get_paginated_response(self, data):
+        if self.offset_paginator is not None:
+            return self.offset_paginator.get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.next_link),
+            ('previous', self.previous_link),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,122 @@
+# reporting_and_analytics/parallel_reports.py
+
+import heapq
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count, Max, Min
+
+from .analysis_report import ReportAccumulator, accumulate_reports
+from .metrics import load_full_report
+from .models import TaskReport
+from .report_reader import stream
+
+logger = logging.getLogger(__name__)
+
+# Parallel compile_reports() over stored TaskReports.
+#
+# The reports are split into slices, by task or by created_at range, and every
+# slice is folded into a ReportAccumulator in a worker process that reads its own
+# rows from the database. The partial accumulators come back in slice order and
+# are merged into one compile_reports() result. Slices only carry filter kwargs,
+# so nothing but a dict is pickled on the way in.
+#
+# Workers are forked (or spawned) with no open database connection: the parent
+# closes its connections before starting the pool, and each worker opens its own.
+
+PARTITIONS = ("task", "created_at")
+SLICES_PER_WORKER = getattr(settings, 'PARALLEL_COMPILE_SLICES_PER_WORKER', 4)
+
+_REPORT_FIELDS = ('task_id', 'run_id', 'created_at', 'full_report')
+
+
+def report_dicts(reports_qs):
+    """Streams the decoded full_report of every report, with task_id/run_id filled in from the row."""
+    for row in stream(reports_qs, _REPORT_FIELDS):
+        report = load_full_report(row.full_report)
+        report.setdefault("task_id", str(row.task_id))
+        report.setdefault("run_id", str(row.run_id))
+        yield report
+
+
+def _task_slices(reports_qs, count: int) -> list:
+    """Task ids split into at most `count` slices of roughly equal report counts."""
+    task_counts = reports_qs.order_by().values('task_id').annotate(n=Count('id')).order_by('-n', 'task_id')
+    heap = []
+    for row in task_counts:
+        if len(heap) < count:
+            heapq.heappush(heap, (row['n'], len(heap), [row['task_id']]))
+        else:
+            total, index, task_ids = heapq.heappop(heap)
+            task_ids.append(row['task_id'])
+            heapq.heappush(heap, (total + row['n'], index, task_ids))
+    return [{'task_id__in': task_ids} for _, _, task_ids in sorted(heap, key=lambda item: item[1])]
+
+
+def _created_at_slices(reports_qs, count: int) -> list:
+    """Consecutive created_at ranges of equal length covering `reports_qs`, oldest first."""
+    bounds = reports_qs.order_by().aggregate(first=Min('created_at'), last=Max('created_at'))
+    if bounds['first'] is None:
+        return []
+    step = (bounds['last'] - bounds['first']) / count
+    if not step:
+        return [{}]
+    cuts = [bounds['first'] + step * i for i in range(1, count)]
+    slices = [{'created_at__lt': cuts[0]}]
+    slices += [{'created_at__gte': start, 'created_at__lt': end} for start, end in zip(cuts, cuts[1:])]
+    slices.append({'created_at__gte': cuts[-1]})
+    return slices
+
+
+def partition_reports(reports_qs, partition: str = "task", count: int = 1) -> list:
+    """Filter kwargs of at most `count` disjoint slices that together cover `reports_qs`."""
+    if partition not in PARTITIONS:
+        raise ValueError(f"Unknown partition '{partition}', expected one of {PARTITIONS}.")
+    if count <= 1:
+        return [{}]
+    if partition == "task":
+        return _task_slices(reports_qs, count)
+    return _created_at_slices(reports_qs, count)
+
+
+def _slice_queryset(filters: dict, report_slice: dict):
+    return TaskReport.objects.filter(**filters).filter(**report_slice).order_by('created_at', 'id')
+
+
+def compile_slice(filters: dict, report_slice: dict, keep_details: bool = True) -> ReportAccumulator:
+    """Folds the reports matching `filters` and `report_slice` (oldest first) into an accumulator."""
+    return accumulate_reports(report_dicts(_slice_queryset(filters, report_slice)), keep_details=keep_details)
+
+
+def _init_worker():
+    import django
+
+    django.setup()  # no-op in forked workers; spawned ones start without configured apps
+
+
+def compile_reports_parallel(filters: dict = None, workers: int = 1, partition: str = "task",
+                             keep_details: bool = True) -> dict:
+    """
+    compile_reports() over the TaskReports matching `filters` (TaskReport.objects
+    .filter() kwargs), folded by `workers` processes. Slices are merged in order,
+    so detail entries are oldest first with partition="created_at" and grouped by
+    task slice with partition="task". workers=1 folds everything in this process.
+    """
+    filters = filters or {}
+    reports_qs = TaskReport.objects.filter(**filters)
+    slices = partition_reports(reports_qs, partition, workers * SLICES_PER_WORKER if workers > 1 else 1)
+    total = ReportAccumulator(keep_details=keep_details)
+    if workers <= 1:
+        for report_slice in slices:
+            total.merge(compile_slice(filters, report_slice, keep_details))
+        return total.result()
+
+    logger.info(f"Compiling reports in {len(slices)} {partition} slices with {workers} workers.")
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        partials = executor.map(compile_slice, [filters] * len(slices), slices, [keep_details] * len(slices))
+        for partial in partials:
+            total.merge(partial)
+    return total.result()
@@ -0,0 +1,244 @@
+# reporting_and_analytics/pg_aggregation.py
+
+import json
+import logging
+from decimal import Decimal
+
+from django.db import connection
+
+from .metrics import COUNTER_KEYS, FLAG_KEYS, LOGIN_COUNTER_KEYS, LOGIN_TIME_KEYS
+from .models import TaskReport, TaskReportMetrics
+
+logger = logging.getLogger(__name__)
+
+# Postgres-only aggregation of TaskReport.full_report with JSONB operators.
+#
+# On Postgres the summary engine and metric extraction hand the JSON work to the
+# database: typed metrics are extracted with one INSERT ... SELECT, entry-type
+# counts with jsonb_array_elements and page load sums with jsonb_each, each in
+# one query per batch of tasks. The expressions mirror the Python code in
+# metrics.py and summary_engine.py, which stays the implementation for SQLite and
+# for rows whose full_report is not a JSON object (older rows stored a string).
+#
+# Every JSON key used below is a constant from this codebase, never user input.
+
+_TRUNC_TYPE_LENGTH = 100
+_INT_PATTERN = r'^\s*[-+]?\d+\s*$'
+_FLOAT_PATTERN = r'^\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?\s*$'
+
+
+def is_available() -> bool:
+    return connection.vendor == 'postgresql'
+
+
+def _ids_subquery(reports_qs):
+    """SQL and params selecting the ids of `reports_qs`."""
+    return reports_qs.order_by().values('id').query.sql_with_params()
+
+
+def _int_expr(value: str) -> str:
+    """JSONB value -> integer, like metrics._as_int()."""
+    return (
+        f"CASE jsonb_typeof({value}) "
+        f"WHEN 'number' THEN trunc(({value})::text::numeric)::bigint "
+        f"WHEN 'string' THEN CASE WHEN ({value} #>> '{{}}') ~ '{_INT_PATTERN}' "
+        f"THEN ({value} #>> '{{}}')::bigint ELSE 0 END "
+        f"WHEN 'boolean' THEN ({value})::text::boolean::int "
+        f"ELSE 0 END"
+    )
+
+
+def _float_expr(value: str) -> str:
+    """JSONB value -> float, like metrics._as_float()."""
+    return (
+        f"CASE jsonb_typeof({value}) "
+        f"WHEN 'number' THEN ({value})::text::float8 "
+        f"WHEN 'string' THEN CASE WHEN ({value} #>> '{{}}') ~ '{_FLOAT_PATTERN}' "
+        f"THEN ({value} #>> '{{}}')::float8 ELSE 0 END "
+        f"WHEN 'boolean' THEN ({value})::text::boolean::int::float8 "
+        f"ELSE 0 END"
+    )
+
+
+def _truthy_expr(value: str) -> str:
+    """Python truthiness of a JSONB value; a missing key is false."""
+    return (
+        f"COALESCE({value} NOT IN ('null'::jsonb, 'false'::jsonb, '0'::jsonb, "
+        f"'\"\"'::jsonb, '[]'::jsonb, '{{}}'::jsonb), false)"
+    )
+
+
+def _report_value(key: str) -> str:
+    return f"(r.full_report -> '{key}')"
+
+
+def _metric_expressions() -> dict:
+    """TaskReportMetrics column -> SQL expression over the report row `r`."""
+    has_login = "jsonb_exists(r.full_report, 'total_login_attempts')"
+    expressions = {column: _int_expr(_report_value(key)) for column, key in COUNTER_KEYS.items()}
+    for column, key in LOGIN_COUNTER_KEYS.items():
+        expressions[column] = f"CASE WHEN {has_login} THEN {_int_expr(_report_value(key))} ELSE 0 END"
+    for column, key in LOGIN_TIME_KEYS.items():
+        expressions[column] = f"CASE WHEN {has_login} THEN {_float_expr(_report_value(key))} ELSE 0 END"
+    expressions['has_login_metrics'] = has_login
+    expressions['total_users_scraped'] = _int_expr("(r.full_report -> 'scraped_data_summary' -> 'total_users_scraped')")
+    for column, key in FLAG_KEYS.items():
+        expressions[column] = _truthy_expr(_report_value(key))
+    expressions['logged_in'] = "COALESCE(r.full_report ->> 'bot_login_status_for_run' = 'Logged In', false)"
+    has_next_page_info = _report_value('has_next_page_info')
+    expressions['has_next_page_info'] = (
+        f"CASE WHEN COALESCE({has_next_page_info}, 'null'::jsonb) = 'null'::jsonb THEN NULL "
+        f"ELSE {_truthy_expr(has_next_page_info)} END"
+    )
+    return expressions
+
+
+def insert_missing_metrics(reports_qs) -> int:
+    """
+    Extracts TaskReportMetrics for the reports in `reports_qs` that have none yet,
+    with one INSERT ... SELECT. Reports whose full_report is not a JSON object are
+    left for the Python extractor.
+    """
+    ids_sql, params = _ids_subquery(reports_qs)
+    expressions = _metric_expressions()
+    columns = ', '.join(['report_id', 'task_id', 'created_at'] + list(expressions))
+    values = ',\n'.join(['r.id', 'r.task_id', 'r.created_at'] + list(expressions.values()))
+    sql = (
+        f"INSERT INTO {TaskReportMetrics._meta.db_table} ({columns})\n"
+        f"SELECT {values}\n"
+        f"FROM {TaskReport._meta.db_table} r\n"
+        f"WHERE r.id IN ({ids_sql})\n"
+        f"  AND jsonb_typeof(r.full_report) = 'object'\n"
+        f"  AND NOT EXISTS (SELECT 1 FROM {TaskReportMetrics._meta.db_table} m WHERE m.report_id = r.id)\n"
+        f"ON CONFLICT DO NOTHING"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def entry_type_counts_by_task(reports_qs, lists) -> dict:
+    """
+    Occurrences of every entry type in the given JSON arrays of the reports in
+    `reports_qs`, in one query: {task_id: {report_key: {entry_type: count}}}.
+
+    `lists` holds the full_report keys of arrays whose entries are keyed like
+    summary_engine.entry_type(). 'attempt_failed_errors' is special-cased as in
+    the summary engine: only reports with a login block count, and only entries
+    carrying a 'type'.
+    """
+    ids_sql, params = _ids_subquery(reports_qs)
+    list_values = ', '.join(f"('{key}')" for key in lists)
+    entry_type = (
+        "LEFT(CASE WHEN jsonb_typeof(e.value) = 'object' THEN COALESCE("
+        "NULLIF(e.value ->> 'type', ''), NULLIF(e.value ->> 'reason', ''), NULLIF(e.value ->> 'error', ''), 'unknown') "
+        f"ELSE e.value #>> '{{}}' END, {_TRUNC_TYPE_LENGTH})"
+    )
+    sql = (
+        f"SELECT r.task_id, k.name, {entry_type} AS entry_type, COUNT(*)\n"
+        f"FROM {TaskReport._meta.db_table} r\n"
+        f"CROSS JOIN (VALUES {list_values}) AS k(name)\n"
+        f"CROSS JOIN LATERAL jsonb_array_elements(CASE WHEN jsonb_typeof(r.full_report -> k.name) = 'array' "
+        f"THEN r.full_report -> k.name ELSE '[]'::jsonb END) AS e\n"
+        f"WHERE r.id IN ({ids_sql})\n"
+        f"  AND jsonb_typeof(r.full_report) = 'object'\n"
+        f"  AND (k.name <> 'attempt_failed_errors' OR (\n"
+        f"       jsonb_exists(r.full_report, 'total_login_attempts')\n"
+        f"       AND jsonb_typeof(e.value) = 'object' AND jsonb_exists(e.value, 'type')))\n"
+        f"GROUP BY 1, 2, 3"
+    )
+    counts = {}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for task_id, report_key, entry_type_value, count in cursor.fetchall():
+            task_counts = counts.setdefault(task_id, {}).setdefault(report_key, {})
+            task_counts[str(entry_type_value)] = count
+    return counts
+
+
+def _to_number(value: Decimal):
+    return int(value) if value == value.to_integral_value() else float(value)
+
+
+def page_load_details_by_task(reports_qs) -> dict:
+    """
+    page_load_details of the reports in `reports_qs`, merged per task in SQL:
+    {task_id: {url: (first_details, {key: sum})}}. `first_details` is the URL's
+    details object from the earliest report; the sums cover every numeric value.
+    """
+    ids_sql, params = _ids_subquery(reports_qs)
+    report_table = TaskReport._meta.db_table
+    page_loads = (
+        "jsonb_each(CASE WHEN jsonb_typeof(r.full_report -> 'page_load_details') = 'object' "
+        "THEN r.full_report -> 'page_load_details' ELSE '{}'::jsonb END) AS p"
+    )
+    sums_sql = (
+        f"SELECT r.task_id, p.key, v.key,\n"
+        f"       SUM(CASE jsonb_typeof(v.value) WHEN 'boolean' THEN (v.value)::text::boolean::int::numeric "
+        f"ELSE (v.value)::text::numeric END)\n"
+        f"FROM {report_table} r\n"
+        f"CROSS JOIN LATERAL {page_loads}\n"
+        f"CROSS JOIN LATERAL jsonb_each(CASE WHEN jsonb_typeof(p.value) = 'object' THEN p.value ELSE '{{}}'::jsonb END) AS v\n"
+        f"WHERE r.id IN ({ids_sql})\n"
+        f"  AND jsonb_typeof(r.full_report) = 'object'\n"
+        f"  AND jsonb_typeof(v.value) IN ('number', 'boolean')\n"
+        f"GROUP BY 1, 2, 3"
+    )
+    first_sql = (
+        f"SELECT DISTINCT ON (r.task_id, p.key) r.task_id, p.key, p.value\n"
+        f"FROM {report_table} r\n"
+        f"CROSS JOIN LATERAL {page_loads}\n"
+        f"WHERE r.id IN ({ids_sql})\n"
+        f"  AND jsonb_typeof(r.full_report) = 'object'\n"
+        f"ORDER BY r.task_id, p.key, r.created_at, r.id"
+    )
+
+    merged = {}
+    with connection.cursor() as cursor:
+        cursor.execute(first_sql, params)
+        for task_id, url, details in cursor.fetchall():
+            # Django registers jsonb to come back undecoded from raw cursors.
+            if isinstance(details, str):
+                details = json.loads(details)
+            merged.setdefault(task_id, {})[url] = (details, {})
+        cursor.execute(sums_sql, params)
+        for task_id, url, key, total in cursor.fetchall():
+            merged[task_id][url][1][key] = _to_number(total)
+    return merged
+
+
+def page_load_times(reports_qs):
+    """
+    (task_id, url, total_page_load_time) of every numeric page load time in the
+    page_load_details of the reports in `reports_qs`, for the latency sketches.
+    """
+    ids_sql, params = _ids_subquery(reports_qs)
+    sql = (
+        f"SELECT r.task_id, p.key, (p.value -> 'total_page_load_time')::text::float8\n"
+        f"FROM {TaskReport._meta.db_table} r\n"
+        f"CROSS JOIN LATERAL jsonb_each(CASE WHEN jsonb_typeof(r.full_report -> 'page_load_details') = 'object' "
+        f"THEN r.full_report -> 'page_load_details' ELSE '{{}}'::jsonb END) AS p\n"
+        f"WHERE r.id IN ({ids_sql})\n"
+        f"  AND jsonb_typeof(r.full_report) = 'object'\n"
+        f"  AND jsonb_typeof(p.value -> 'total_page_load_time') = 'number'\n"
+        f"ORDER BY r.created_at, r.id"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        yield from cursor
+
+
+def page_load_urls(reports_qs):
+    """Distinct (task_id, url) pairs of the page_load_details of the reports in `reports_qs`."""
+    ids_sql, params = _ids_subquery(reports_qs)
+    sql = (
+        f"SELECT DISTINCT r.task_id, p.url\n"
+        f"FROM {TaskReport._meta.db_table} r\n"
+        f"CROSS JOIN LATERAL jsonb_object_keys(CASE WHEN jsonb_typeof(r.full_report -> 'page_load_details') = 'object' "
+        f"THEN r.full_report -> 'page_load_details' ELSE '{{}}'::jsonb END) AS p(url)\n"
+        f"WHERE r.id IN ({ids_sql})\n"
+        f"  AND jsonb_typeof(r.full_report) = 'object'"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        yield from cursor
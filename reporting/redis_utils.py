@@ -0,0 +1,12 @@
+# reporting_and_analytics/redis_utils.py
+
+from django_redis import get_redis_connection
+
+
+def get_redis():
+    """
+    Raw redis-py client for the Redis instance behind the `default` cache
+    (settings.REDIS_HOST). Use it for data structures the Django cache API
+    does not cover (streams, sets, hashes).
+    """
+    return get_redis_connection("default")
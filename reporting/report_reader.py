@@ -0,0 +1,40 @@
+# reporting_and_analytics/report_reader.py
+
+from django.conf import settings
+
+# Streaming reads of report and summary rows.
+#
+# Iterating a queryset directly caches every row on the queryset, and each row
+# carries all of its JSON columns; for a task with a large history that is the
+# whole history in worker memory at once. The helpers here load only the columns
+# a consumer asks for and fetch rows `chunk_size` at a time through
+# QuerySet.iterator(), which uses a server-side cursor on Postgres (unless
+# DISABLE_SERVER_SIDE_CURSORS is set for a transaction-pooling proxy) and
+# fetchmany() elsewhere. Nothing is cached, so a queryset can be re-read.
+
+READ_CHUNK_SIZE = getattr(settings, 'REPORT_READ_CHUNK_SIZE', 500)
+
+
+def stream(queryset, fields=None, chunk_size: int = None):
+    """
+    Iterates the rows of `queryset` without caching them. `fields` restricts the
+    loaded columns like QuerySet.only(); other fields are deferred and would cost
+    one query per row if touched, so list everything the loop reads (including
+    'task__<field>' for select_related tasks).
+    """
+    if fields:
+        queryset = queryset.only(*fields)
+    return queryset.iterator(chunk_size=chunk_size or READ_CHUNK_SIZE)
+
+
+def stream_chunks(queryset, fields=None, chunk_size: int = None):
+    """stream() grouped into lists of at most `chunk_size` rows, for batched writes."""
+    chunk_size = chunk_size or READ_CHUNK_SIZE
+    chunk = []
+    for row in stream(queryset, fields, chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
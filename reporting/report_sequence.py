@@ -0,0 +1,101 @@
+# reporting_and_analytics/report_sequence.py
+
+import logging
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max, Q
+
+from . import pg_aggregation
+from .models import RollupWatermark, TaskReport
+
+logger = logging.getLogger(__name__)
+
+# Commit-ordered sequence numbers for TaskReport.
+#
+# created_at is assigned when a report is inserted, not when its transaction
+# commits: a long bulk, NDJSON or async-drain transaction can make reports
+# visible long after others with a later created_at, so no watermark on
+# created_at is safe for consumers that read every report exactly once.
+#
+# assign_report_sequence() numbers reports once they are visible. Under a lock
+# on the counter row it gives the visible reports without a number the next
+# numbers, in (created_at, id) order, and commits. Numbering runs never overlap,
+# so the numbered reports always form the prefix 1..N of the sequence and a
+# report that commits late just gets a higher number. The summary fold and the
+# metric rollup keep their watermarks on this number and call
+# assign_report_sequence() before reading: a report at or below a watermark has
+# been consumed and none can appear there later.
+
+COUNTER_NAME = 'report_sequence'
+BATCH_SIZE = getattr(settings, 'REPORT_SEQUENCE_BATCH_SIZE', 5000)
+_BULK_UPDATE_BATCH_SIZE = 500
+
+
+def lock_watermark(name: str) -> RollupWatermark:
+    """The RollupWatermark row `name`, created if needed and locked until the transaction ends."""
+    RollupWatermark.objects.get_or_create(name=name)
+    return RollupWatermark.objects.select_for_update().get(name=name)
+
+
+def sequence_window(field: str, after=None, upto=None) -> Q:
+    """Rows whose sequence `field` is in the half-open range (after, upto]; after=None starts at the first."""
+    window = Q(**{f'{field}__gt': after}) if after is not None else Q(**{f'{field}__isnull': False})
+    if upto is not None:
+        window &= Q(**{f'{field}__lte': upto})
+    return window
+
+
+def _number_batch(last: int, batch_size: int):
+    """Numbers up to `batch_size` unnumbered reports after `last`; returns (reports seen, highest number)."""
+    table = TaskReport._meta.db_table
+    if pg_aggregation.is_available():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} r SET sequence = n.sequence\n"
+                f"FROM (\n"
+                f"  SELECT id, %s + row_number() OVER (ORDER BY created_at, id) AS sequence\n"
+                f"  FROM {table} WHERE sequence IS NULL ORDER BY created_at, id LIMIT %s\n"
+                f") n\n"
+                f"WHERE r.id = n.id\n"
+                f"RETURNING r.sequence",
+                [last, batch_size],
+            )
+            numbers = [number for number, in cursor.fetchall()]
+        return len(numbers), max(numbers, default=last)
+
+    ids = list(
+        TaskReport.objects.filter(sequence__isnull=True)
+        .order_by('created_at', 'id').values_list('id', flat=True)[:batch_size]
+    )
+    TaskReport.objects.bulk_update(
+        [TaskReport(id=report_id, sequence=last + offset) for offset, report_id in enumerate(ids, start=1)],
+        ['sequence'], batch_size=_BULK_UPDATE_BATCH_SIZE,
+    )
+    return len(ids), last + len(ids)
+
+
+def assign_report_sequence(batch_size: int = None) -> int:
+    """
+    Numbers every visible report that has no sequence number yet, one
+    transaction per `batch_size` reports. Returns the number of reports numbered.
+    """
+    batch_size = batch_size or BATCH_SIZE
+    numbered = 0
+    while True:
+        with transaction.atomic():
+            counter = lock_watermark(COUNTER_NAME)
+            last = counter.last_report_sequence
+            if last is None:
+                # First run: continue after the reports numbered by migration 0008.
+                last = TaskReport.objects.aggregate(last=Max('sequence'))['last'] or 0
+            count, highest = _number_batch(last, batch_size)
+            if count or counter.last_report_sequence is None:
+                counter.last_report_sequence = highest
+                counter.save()
+        numbered += count
+        if count < batch_size:
+            break
+    if numbered:
+        logger.debug(f"Numbered {numbered} new reports.")
+    return numbered
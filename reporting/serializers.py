@@ -1,7 +1,9 @@
 # reporting_and_analytics/serializers.py
 
 from rest_framework import serializers
-from .models import Task, TaskAnalysisReport, JobAnalysisReport, CostUnitConfig,TaskSummaryReportNew
+from .models import Task, TaskAnalysisReport, JobAnalysisReport, CostUnitConfig,TaskSummaryReportNew,TaskReport
+from .distinct_sketch import DistinctSketches
+from .latency_sketch import LatencySketches
 import datetime
 import uuid
 
@@ -28,6 +30,8 @@ class TaskAnalysisReportSerializer(serializers.ModelSerializer):
 
     # For output (GET requests), we represent the associated Task's UUID.
     output_task_uuid = serializers.SerializerMethodField(source='task_uuid')
+    # Column and converter of the computed field for the .values() list path (see fast_serializers)
+    values_sources = {'output_task_uuid': ('task_id', str)}
 
     class Meta:
         model = TaskAnalysisReport
@@ -195,25 +199,90 @@ class TaskSummaryReportNewSerializer(serializers.ModelSerializer):
 
     
     # Explicitly define JSON fields for clarity and documentation
+    # The *_summary/error lists hold only the most recent entries; the *_counts
+    # fields count every entry by type (full history: task-summaries/<uuid>/history/<kind>/).
     critical_events_summary = serializers.JSONField()
+    critical_events_counts = serializers.JSONField()
     attempt_failed_errors = serializers.JSONField()
+    attempt_failed_error_counts = serializers.JSONField()
     failed_attempt_error_logs = serializers.JSONField()
     login_exceptions_summary = serializers.JSONField()
+    login_exceptions_counts = serializers.JSONField()
     page_detection_exceptions_summary = serializers.JSONField()
+    page_detection_exceptions_counts = serializers.JSONField()
     locate_element_exceptions_summary = serializers.JSONField()
+    locate_element_exceptions_counts = serializers.JSONField()
+    failed_downloads_counts = serializers.JSONField()
     page_load_details = serializers.JSONField()
+    # p50/p90/p99 of login, 2FA and per-URL page load times, from the stored sketches
+    latency_percentiles = serializers.SerializerMethodField()
+    # Approximate distinct runs, page URLs and critical event types, from the stored sketches
+    distinct_counts = serializers.SerializerMethodField()
+    # Model fields read by the computed fields, for ?fields= / ?exclude= (see sparse_fields)
+    sparse_field_sources = {'latency_percentiles': ['latency_sketches'], 'distinct_counts': ['distinct_sketches']}
 
     class Meta:
         model = TaskSummaryReportNew
-        fields = '__all__'
+        exclude = ['latency_sketches', 'distinct_sketches']
         read_only_fields = [
             'id', 'task', 'task_details',
             'critical_events_summary',
+            'critical_events_counts',
             'attempt_failed_errors',
+            'attempt_failed_error_counts',
             'failed_attempt_error_logs',
             'login_exceptions_summary',
+            'login_exceptions_counts',
             'page_detection_exceptions_summary',
+            'page_detection_exceptions_counts',
             'locate_element_exceptions_summary',
+            'locate_element_exceptions_counts',
+            'failed_downloads_counts',
             'page_load_details',
+            'latency_percentiles',
+            'distinct_counts',
             # add any other fields in your model
-        ]
\ No newline at end of file
+        ]
+
+    def get_latency_percentiles(self, obj):
+        return LatencySketches(obj.latency_sketches).percentiles()
+
+    def get_distinct_counts(self, obj):
+        return DistinctSketches(obj.distinct_sketches).counts()
+
+
+class JobAnalysisReportSerializer(serializers.ModelSerializer):
+    """
+    Read-only job-level totals, maintained incrementally from the job's task
+    summaries (see job_rollup).
+    """
+    billing_issue_tasks = serializers.JSONField()
+
+    class Meta:
+        model = JobAnalysisReport
+        fields = '__all__'
+
+
+class TaskReportHistoryEntrySerializer(serializers.Serializer):
+    """
+    One TaskReport's raw entries of a single summary list (critical events,
+    exceptions, failed downloads...), as returned by the summary history endpoint.
+    """
+    report_id = serializers.UUIDField(source='id')
+    run_id = serializers.UUIDField()
+    service = serializers.CharField(allow_null=True)
+    data_point = serializers.CharField(allow_null=True)
+    created_at = serializers.DateTimeField()
+    entries = serializers.JSONField()
+
+
+class TaskReportSerializer(serializers.ModelSerializer):
+    """Read-only raw TaskReport rows, as listed by the report list endpoint."""
+    task_uuid = serializers.UUIDField(source='task_id', read_only=True)
+
+    class Meta:
+        model = TaskReport
+        fields = [
+            'id', 'task_uuid', 'run_id', 'service', 'end_point', 'data_point',
+            'report_start_datetime', 'report_end_datetime', 'created_at', 'full_report',
+        ]
@@ -0,0 +1,37 @@
+# reporting_and_analytics/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import summary_cache
+from .cost_engine import cost_rates
+from .job_rollup import retract_job_contribution
+from .models import CostUnitConfig, Task, TaskSummaryReportNew
+from .task_cache import known_tasks
+
+
+@receiver(post_delete, sender=Task)
+def forget_deleted_task(sender, instance, **kwargs):
+    """Keeps the known-task cache used by ingestion from vouching for deleted Tasks."""
+    known_tasks.forget([instance.uuid])
+
+
+@receiver(post_delete, sender=TaskSummaryReportNew)
+def retract_deleted_summary(sender, instance, **kwargs):
+    """Takes a deleted summary (e.g. of a deleted Task) out of its job's totals."""
+    retract_job_contribution(instance)
+    summary_cache.forget(instance.task_id)
+
+
+@receiver(post_save, sender=TaskSummaryReportNew)
+def publish_saved_summary(sender, instance, **kwargs):
+    """Points the summary response cache at a summary saved outside the fold (e.g. update_task_summaries)."""
+    summary_cache.publish_versions([instance])
+
+
+@receiver(post_save, sender=CostUnitConfig)
+@receiver(post_delete, sender=CostUnitConfig)
+def invalidate_cost_rates(sender, instance, **kwargs):
+    """Makes every process reload cost rates once the change is committed."""
+    transaction.on_commit(cost_rates.invalidate)
@@ -0,0 +1,123 @@
+# reporting_and_analytics/sparse_fields.py
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+
+# Sparse fieldsets: ?fields=a,b,c / ?exclude=x,y on read endpoints.
+#
+# The selected serializer fields decide both what is rendered and what is read:
+# list views load only the model columns those fields use (QuerySet.only()), so
+# large JSON columns nobody asked for never leave the database. A serializer
+# field reads the model field named by its `source`; computed fields declare
+# theirs in the serializer's `sparse_field_sources`. A selection that includes
+# a field whose columns are unknown loads every column.
+#
+# List views may leave heavy fields out by default (`default_exclude`); any
+# ?fields= or ?exclude= replaces that default and ?fields=__all__ asks for every
+# field.
+
+FIELDS_PARAM = 'fields'
+EXCLUDE_PARAM = 'exclude'
+ALL_FIELDS = '__all__'
+
+
+def _names(value: str) -> list:
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def select_fields(request, available, default_exclude=()):
+    """
+    The serializer field names (in serializer order) selected by the request's
+    ?fields= / ?exclude=, or None when every field is selected.
+    """
+    params = request.query_params
+    fields = _names(params[FIELDS_PARAM]) if FIELDS_PARAM in params else None
+    if fields == [ALL_FIELDS]:
+        fields = None
+    if EXCLUDE_PARAM in params:
+        exclude = set(_names(params[EXCLUDE_PARAM]))
+    else:
+        exclude = set() if FIELDS_PARAM in params else set(default_exclude)
+
+    for param, names in ((FIELDS_PARAM, fields or ()), (EXCLUDE_PARAM, exclude)):
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            raise ValidationError({param: f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(available)}."})
+
+    if fields is None and not exclude:
+        return None
+    return [name for name in available if (fields is None or name in fields) and name not in exclude]
+
+
+def model_fields_for(serializer, selected):
+    """
+    Names of the model fields the `selected` fields of `serializer` read, or
+    None if some field's columns cannot be determined.
+    """
+    opts = serializer.Meta.model._meta
+    declared_sources = getattr(serializer, 'sparse_field_sources', {})
+    model_fields = set()
+    for name in selected:
+        if name in declared_sources:
+            model_fields.update(declared_sources[name])
+            continue
+        source = serializer.fields[name].source
+        if source == '*':
+            return None
+        try:
+            model_fields.add(opts.get_field(source.split('.')[0]).name)
+        except FieldDoesNotExist:
+            return None  # a property or method of the model
+    return model_fields
+
+
+class SparseFieldsMixin:
+    """
+    Generic list view mixin applying ?fields= / ?exclude= to the serializer and
+    to the columns loaded (see the module comment).
+    """
+    default_exclude = ()
+
+    def get_selected_fields(self):
+        if not hasattr(self, '_selected_fields'):
+            available = list(self.get_serializer_class()().fields)
+            self._selected_fields = select_fields(self.request, available, self.default_exclude)
+        return self._selected_fields
+
+    def get_always_loaded_fields(self, queryset) -> set:
+        """Model fields read outside the serializer: the primary key and the keyset pagination ordering."""
+        opts = queryset.model._meta
+        names = {opts.pk.name}
+        get_ordering = getattr(self.paginator, 'get_ordering', None)
+        if get_ordering is not None:
+            for item in get_ordering(self.request, queryset, self):
+                name = item.lstrip('-')
+                names.add(opts.pk.name if name == 'pk' else opts.get_field(name).name)
+        return names
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        selected = self.get_selected_fields()
+        if selected is None:
+            return queryset
+        model_fields = model_fields_for(self.get_serializer_class()(), selected)
+        if model_fields is None:
+            return queryset
+        select_related = queryset.query.select_related
+        if isinstance(select_related, dict) and not set(select_related) <= model_fields:
+            # select_related() cannot follow a deferred relation.
+            kept = set(select_related) & model_fields
+            queryset = queryset.select_related(None)
+            if kept:
+                queryset = queryset.select_related(*kept)
+        return queryset.only(*(model_fields | self.get_always_loaded_fields(queryset)))
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        selected = self.get_selected_fields()
+        if selected is not None:
+            fields = getattr(serializer, 'child', serializer).fields
+            for name in list(fields):
+                if name not in selected:
+                    fields.pop(name)
+        return serializer
@@ -0,0 +1,137 @@
+# reporting_and_analytics/summary_cache.py
+
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django_redis.exceptions import ConnectionInterrupted
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+# Response cache for the task summary detail endpoint.
+#
+# The serialized payload of a summary is cached under its task UUID and its
+# updated_at (the "version"), next to a pointer holding the current version of
+# each task. Whoever writes summaries publishes the new version to the pointer
+# once the transaction commits (publish_versions()); a payload is only ever
+# served for the version the pointer names, so a reader that raced a write and
+# cached the old payload merely leaves an unreferenced entry behind.
+#
+# When the payload for the current version is missing, one request per task
+# rebuilds it under a short lock while the others wait for it (up to
+# LOCK_WAIT_SECONDS) instead of all reading and serializing the same row. If the
+# cache is unreachable every request reads the database.
+
+CACHE_SECONDS = getattr(settings, 'SUMMARY_CACHE_SECONDS', 300)
+LOCK_SECONDS = getattr(settings, 'SUMMARY_CACHE_LOCK_SECONDS', 10)
+LOCK_WAIT_SECONDS = getattr(settings, 'SUMMARY_CACHE_LOCK_WAIT_SECONDS', 2)
+_POLL_SECONDS = 0.05
+
+CACHE_ERRORS = (ConnectionInterrupted, RedisError)
+
+
+def _version(updated_at) -> str:
+    return updated_at.isoformat()
+
+
+def version_key(task_uuid) -> str:
+    return f'reporting:summary:{task_uuid}:version'
+
+
+def payload_key(task_uuid, version: str) -> str:
+    return f'reporting:summary:{task_uuid}:{version}'
+
+
+def lock_key(task_uuid) -> str:
+    return f'reporting:summary:{task_uuid}:lock'
+
+
+def _store(task_uuid, updated_at, payload) -> None:
+    version = _version(updated_at)
+    cache.set(payload_key(task_uuid, version), payload, CACHE_SECONDS)
+    # Only fills an empty pointer: a writer may have published a newer version
+    # since this payload was read.
+    cache.add(version_key(task_uuid), version, CACHE_SECONDS)
+
+
+def _wait_for_payload(task_uuid):
+    """The payload of the current version once another request has built it, or None."""
+    deadline = time.monotonic() + LOCK_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(_POLL_SECONDS)
+        version = cache.get(version_key(task_uuid))
+        if version is not None:
+            payload = cache.get(payload_key(task_uuid, version))
+            if payload is not None:
+                return payload
+        if cache.get(lock_key(task_uuid)) is None:
+            return None
+    return None
+
+
+def get_summary_payload(task_uuid, build):
+    """
+    Cached serialized summary of `task_uuid`. `build()` returns (updated_at,
+    payload) from the database and is called at most once per task and version
+    while other requests wait; exceptions it raises (e.g. Http404) propagate.
+    """
+    try:
+        version = cache.get(version_key(task_uuid))
+        if version is not None:
+            payload = cache.get(payload_key(task_uuid, version))
+            if payload is not None:
+                return payload
+        if not cache.add(lock_key(task_uuid), 1, LOCK_SECONDS):
+            payload = _wait_for_payload(task_uuid)
+            if payload is not None:
+                return payload
+            # The rebuild is slow or failed: serve this request from the database.
+            return build()[1]
+    except CACHE_ERRORS as e:
+        logger.warning(f"Summary cache unavailable, reading task {task_uuid} from the database: {e}")
+        return build()[1]
+
+    try:
+        updated_at, payload = build()
+        try:
+            _store(task_uuid, updated_at, payload)
+        except CACHE_ERRORS as e:
+            logger.warning(f"Could not cache the summary of task {task_uuid}: {e}")
+        return payload
+    finally:
+        try:
+            cache.delete(lock_key(task_uuid))
+        except CACHE_ERRORS:
+            pass  # expires after LOCK_SECONDS
+
+
+def _publish(versions: dict) -> None:
+    try:
+        cache.set_many(versions, CACHE_SECONDS)
+    except CACHE_ERRORS as e:
+        logger.warning(f"Could not publish {len(versions)} summary versions: {e}")
+
+
+def publish_versions(summaries) -> None:
+    """
+    Points the cache at the new version of each written summary once the
+    current transaction commits (immediately outside one).
+    """
+    versions = {
+        version_key(summary.task_id): _version(summary.updated_at) for summary in summaries if summary.task_id
+    }
+    if versions:
+        transaction.on_commit(lambda: _publish(versions))
+
+
+def forget(task_uuid) -> None:
+    """Drops the version pointer of a deleted summary once the deletion commits."""
+    def _delete():
+        try:
+            cache.delete(version_key(task_uuid))
+        except CACHE_ERRORS as e:
+            logger.warning(f"Could not drop the cached summary of task {task_uuid}: {e}")
+    transaction.on_commit(_delete)
@@ -0,0 +1,472 @@
+# reporting_and_analytics/summary_engine.py
+
+import logging
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BooleanField, CharField, Count, F, Func, Max, Q, Value
+from django.db.models.fields.json import KeyTransform
+from django.utils import timezone
+
+from . import pg_aggregation
+from .distinct_sketch import DistinctSketches
+from .job_rollup import apply_job_deltas
+from .latency_sketch import LatencySketches
+from .metrics import aggregate_report_metrics_by_task, backfill_missing_metrics, load_full_report
+from .models import Task, TaskReport, TaskReportMetrics, TaskSummaryReportNew
+from .report_reader import stream
+from .report_sequence import assign_report_sequence, sequence_window
+from .summary_cache import publish_versions
+
+logger = logging.getLogger(__name__)
+
+# Fold-forward summarization of TaskReports into TaskSummaryReportNew.
+#
+# The summary row itself holds the accumulators (counters, lists, merged page
+# load details) plus a watermark: the sequence number (see report_sequence) of
+# the last report folded in. Each run first numbers the reports that became
+# visible since the last one and then only reads reports past the watermark, so
+# its cost depends on the number of new reports rather than on the task's whole
+# history. Sequence numbers follow commit order, so a report whose transaction
+# commits late is folded by the next run instead of being skipped.
+
+FOLD_CHUNK_SIZE = getattr(settings, 'SUMMARY_FOLD_CHUNK_SIZE', 500)
+
+# Event/error lists keep only their most recent entries next to per-type counts;
+# the full history stays in TaskReport (see the summary history endpoint).
+SAMPLE_SIZE = getattr(settings, 'SUMMARY_SAMPLE_SIZE', 50)
+ERROR_LOG_SAMPLE_SIZE = getattr(settings, 'SUMMARY_ERROR_LOG_SAMPLE_SIZE', 20)
+MAX_COUNT_KEYS = getattr(settings, 'SUMMARY_MAX_COUNT_KEYS', 200)
+OTHER_COUNT_KEY = '__other__'
+_MAX_TYPE_LENGTH = 100
+
+# (capped sample field, counts field, TaskReport.full_report key)
+SAMPLED_LISTS = (
+    ('critical_events_summary', 'critical_events_counts', 'critical_events_summary'),
+    ('login_exceptions_summary', 'login_exceptions_counts', 'login_exceptions_summary'),
+    ('page_detection_exceptions_summary', 'page_detection_exceptions_counts', 'page_detection_exceptions_summary'),
+    ('locate_element_exceptions_summary', 'locate_element_exceptions_counts', 'locate_element_exceptions_summary'),
+    ('failed_downloads_details', 'failed_downloads_counts', 'failed_downloads_details'),
+)
+
+# Summary list field -> TaskReport.full_report key holding its full history
+HISTORY_REPORT_KEYS = dict(
+    [(sample_field, report_key) for sample_field, _, report_key in SAMPLED_LISTS],
+    attempt_failed_errors='attempt_failed_errors',
+)
+
+# Summary fields that accumulate across reports; reset by a full rebuild.
+ACCUMULATOR_FIELDS = (
+    'total_critical_events', 'critical_events_summary', 'critical_events_counts',
+    'total_login_attempts', 'successful_logins', 'failed_logins', 'total_login_time',
+    'total_2fa_attempts', 'total_2fa_successes', 'total_2fa_failures', 'total_2fa_time',
+    'total_attempt_failed', 'attempt_failed_errors', 'attempt_failed_error_counts', 'failed_attempt_error_logs',
+    'login_exceptions_summary', 'login_exceptions_counts', 'login_exceptions_count',
+    'page_detection_exceptions_summary', 'page_detection_exceptions_counts', 'page_detection_exceptions_count',
+    'locate_element_exceptions_summary', 'locate_element_exceptions_counts', 'locate_element_exceptions_count',
+    'page_load_details', 'latency_sketches', 'distinct_sketches',
+    'total_reports_considered', 'first_report_datetime', 'last_report_datetime',
+    'latest_login_status',
+    'total_users_scraped', 'total_downloaded_files', 'total_storage_uploads',
+    'failed_to_download_file_count', 'found_next_page_info_count', 'next_page_info_not_found_count',
+    'failed_downloads_details', 'failed_downloads_counts', 'storage_upload_failed', 'task_completion_status',
+    'has_billing_exception', 'specific_exception_reason',
+    'last_processed_report_sequence',
+)
+
+# TaskSummaryReportNew counter -> aggregate_report_metrics() key
+SUMMED_COUNTERS = {
+    'total_critical_events': 'critical_events_count',
+    'login_exceptions_count': 'login_exceptions_count',
+    'page_detection_exceptions_count': 'page_detection_exceptions_count',
+    'locate_element_exceptions_count': 'locate_element_exceptions_count',
+    'total_login_attempts': 'total_login_attempts',
+    'successful_logins': 'successful_logins',
+    'failed_logins': 'failed_logins',
+    'total_login_time': 'total_login_time',
+    'total_2fa_attempts': 'twofa_attempts',
+    'total_2fa_successes': 'twofa_successes',
+    'total_2fa_failures': 'twofa_failures',
+    'total_2fa_time': 'twofa_total_time',
+    'total_attempt_failed': 'total_attempt_failed',
+    'total_users_scraped': 'total_users_scraped',
+    'total_downloaded_files': 'downloaded_file_count',
+    'total_storage_uploads': 'storage_house_uploads',
+    'failed_to_download_file_count': 'failed_to_download_file_count',
+    'found_next_page_info_count': 'found_next_page_info_count',
+    'next_page_info_not_found_count': 'next_page_info_not_found_count',
+}
+
+# Everything fold_task_summaries() may change on a summary.
+SAVED_FIELDS = ACCUMULATOR_FIELDS + (
+    'has_next_page_info', 'latest_task_status',
+    'latest_report_start_datetime', 'latest_report_end_datetime',
+    'latest_total_task_runtime', 'run_id_of_latest_report', 'updated_at', 'task_cost', 'job_contribution',
+)
+
+_REPORT_COLUMNS = (
+    'id', 'task_id', 'run_id', 'service', 'created_at', 'sequence',
+    'report_start_datetime', 'report_end_datetime',
+)
+# full_report keys the fold reads itself; the rest is aggregated in SQL.
+_FOLD_REPORT_KEYS = [report_key for _, _, report_key in SAMPLED_LISTS] + [
+    'attempt_failed_errors', 'task_completion_status', 'specific_exception_reason',
+    'has_next_page_info', 'status',
+]
+
+
+def reset_summary(summary: TaskSummaryReportNew) -> None:
+    """Puts every accumulator back to its model default and clears the watermark."""
+    for name in ACCUMULATOR_FIELDS:
+        setattr(summary, name, summary._meta.get_field(name).get_default())
+
+
+def _merge_page_load_details(merged: dict, page_load_details) -> None:
+    if not isinstance(page_load_details, dict):
+        return
+    for url, details in page_load_details.items():
+        if url not in merged:
+            merged[url] = details
+        elif isinstance(details, dict):
+            for key, val in details.items():
+                if isinstance(val, (int, float)):
+                    merged[url][key] = merged[url].get(key, 0) + val
+
+
+def entry_type(entry) -> str:
+    """Key an event/error entry is counted under: its 'type' (or similar) field, or the text itself."""
+    if isinstance(entry, dict):
+        for key in ('type', 'reason', 'error'):
+            if entry.get(key):
+                return str(entry[key])[:_MAX_TYPE_LENGTH]
+        return 'unknown'
+    return str(entry)[:_MAX_TYPE_LENGTH]
+
+
+def _count_entries(counts: dict, occurrences) -> None:
+    """Adds (entry_type, count) pairs to `counts`, capped at MAX_COUNT_KEYS types."""
+    for entry_key, count in occurrences:
+        if entry_key not in counts and len(counts) >= MAX_COUNT_KEYS:
+            entry_key = OTHER_COUNT_KEY
+        counts[entry_key] = counts.get(entry_key, 0) + count
+
+
+def _append_sample(sample: list, entries, size: int) -> None:
+    """Appends `entries` and keeps only the `size` most recent items."""
+    sample.extend(entries)
+    del sample[:max(len(sample) - size, 0)]
+
+
+def _as_list(value) -> list:
+    return value if isinstance(value, list) else []
+
+
+def _merge_page_load_sums(merged: dict, page_loads: dict) -> None:
+    """_merge_page_load_details() for the per-URL (first_details, sums) computed in SQL."""
+    for url, (first_details, sums) in page_loads.items():
+        if url not in merged:
+            merged[url] = dict(first_details) if isinstance(first_details, dict) else first_details
+            base = {}
+        else:
+            base = merged[url]
+        if isinstance(merged[url], dict):
+            for key, total in sums.items():
+                merged[url][key] = base.get(key, 0) + total
+
+
+def _fold_report(summary: TaskSummaryReportNew, report: TaskReport, full: dict, count_entries: bool = True) -> None:
+    """
+    Folds the list and last-value fields of one report; counters come from SQL.
+    With `count_entries=False` the entry-type counts and page load details are
+    left to the caller (see pg_aggregation).
+    """
+    for sample_field, counts_field, report_key in SAMPLED_LISTS:
+        entries = _as_list(full.get(report_key))
+        if count_entries:
+            _count_entries(getattr(summary, counts_field), ((entry_type(entry), 1) for entry in entries))
+        _append_sample(getattr(summary, sample_field), entries, SAMPLE_SIZE)
+    if count_entries:
+        _merge_page_load_details(summary.page_load_details, full.get('page_load_details', {}))
+
+    if 'total_login_attempts' in full:
+        errors = _as_list(full.get('attempt_failed_errors'))
+        error_types = [err.get('type') for err in errors if isinstance(err, dict) and 'type' in err]
+        if count_entries:
+            _count_entries(summary.attempt_failed_error_counts, ((entry_type(error_type), 1) for error_type in error_types))
+        _append_sample(summary.attempt_failed_errors, error_types, SAMPLE_SIZE)
+        _append_sample(summary.failed_attempt_error_logs, [{
+            "run_id": str(report.run_id),
+            "errors": errors,
+        }], ERROR_LOG_SAMPLE_SIZE)
+
+    summary.task_completion_status = full.get("task_completion_status", summary.task_completion_status)
+    summary.specific_exception_reason = full.get("specific_exception_reason", summary.specific_exception_reason)
+
+
+def _apply_latest_report(summary: TaskSummaryReportNew, report: TaskReport, full: dict) -> None:
+    start_ts = report.report_start_datetime
+    end_ts = report.report_end_datetime
+
+    summary.has_next_page_info = full.get('has_next_page_info')
+    summary.latest_task_status = full.get('status', report.service or 'unknown')
+    summary.latest_report_start_datetime = start_ts
+    summary.latest_report_end_datetime = end_ts
+    summary.latest_total_task_runtime = (
+        round((end_ts - start_ts).total_seconds(), 2)
+        if (start_ts and end_ts) else 0.0
+    )
+    summary.run_id_of_latest_report = report.run_id
+
+
+def _sql_fold_annotations() -> dict:
+    annotations = {f'json_{key}': KeyTransform(key, 'full_report') for key in _FOLD_REPORT_KEYS}
+    annotations['json_has_login'] = Func(
+        F('full_report'), Value('total_login_attempts'), function='jsonb_exists', output_field=BooleanField(),
+    )
+    annotations['json_type'] = Func(F('full_report'), function='jsonb_typeof', output_field=CharField())
+    return annotations
+
+
+def _annotated_full_report(report) -> dict:
+    """The subset of full_report read through _sql_fold_annotations(), as a dict."""
+    full = {}
+    for key in _FOLD_REPORT_KEYS:
+        value = getattr(report, f'json_{key}')
+        if value is not None:
+            full[key] = value
+    if report.json_has_login:
+        full['total_login_attempts'] = True
+    return full
+
+
+def _apply_sql_aggregates(summaries: dict, folded_reports) -> None:
+    """Adds the entry-type counts and page load details computed by Postgres."""
+    counts_fields = [(counts_field, report_key) for _, counts_field, report_key in SAMPLED_LISTS]
+    counts_fields.append(('attempt_failed_error_counts', 'attempt_failed_errors'))
+
+    counts_by_task = pg_aggregation.entry_type_counts_by_task(
+        folded_reports, [report_key for _, report_key in counts_fields],
+    )
+    for task_id, counts_by_list in counts_by_task.items():
+        summary = summaries[task_id]
+        for counts_field, report_key in counts_fields:
+            _count_entries(getattr(summary, counts_field), counts_by_list.get(report_key, {}).items())
+
+    for task_id, page_loads in pg_aggregation.page_load_details_by_task(folded_reports).items():
+        _merge_page_load_sums(summaries[task_id].page_load_details, page_loads)
+
+
+def _add_login_latencies(latencies: dict, folded_metrics) -> None:
+    """Adds the login and 2FA time of every folded report that attempted them to its task's sketches."""
+    rows = folded_metrics.filter(has_login_metrics=True).order_by().values_list(
+        'task_id', 'total_login_attempts', 'total_login_time', 'twofa_attempts', 'twofa_total_time',
+    )
+    for task_id, login_attempts, login_time, twofa_attempts, twofa_time in rows.iterator(chunk_size=FOLD_CHUNK_SIZE):
+        if login_attempts:
+            latencies[task_id].add('login', login_time)
+        if twofa_attempts:
+            latencies[task_id].add('2fa', twofa_time)
+
+
+def _folded_filter(folded_windows: dict, sequence_field: str) -> Q:
+    """Rows of every task inside its (after, upto] sequence window."""
+    folded_filter = Q()
+    for task_id, (after, upto) in folded_windows.items():
+        folded_filter |= Q(task_id=task_id) & sequence_window(sequence_field, after=after, upto=upto)
+    return folded_filter
+
+
+def _lock_summaries(task_uuids) -> dict:
+    summaries = (
+        TaskSummaryReportNew.objects.select_for_update()
+        .filter(task_id__in=task_uuids)
+        .order_by('pk')
+    )
+    return {summary.task_id: summary for summary in summaries}
+
+
+def _apply_totals(summary: TaskSummaryReportNew, totals: dict) -> None:
+    for field, key in SUMMED_COUNTERS.items():
+        setattr(summary, field, getattr(summary, field) + totals[key])
+    summary.storage_upload_failed = summary.storage_upload_failed or totals['any_storage_house_upload_failures']
+    summary.has_billing_exception = summary.has_billing_exception or totals['any_has_billing_exception']
+    summary.latest_login_status = (
+        'success'
+        if summary.latest_login_status == 'success' or totals['any_logged_in'] or summary.successful_logins > 0
+        else 'failed'
+    )
+
+
+def fold_task_summaries(task_uuids, full_rebuild: bool = False, now=None) -> dict:
+    """
+    Folds the reports that arrived after each summary's watermark into the
+    TaskSummaryReportNew of every task in `task_uuids`, creating summaries on
+    first use. With `full_rebuild` the accumulators are reset and every report
+    is folded again.
+
+    All new reports are read with one ordered query, their metric totals come
+    from one grouped aggregate and the summaries are written with one
+    bulk_update. Returns {task_uuid: (summary, folded_report_count)} for the
+    tasks that have reports.
+    """
+    now = now or timezone.now()
+    task_uuids = sorted({uuid.UUID(str(task_uuid)) for task_uuid in task_uuids})
+    if not task_uuids:
+        return {}
+
+    assign_report_sequence()
+    with transaction.atomic():
+        summaries = _lock_summaries(task_uuids)
+        missing = [task_uuid for task_uuid in task_uuids if task_uuid not in summaries]
+        if missing:
+            with_reports = set(
+                TaskReport.objects.filter(task_id__in=missing)
+                .order_by().values_list('task_id', flat=True).distinct()
+            )
+            if with_reports:
+                TaskSummaryReportNew.objects.bulk_create(
+                    [TaskSummaryReportNew(task_id=task_uuid) for task_uuid in with_reports],
+                    ignore_conflicts=True,
+                )
+                summaries.update(_lock_summaries(with_reports))
+        if not summaries:
+            return {}
+
+        rebuilt = set()
+        windows = {}
+        for task_id, summary in summaries.items():
+            # Summaries written before watermarks existed already count every report;
+            # folding on top of them would count those reports twice.
+            if full_rebuild or (summary.last_processed_report_sequence is None and summary.total_reports_considered):
+                reset_summary(summary)
+                rebuilt.add(task_id)
+            windows[task_id] = summary.last_processed_report_sequence
+        latencies = {task_id: LatencySketches(summary.latency_sketches) for task_id, summary in summaries.items()}
+        distincts = {task_id: DistinctSketches(summary.distinct_sketches) for task_id, summary in summaries.items()}
+
+        report_filter = Q()
+        for task_id, after in windows.items():
+            report_filter |= Q(task_id=task_id) & sequence_window('sequence', after=after)
+        new_reports = TaskReport.objects.filter(report_filter).order_by('task_id', 'sequence')
+        backfill_missing_metrics(new_reports)
+
+        # On Postgres only the keys the fold needs are read from full_report; entry
+        # counts and page load sums are computed by the database further down.
+        sql_aggregation = pg_aggregation.is_available()
+        if sql_aggregation:
+            report_rows = new_reports.annotate(**_sql_fold_annotations())
+            columns = _REPORT_COLUMNS
+        else:
+            report_rows = new_reports
+            columns = _REPORT_COLUMNS + ('full_report',)
+
+        folded = dict.fromkeys(summaries, 0)
+        folded_upto = {}
+        latest = {}
+        for report in stream(report_rows, columns, FOLD_CHUNK_SIZE):
+            summary = summaries[report.task_id]
+            if sql_aggregation and report.json_type == 'object':
+                full = _annotated_full_report(report)
+                _fold_report(summary, report, full, count_entries=False)
+            else:
+                full = load_full_report(report.full_report)
+                _fold_report(summary, report, full)
+                page_load_details = full.get('page_load_details')
+                latencies[report.task_id].add_page_load_details(page_load_details)
+                if isinstance(page_load_details, dict):
+                    distincts[report.task_id].add_all('page_urls', page_load_details)
+            distincts[report.task_id].add('runs', report.run_id)
+            distincts[report.task_id].add_all(
+                'critical_event_types', map(entry_type, _as_list(full.get('critical_events_summary'))),
+            )
+            if summary.first_report_datetime is None or report.created_at < summary.first_report_datetime:
+                summary.first_report_datetime = report.created_at
+            # A late-committing report can be older than one folded before it.
+            if report.task_id not in latest or report.created_at >= latest[report.task_id][0].created_at:
+                latest[report.task_id] = (report, full)
+            folded_upto[report.task_id] = report.sequence
+            folded[report.task_id] += 1
+
+        totals_by_task = {}
+        if folded_upto:
+            # Everything below aggregates exactly the reports folded above.
+            folded_windows = {task_id: (windows[task_id], upto) for task_id, upto in folded_upto.items()}
+            folded_metrics = TaskReportMetrics.objects.filter(_folded_filter(folded_windows, 'report__sequence'))
+            totals_by_task = aggregate_report_metrics_by_task(folded_metrics)
+            _add_login_latencies(latencies, folded_metrics)
+            if sql_aggregation:
+                folded_reports = TaskReport.objects.filter(_folded_filter(folded_windows, 'sequence'))
+                _apply_sql_aggregates(summaries, folded_reports)
+                for task_id, url, page_load_time in pg_aggregation.page_load_times(folded_reports):
+                    latencies[task_id].add_page_load(url, page_load_time)
+                for task_id, url in pg_aggregation.page_load_urls(folded_reports):
+                    distincts[task_id].add('page_urls', url)
+
+        changed = []
+        for task_id, summary in summaries.items():
+            if task_id in folded_upto:
+                report, full = latest[task_id]
+                _apply_totals(summary, totals_by_task[task_id])
+                summary.latency_sketches = latencies[task_id].to_dict()
+                summary.distinct_sketches = distincts[task_id].to_dict()
+                summary.total_reports_considered += folded[task_id]
+                if summary.last_report_datetime is None or report.created_at >= summary.last_report_datetime:
+                    summary.last_report_datetime = report.created_at
+                    _apply_latest_report(summary, report, full)
+                summary.last_processed_report_sequence = folded_upto[task_id]
+            elif task_id not in rebuilt:
+                continue
+            # bulk_update() does not apply auto_now.
+            summary.updated_at = now
+            changed.append(summary)
+
+        if changed:
+            # Job totals and costs move by the change in these summaries (saved below).
+            apply_job_deltas(changed, now=now)
+            TaskSummaryReportNew.objects.bulk_update(changed, SAVED_FIELDS, batch_size=FOLD_CHUNK_SIZE)
+            publish_versions(changed)
+
+    return {task_id: (summary, folded[task_id]) for task_id, summary in summaries.items()}
+
+
+def fold_task_summary(task, full_rebuild: bool = False, now=None):
+    """
+    fold_task_summaries() for a single task. Returns (summary, folded_report_count);
+    the summary is None when the task has no reports yet.
+    """
+    return fold_task_summaries([task.uuid], full_rebuild=full_rebuild, now=now).get(task.uuid, (None, 0))
+
+
+def has_unfolded_reports(summary: TaskSummaryReportNew) -> bool:
+    """True if the task has reports past the summary's watermark or not numbered yet (committed during the fold)."""
+    return TaskReport.objects.filter(
+        Q(sequence__isnull=True) | sequence_window('sequence', after=summary.last_processed_report_sequence),
+        task_id=summary.task_id,
+    ).exists()
+
+
+def tasks_with_unfolded_reports(task_uuids=None):
+    """
+    Task UUIDs with reports past their summary's watermark or not numbered yet,
+    or with reports but no summary yet; optionally limited to `task_uuids`. Used
+    when the dirty-task set cannot be trusted and after batch folds.
+    """
+    tasks = Task.objects.all()
+    if task_uuids is not None:
+        tasks = tasks.filter(uuid__in=task_uuids)
+    return (
+        tasks.annotate(
+            latest_sequence=Max('reports__sequence'),
+            unnumbered=Count('reports', filter=Q(reports__sequence__isnull=True)),
+        )
+        .filter(
+            Q(unnumbered__gt=0)
+            | Q(latest_sequence__isnull=False) & (
+                Q(new_summary_report__isnull=True)
+                | Q(new_summary_report__last_processed_report_sequence__isnull=True)
+                | Q(latest_sequence__gt=F('new_summary_report__last_processed_report_sequence'))
+            )
+        )
+        .values_list('uuid', flat=True)
+    )
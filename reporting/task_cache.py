@@ -0,0 +1,167 @@
+# reporting_and_analytics/task_cache.py
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from .redis_utils import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Known-task cache used by report ingestion to avoid touching reporting_task for
+# task UUIDs it has already seen.
+#
+# Lookups go to a per-process LRU first, then to a Redis set shared by every
+# web/worker process. Deleting a Task removes it from the Redis set and bumps a
+# generation counter; each process compares the counter every few seconds and
+# drops its LRU when it changed.
+
+KNOWN_TASKS_KEY = 'reporting:known_tasks'
+GENERATION_KEY = 'reporting:known_tasks:generation'
+STATS_KEY = 'reporting:known_tasks:stats'
+
+LOCAL_CACHE_SIZE = getattr(settings, 'REPORT_KNOWN_TASK_CACHE_SIZE', 10000)
+GENERATION_CHECK_SECONDS = getattr(settings, 'REPORT_KNOWN_TASK_GENERATION_CHECK_SECONDS', 5)
+
+STAT_LOCAL_HITS = 'local_hits'
+STAT_SHARED_HITS = 'shared_hits'
+STAT_MISSES = 'misses'
+
+
+class KnownTaskCache:
+    def __init__(self, max_size: int = LOCAL_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self._next_generation_check = 0.0
+        self._stats = {STAT_LOCAL_HITS: 0, STAT_SHARED_HITS: 0, STAT_MISSES: 0}
+        self._unflushed_stats = dict.fromkeys(self._stats, 0)
+
+    def _count(self, stat: str, amount: int) -> None:
+        if amount:
+            self._stats[stat] += amount
+            self._unflushed_stats[stat] += amount
+
+    def _sync_with_shared(self, redis) -> None:
+        """Drops the local LRU if another process invalidated tasks, and publishes counters."""
+        now = time.monotonic()
+        if now < self._next_generation_check:
+            return
+        self._next_generation_check = now + GENERATION_CHECK_SECONDS
+
+        pipe = redis.pipeline(transaction=False)
+        pipe.get(GENERATION_KEY)
+        for stat, amount in self._unflushed_stats.items():
+            if amount:
+                pipe.hincrby(STATS_KEY, stat, amount)
+        generation = pipe.execute()[0]
+        self._unflushed_stats = dict.fromkeys(self._stats, 0)
+
+        with self._lock:
+            if generation != self._generation:
+                self._entries.clear()
+                self._generation = generation
+
+    def filter_unknown(self, task_uuids) -> set:
+        """
+        Returns the task UUIDs that are neither in the local LRU nor in the shared
+        Redis set, i.e. the ones ingestion has to insert into reporting_task.
+        If Redis is unreachable every UUID is reported unknown.
+        """
+        task_uuids = set(task_uuids)
+        if not task_uuids:
+            return set()
+
+        try:
+            redis = get_redis()
+            self._sync_with_shared(redis)
+        except RedisError as e:
+            logger.warning(f"Known-task cache unavailable, checking every task against the database: {e}")
+            self._count(STAT_MISSES, len(task_uuids))
+            return task_uuids
+
+        with self._lock:
+            local_misses = set()
+            for task_uuid in task_uuids:
+                if task_uuid in self._entries:
+                    self._entries.move_to_end(task_uuid)
+                else:
+                    local_misses.add(task_uuid)
+        self._count(STAT_LOCAL_HITS, len(task_uuids) - len(local_misses))
+        if not local_misses:
+            return set()
+
+        ordered_misses = list(local_misses)
+        try:
+            flags = redis.smismember(KNOWN_TASKS_KEY, [str(task_uuid) for task_uuid in ordered_misses])
+        except RedisError as e:
+            logger.warning(f"Known-task cache unavailable, checking every task against the database: {e}")
+            self._count(STAT_MISSES, len(local_misses))
+            return local_misses
+
+        shared_hits = [task_uuid for task_uuid, known in zip(ordered_misses, flags) if known]
+        self._remember_locally(shared_hits)
+        self._count(STAT_SHARED_HITS, len(shared_hits))
+        unknown = local_misses.difference(shared_hits)
+        self._count(STAT_MISSES, len(unknown))
+        return unknown
+
+    def _remember_locally(self, task_uuids) -> None:
+        with self._lock:
+            for task_uuid in task_uuids:
+                self._entries[task_uuid] = True
+                self._entries.move_to_end(task_uuid)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def remember(self, task_uuids) -> None:
+        """Records task UUIDs whose Task rows are known to exist."""
+        task_uuids = list(task_uuids)
+        if not task_uuids:
+            return
+        self._remember_locally(task_uuids)
+        try:
+            get_redis().sadd(KNOWN_TASKS_KEY, *[str(task_uuid) for task_uuid in task_uuids])
+        except RedisError as e:
+            logger.warning(f"Could not update shared known-task set: {e}")
+
+    def forget(self, task_uuids) -> None:
+        """Invalidates deleted tasks here and, through the generation counter, in every other process."""
+        task_uuids = list(task_uuids)
+        with self._lock:
+            for task_uuid in task_uuids:
+                self._entries.pop(task_uuid, None)
+        if not task_uuids:
+            return
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            pipe.srem(KNOWN_TASKS_KEY, *[str(task_uuid) for task_uuid in task_uuids])
+            pipe.incr(GENERATION_KEY)
+            pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Could not invalidate shared known-task set: {e}")
+
+    def clear_local(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Hit/miss counters of this process and, when reachable, of the whole fleet."""
+        shared = None
+        try:
+            raw = get_redis().hgetall(STATS_KEY)
+            shared = {key.decode(): int(value) for key, value in raw.items()}
+        except RedisError as e:
+            logger.warning(f"Could not read shared known-task cache stats: {e}")
+        return {
+            'process': dict(self._stats, cached_tasks=len(self._entries)),
+            'shared': shared,
+        }
+
+
+known_tasks = KnownTaskCache()
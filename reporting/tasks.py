@@ -10,196 +10,51 @@ import json
 from django.db import transaction
 from django.db.models import Max, Min, Sum, Avg # <--- Ensure Avg, Max, Min, Sum are imported
 from django.db.models.functions import Coalesce
+from django.conf import settings
 from django.utils import timezone
 from django.db.models import Max, Min
 import logging
+from redis.exceptions import RedisError
 
 from .models import Task, TaskAnalysisReport, TaskSummaryReport,TaskReport,TaskSummaryReportNew
+from .summary_engine import fold_task_summaries, fold_task_summary, has_unfolded_reports, tasks_with_unfolded_reports
+from .dirty_tasks import ack, mark_dirty, pop_due, release
+from .ingest_queue import drain_stream
+from .metric_rollup import roll_up_report_metrics
 
 logger = logging.getLogger(__name__)
 
+# Tasks folded per process_task_summary_batch job.
+SUMMARY_BATCH_SIZE = getattr(settings, 'SUMMARY_BATCH_SIZE', 200)
+
 @shared_task(bind=True, default_retry_delay=60, max_retries=3)
-def process_single_task_summary(self, task_uuid_str: str):
+def process_single_task_summary(self, task_uuid_str: str, full_rebuild: bool = False):
+    """
+    Folds the task's reports that arrived since the last run into its summary
+    (see summary_engine). `full_rebuild` recomputes the summary from scratch.
+    """
     try:
         task_instance = Task.objects.get(uuid=task_uuid_str)
-        all_reports = TaskReport.objects.filter(task=task_instance).order_by('created_at')
+        summary, folded = fold_task_summary(task_instance, full_rebuild=full_rebuild)
 
-        if not all_reports.exists():
+        if summary is None:
             logger.warning(f"No reports found for task '{task_uuid_str}'.")
             return f"No reports to summarize for task {task_uuid_str}."
 
-        # Only create summary after confirming reports exist
-        summary, created = TaskSummaryReportNew.objects.get_or_create(task=task_instance)
-        new_reports_qs = all_reports if created else all_reports.filter(created_at__gt=summary.updated_at)
+        # Reports that committed while the fold ran would otherwise wait for the
+        # next time ingestion happens to dirty this task again.
+        if has_unfolded_reports(summary):
+            mark_dirty([task_instance.uuid])
 
-        if not new_reports_qs.exists():
+        if not folded and not full_rebuild:
             logger.info(f"No new reports to process for task '{task_uuid_str}'.")
             return f"No new reports to process for task {task_uuid_str}."
 
-        # === INIT FIELDS === #
-        total_reports = all_reports.count()
-        print(f"total report found: {total_reports}")
-        critical_events = []
-        total_critical_events = 0
-        login_exceptions_summary = []
-        login_exceptions_count = 0
-        page_detection_exceptions_summary = []
-        page_detection_exceptions_count = 0
-        locate_element_exceptions_summary = []
-        locate_element_exceptions_count = 0
-        merged_page_load_details = {}
-
-        total_login_attempts = 0
-        successful_logins = 0
-        failed_logins = 0
-        total_login_time = 0.0
-        total_2fa_attempts = 0
-        total_2fa_successes = 0
-        total_2fa_failures = 0
-        total_2fa_time = 0.0
-        total_attempt_failed = 0
-        attempt_failed_errors = []
-        failed_attempt_error_logs = []
-
-        total_users_scraped = 0
-        total_downloaded_files = 0
-        total_storage_uploads = 0
-        found_next_page_info_count = 0
-        next_page_info_not_found_count = 0
-
-        failed_downloads_details = []
-        failed_to_download_file_count = 0
-        storage_upload_failed = False
-        task_completion_status = ""
-        has_billing_exception = False
-        specific_exception_reason = ""
-        has_logged_in_status = False
-
-        for report in all_reports:
-            full = report.full_report or {}
-            if isinstance(full, str):
-                try:
-                    full = json.loads(full)
-                except json.JSONDecodeError:
-                    continue
-
-            total_critical_events += full.get('critical_events_count', 0)
-            critical_events.extend(full.get('critical_events_summary', []))
-            login_exceptions_summary.extend(full.get('login_exceptions_summary', []))
-            login_exceptions_count += full.get('login_exceptions_count', 0)
-            page_detection_exceptions_summary.extend(full.get('page_detection_exceptions_summary', []))
-            page_detection_exceptions_count += full.get('page_detection_exceptions_count', 0)
-            locate_element_exceptions_summary.extend(full.get('locate_element_exceptions_summary', []))
-            locate_element_exceptions_count += full.get('locate_element_exceptions_count', 0)
-
-            for url, details in full.get('page_load_details', {}).items():
-                if url not in merged_page_load_details:
-                    merged_page_load_details[url] = details
-                else:
-                    for key, val in details.items():
-                        if isinstance(val, (int, float)):
-                            merged_page_load_details[url][key] = merged_page_load_details[url].get(key, 0) + val
-
-            if 'total_login_attempts' in full:
-                total_login_attempts += full.get('total_login_attempts', 0)
-                successful_logins += full.get('successful_logins', 0)
-                failed_logins += full.get('failed_logins', 0)
-                total_login_time += full.get('total_login_time', 0.0)
-                total_2fa_attempts += full.get('2fa_attempts', 0)
-                total_2fa_successes += full.get('2fa_successes', 0)
-                total_2fa_failures += full.get('2fa_failures', 0)
-                total_2fa_time += full.get('2fa_total_time', 0.0)
-                total_attempt_failed += full.get('total_attempt_failed', 0)
-                errors = full.get('attempt_failed_errors', [])
-                attempt_failed_errors.extend([
-                    err.get('type') for err in errors if isinstance(err, dict) and 'type' in err
-                ])
-                failed_attempt_error_logs.append({
-                    "run_id": str(report.run_id),
-                    "errors": errors,
-                })
-
-            scrape_summary = full.get('scraped_data_summary', {})
-            total_users_scraped += scrape_summary.get('total_users_scraped', 0)
-            total_downloaded_files += full.get('downloaded_file_count', 0)
-            total_storage_uploads += full.get('storage_house_uploads', 0)
-            found_next_page_info_count += full.get('found_next_page_info_count', 0)
-            next_page_info_not_found_count += full.get('next_page_info_not_found_count', 0)
-            failed_downloads_details.extend(full.get("failed_downloads_details", []))
-            failed_to_download_file_count += full.get("failed_to_download_file_count", 0)
-            storage_upload_failed |= full.get("storage_house_upload_failures", False)
-            task_completion_status = full.get("task_completion_status", task_completion_status)
-            has_billing_exception |= full.get("has_billing_exception", False)
-            specific_exception_reason = full.get("specific_exception_reason", specific_exception_reason)
-            # ✅ Track login status
-            if full.get('bot_login_status_for_run') == 'Logged In':
-                has_logged_in_status = True
-
-        latest_report = all_reports.last()
-        latest_full = latest_report.full_report or {}
-        if isinstance(latest_full, str):
-            try:
-                latest_full = json.loads(latest_full)
-            except json.JSONDecodeError:
-                latest_full = {}
-
-        start_ts = latest_report.report_start_datetime
-        end_ts = latest_report.report_end_datetime
-
-        # === ASSIGN SUMMARY === #
-        summary.total_reports_considered = total_reports
-        summary.first_report_datetime = all_reports.aggregate(Min('created_at'))['created_at__min']
-        summary.last_report_datetime = all_reports.aggregate(Max('created_at'))['created_at__max']
-        summary.total_critical_events = total_critical_events
-        summary.critical_events_summary = critical_events
-        summary.login_exceptions_summary = login_exceptions_summary
-        summary.login_exceptions_count = login_exceptions_count
-        summary.page_detection_exceptions_summary = page_detection_exceptions_summary
-        summary.page_detection_exceptions_count = page_detection_exceptions_count
-        summary.locate_element_exceptions_summary = locate_element_exceptions_summary
-        summary.locate_element_exceptions_count = locate_element_exceptions_count
-        summary.page_load_details = merged_page_load_details
-        summary.has_next_page_info = latest_full.get('has_next_page_info')
-        summary.latest_task_status = latest_full.get('status', latest_report.service or 'unknown')
-        # ✅ Correct login status logic
-        summary.latest_login_status = 'success' if has_logged_in_status or successful_logins > 0 else 'failed'
-        summary.latest_report_start_datetime = start_ts
-        summary.latest_report_end_datetime = end_ts
-        summary.latest_total_task_runtime = (
-            round((end_ts - start_ts).total_seconds(), 2)
-            if (start_ts and end_ts) else 0.0
+        logger.info(
+            f"{'REBUILT' if full_rebuild else 'UPDATED'} TaskSummaryReport for task "
+            f"'{task_instance.name or task_uuid_str}' with {folded} reports "
+            f"({summary.total_reports_considered} in total)."
         )
-        summary.run_id_of_latest_report = latest_report.run_id
-
-        summary.total_login_attempts = total_login_attempts
-        summary.successful_logins = successful_logins
-        summary.failed_logins = failed_logins
-        summary.total_login_time = total_login_time
-        summary.total_2fa_attempts = total_2fa_attempts
-        summary.total_2fa_successes = total_2fa_successes
-        summary.total_2fa_failures = total_2fa_failures
-        summary.total_2fa_time = total_2fa_time
-        summary.total_attempt_failed = total_attempt_failed
-        summary.attempt_failed_errors = attempt_failed_errors
-        summary.failed_attempt_error_logs = failed_attempt_error_logs
-
-        summary.total_users_scraped = total_users_scraped
-        summary.total_downloaded_files = total_downloaded_files
-        summary.total_storage_uploads = total_storage_uploads
-        summary.found_next_page_info_count = found_next_page_info_count
-        summary.next_page_info_not_found_count = next_page_info_not_found_count
-
-        summary.failed_downloads_details = failed_downloads_details
-        summary.failed_to_download_file_count = failed_to_download_file_count
-        summary.storage_upload_failed = storage_upload_failed
-        summary.task_completion_status = task_completion_status
-        summary.has_billing_exception = has_billing_exception
-        summary.specific_exception_reason = specific_exception_reason
-
-        summary.updated_at = timezone.now()
-        summary.save()
-
-        logger.info(f"{'CREATED' if created else 'UPDATED'} TaskSummaryReport for task '{task_instance.name or task_uuid_str}'.")
 
         return f"Successfully processed summary for task {task_uuid_str}."
 
@@ -210,28 +65,92 @@ def process_single_task_summary(self, task_uuid_str: str):
 
 
 
+@shared_task(bind=True, default_retry_delay=60, max_retries=3)
+def process_task_summary_batch(self, task_uuid_strs: list, full_rebuild: bool = False):
+    """
+    process_single_task_summary for many tasks at once: their new reports are
+    read with one query and the summaries written with one bulk_update.
+    """
+    try:
+        results = fold_task_summaries(task_uuid_strs, full_rebuild=full_rebuild)
+        folded = sum(count for _, count in results.values())
+
+        # Reports that committed while the fold ran go back into the dirty set.
+        mark_dirty(tasks_with_unfolded_reports(list(results)))
+
+        logger.info(f"Folded {folded} reports into {len(results)} of {len(task_uuid_strs)} task summaries.")
+        return f"Processed summaries for {len(results)} tasks ({folded} new reports)."
+
+    except Exception as e:
+        logger.error(f"Error processing summary batch of {len(task_uuid_strs)} tasks: {e}", exc_info=True)
+        raise self.retry(exc=e)
+
+
 @shared_task(bind=True, default_retry_delay=300, max_retries=2)
-def process_all_task_summaries(self):
+def process_all_task_summaries(self, full_sweep: bool = False):
     """
-    Celery task to find all tasks that might need their summary reports updated
-    and dispatches individual processing tasks for each.
+    Celery task that dispatches process_task_summary_batch, in chunks of
+    SUMMARY_BATCH_SIZE tasks, for the tasks that received reports since their
+    last summary.
+
+    Normally those come from the Redis dirty-task set filled by ingestion (see
+    dirty_tasks); a task is dispatched once it has been dirty for the debounce
+    window, and is marked dirty again if its batch cannot be dispatched. With `full_sweep`, or when Redis is unreachable, the database is
+    asked instead for every task with reports past its summary watermark.
     """
     logger.info("Starting process_all_task_summaries task.")
 
-    # Get all tasks. In a production scenario, you might filter this
-    # to only tasks that have new TaskAnalysisReports since their last summary update,
-    # or tasks that are actively running. For simplicity, we'll iterate all.
-    tasks_to_process = Task.objects.all()
-
-    if not tasks_to_process.exists():
+    task_uuids = None
+    if not full_sweep:
+        try:
+            task_uuids = pop_due()
+        except RedisError as e:
+            logger.warning(f"Dirty-task set unavailable, sweeping the database instead: {e}")
+    # Tasks popped from the dirty set are leased until their job is dispatched.
+    leased = task_uuids is not None
+    if task_uuids is None:
+        task_uuids = list(tasks_with_unfolded_reports())
+
+    if not task_uuids:
         logger.info("No tasks found to process summaries for.")
         return "No tasks found to process summaries for."
 
-    for task in tasks_to_process:
-        # Pass the task_uuid as a string for safety across Celery boundaries
-        # This will trigger process_single_task_summary for each task
-        process_single_task_summary.delay(str(task.uuid))
-        logger.info(f"Dispatched summary processing for task: {task.uuid}")
+    # Pass the task UUIDs as strings for safety across Celery boundaries
+    task_uuid_strs = [str(task_uuid) for task_uuid in task_uuids]
+    dispatched = 0
+    try:
+        for start in range(0, len(task_uuid_strs), SUMMARY_BATCH_SIZE):
+            chunk = task_uuid_strs[start:start + SUMMARY_BATCH_SIZE]
+            process_task_summary_batch.delay(chunk)
+            dispatched += len(chunk)
+            if leased:
+                ack(chunk)
+    except Exception as e:
+        logger.error(f"Dispatched summaries for {dispatched} of {len(task_uuid_strs)} tasks: {e}", exc_info=True)
+        if leased:
+            release(task_uuid_strs[dispatched:])
+        raise self.retry(exc=e)
+
+    logger.info(f"Finished dispatching summaries for {len(task_uuids)} tasks.")
+    return f"Dispatched summary processing for {len(task_uuids)} tasks."
+
 
-    logger.info(f"Finished dispatching summaries for {tasks_to_process.count()} tasks.")
-    return f"Dispatched {tasks_to_process.count()} task summary processing tasks."
\ No newline at end of file
+@shared_task(bind=True, ignore_result=True)
+def drain_report_ingest_stream(self):
+    """
+    Consumer for asynchronously ingested reports (POST /reporting/task-reports/?mode=async).
+    Runs on the dedicated `report_ingest` queue and bulk inserts queued reports
+    into TaskReport until the Redis stream is empty.
+    """
+    processed = drain_stream()
+    return f"Ingested {processed} queued reports."
+
+
+@shared_task(bind=True, ignore_result=True)
+def roll_up_metric_buckets(self):
+    """
+    Adds the reports that arrived since the last run to the hourly and daily
+    metric rollups behind the time-series endpoint (see metric_rollup).
+    """
+    rolled_up = roll_up_report_metrics()
+    return f"Rolled up metrics of {rolled_up} reports."
@@ -1,3 +1,1345 @@
-from django.test import TestCase
+import datetime
+import gzip
+import json
+import time
+import uuid
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import fakeredis
+from django.core.cache import cache
+from django.db import IntegrityError, connection
+from django.db.models import Sum
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from redis.exceptions import RedisError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from . import cost_engine, dedupe, dirty_tasks, ingest_queue, ingestion, parallel_reports, summary_cache, summary_engine, task_cache, tasks
+from .analysis_report import accumulate_reports, compile_reports
+from .cost_engine import cost_rates
+from .dedupe import dedupe_key
+from .distinct_sketch import DistinctSketches, HyperLogLog
+from .job_rollup import reset_job_rollups, roll_up_summaries
+from .latency_sketch import LatencySketch, LatencySketches
+from .metric_rollup import roll_up_report_metrics, rolled_up_until
+from .metrics import aggregate_report_metrics, backfill_missing_metrics, extract_metrics, load_full_report
+from .fast_serializers import ValuesSerializer
+from .ingestion import RESULT_CREATED, RESULT_DUPLICATE, RESULT_ERROR, bulk_ingest_reports
+from .models import (
+    CostUnitConfig, JobAnalysisReport, ReportMetricRollupDaily, ReportMetricRollupHourly, Task, TaskAnalysisReport, TaskReport, TaskSummaryReport,
+    TaskReportMetrics, TaskSummaryReportNew,
+)
+from .parallel_reports import PARTITIONS, _created_at_slices, _task_slices, compile_reports_parallel, partition_reports, report_dicts
+from .report_sequence import assign_report_sequence
+from .serializers import TaskAnalysisReportSerializer, TaskSummaryReportSerializer
+from .summary_engine import fold_task_summaries, has_unfolded_reports, tasks_with_unfolded_reports
+from .task_cache import known_tasks
+
+# Modules that talk to Redis through get_redis()
+REDIS_MODULES = (cost_engine, dedupe, dirty_tasks, ingest_queue, task_cache)
+
+# For tests that clear Django's cache, which is django_redis in settings.py.
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class FakeRedisMixin:
+    """Points get_redis() at a fresh in-memory Redis and empties the per-process task cache."""
+
+    def setUp(self):
+        super().setUp()
+        self.redis = fakeredis.FakeRedis()
+        for module in REDIS_MODULES:
+            patcher = mock.patch.object(module, 'get_redis', return_value=self.redis)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        known_tasks.clear_local()
+        known_tasks._next_generation_check = 0.0
+        cost_rates._rates = None
+        cost_rates._next_generation_check = 0.0
+
+
+def raw_report(task_uuid=None, run_id=None, data_point='profile', **fields) -> dict:
+    """A bot report as posted to the ingestion endpoints."""
+    return {
+        'task_uuid': str(task_uuid or uuid.uuid4()),
+        'run_id': str(run_id or uuid.uuid4()),
+        'service': 'instagram',
+        'data_point': data_point,
+        **fields,
+    }
+
+
+def report_dedupe_key(report: dict) -> str:
+    return dedupe_key(report['run_id'], report['task_uuid'], report['data_point'])
+
+
+# --- Set-based ingestion (ingestion, ?mode=bulk) ---
+
+class BulkIngestionTests(FakeRedisMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.url = f"{reverse('task_report_list_create')}?mode=bulk"
+
+    def test_every_item_gets_a_status(self):
+        report = raw_report(critical_events_count=2, report_start_datetime=1700000000000)
+        items = [
+            report,
+            dict(report),  # same identity in the same batch
+            raw_report(task_uuid=report['task_uuid'], data_point=None),
+            {'run_id': str(uuid.uuid4())},
+            'not an object',
+            raw_report(service='x' * 51),
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, {'data': items}, format='json')
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual((body['created'], body['duplicates'], body['errors']), (2, 1, 3))
+        self.assertEqual(
+            [result['status'] for result in body['results']],
+            [RESULT_CREATED, RESULT_DUPLICATE, RESULT_CREATED, RESULT_ERROR, RESULT_ERROR, RESULT_ERROR],
+        )
+        self.assertEqual(body['results'][3]['error'], "Missing or invalid 'task_uuid'.")
+
+        stored = TaskReport.objects.get(id=body['results'][0]['report_id'])
+        self.assertEqual(stored.report_start_datetime, datetime.datetime.fromtimestamp(1700000000, tz=datetime.timezone.utc))
+        self.assertEqual(stored.metrics.critical_events_count, 2)
+        self.assertEqual(Task.objects.get(uuid=report['task_uuid']).task_type, 'unknown')
+        self.assertEqual(dirty_tasks.pop_due(debounce_seconds=0), [uuid.UUID(report['task_uuid'])])
+
+    def test_retried_batch_is_not_an_error(self):
+        items = [raw_report(), raw_report()]
+        self.client.post(self.url, {'data': items}, format='json')
+        response = self.client.post(self.url, {'data': items}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['duplicates'], 2)
+        self.assertEqual(TaskReport.objects.count(), 2)
+
+    def test_report_without_data_point_is_stored_once(self):
+        report = raw_report(data_point=None)
+        results = bulk_ingest_reports([report, dict(report)])
+        self.assertEqual([r['status'] for r in results], [RESULT_CREATED, RESULT_DUPLICATE])
+        self.redis.flushall()
+        response = self.client.post(self.url, {'data': [report, raw_report(report['task_uuid'], data_point=None)]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([r['status'] for r in response.json()['results']], [RESULT_DUPLICATE, RESULT_CREATED])
+        self.assertEqual(TaskReport.objects.filter(data_point__isnull=True).count(), 2)
+
+    def test_batch_without_valid_items_is_rejected(self):
+        response = self.client.post(self.url, {'data': [{'task_uuid': 'nope'}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(self.url, {'data': {'not': 'a list'}}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+# --- Streaming ingestion (ingestion, task-reports/stream/) ---
+
+def ndjson(items) -> bytes:
+    return b''.join((item if isinstance(item, bytes) else json.dumps(item).encode()) + b'\n' for item in items)
+
+
+class NdjsonIngestionTests(FakeRedisMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('task_report_stream_ingest')
+
+    def _post(self, body, **extra):
+        return self.client.post(self.url, body, content_type='application/x-ndjson', **extra)
+
+    def test_lines_are_ingested_in_chunks(self):
+        reports = [raw_report() for _ in range(5)]
+        body = ndjson(reports[:2] + [b'{not json', b'   '] + reports[2:] + [{'task_uuid': 'x'}])
+        chunk_sizes = []
+
+        def bulk_ingest(chunk):
+            chunk_sizes.append(len(chunk))
+            return bulk_ingest_reports(chunk)
+
+        with mock.patch.object(ingestion, 'STREAM_CHUNK_SIZE', 2), \
+                mock.patch.object(ingestion, 'bulk_ingest_reports', bulk_ingest):
+            response = self._post(body)
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual((body['created'], body['duplicates'], body['errors']), (5, 0, 2))
+        self.assertEqual([detail['line'] for detail in body['error_details']], [3, 8])
+        self.assertEqual(chunk_sizes, [2, 2, 2])
+        self.assertEqual(TaskReport.objects.count(), 5)
+
+    def test_gzip_body_and_duplicates(self):
+        reports = [raw_report(), raw_report()]
+        self._post(ndjson(reports[:1]))
+        response = self._post(gzip.compress(ndjson(reports)), HTTP_CONTENT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.json()['created'], response.json()['duplicates']), (1, 1))
+
+        response = self._post(ndjson(reports))
+        self.assertEqual((response.status_code, response.json()['duplicates']), (200, 2))
+
+    def test_rejected_requests(self):
+        self.assertEqual(self.client.post(self.url, '{}', content_type='application/json').status_code, 415)
+        self.assertEqual(self._post(ndjson([raw_report()]), HTTP_CONTENT_ENCODING='br').status_code, 415)
+        self.assertEqual(self._post(b'not gzip', HTTP_CONTENT_ENCODING='gzip').status_code, 400)
+        with mock.patch.object(ingestion, 'STREAM_MAX_LINE_BYTES', 50):
+            response = self._post(ndjson([raw_report()]))
+        self.assertEqual((response.status_code, response.json()['errors']), (400, 1))
+
+
+# --- Async ingestion (ingest_queue, ?mode=async) ---
+
+class AsyncIngestionTests(FakeRedisMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.url = f"{reverse('task_report_list_create')}?mode=async"
+
+    def _queue(self, items):
+        response = self.client.post(self.url, {'data': items}, format='json')
+        self.assertEqual(response.status_code, 202)
+        return response.json()
+
+    def test_queued_batch_is_drained_and_tracked(self):
+        existing = raw_report()
+        bulk_ingest_reports([existing])
+        queued = self._queue([raw_report(), existing, raw_report(task_uuid='nope')])
+        status_url = queued['status_url']
+        self.assertEqual(self.client.get(status_url).json()['status'], ingest_queue.BATCH_QUEUED)
+        self.assertEqual(TaskReport.objects.count(), 1)
+
+        self.assertEqual(ingest_queue.drain_stream(), 3)
+        batch = self.client.get(status_url).json()
+        self.assertEqual(
+            (batch['status'], batch['processed'], batch['created'], batch['duplicates'], batch['errors']),
+            (ingest_queue.BATCH_COMPLETED, 3, 1, 1, 1),
+        )
+        self.assertEqual(TaskReport.objects.count(), 2)
+        self.assertEqual(self.redis.xlen(ingest_queue.STREAM_KEY), 0)
+        self.assertEqual(ingest_queue.drain_stream(), 0)
+
+    def test_failed_bulk_insert_is_retried_per_report(self):
+        queued = self._queue([raw_report(), raw_report()])
+        calls = []
+        real_bulk_ingest = ingest_queue.bulk_ingest_reports
+
+        def bulk_ingest(reports):
+            calls.append(len(reports))
+            if len(calls) in (1, 2):
+                raise IntegrityError('boom')
+            return real_bulk_ingest(reports)
+
+        with mock.patch.object(ingest_queue, 'bulk_ingest_reports', bulk_ingest), \
+                self.assertLogs('reporting.ingest_queue', 'WARNING'):
+            ingest_queue.drain_stream()
+        batch = ingest_queue.get_batch_status(queued['batch_id'])
+        self.assertEqual((batch['created'], batch['errors']), (1, 1))
+        self.assertEqual(calls, [2, 1, 1])
+
+    def test_unavailable_queue_ingests_synchronously(self):
+        with mock.patch('reporting.views.enqueue_reports', side_effect=RedisError('down')), \
+                self.assertLogs('reporting.views', 'WARNING'):
+            response = self.client.post(self.url, {'data': [raw_report()]}, format='json')
+        self.assertEqual((response.status_code, response.json()['created']), (201, 1))
+
+    def test_invalid_batches_are_not_queued(self):
+        self.assertEqual(self.client.post(self.url, {'data': []}, format='json').status_code, 400)
+        self.assertEqual(self.client.post(self.url, {'data': ['x']}, format='json').status_code, 400)
+        self.assertEqual(self.client.get(reverse('task_report_batch_status', args=[uuid.uuid4()])).status_code, 404)
+
+
+# --- Dedupe filter (dedupe) ---
+
+class DedupeFilterTests(FakeRedisMixin, TestCase):
+
+    def test_retried_batch_is_answered_by_the_filter(self):
+        reports = [raw_report(), raw_report()]
+        self.assertEqual([r['status'] for r in bulk_ingest_reports(reports)], [RESULT_CREATED] * 2)
+        with self.assertNumQueries(0):
+            results = bulk_ingest_reports(reports)
+        self.assertEqual([r['status'] for r in results], [RESULT_DUPLICATE] * 2)
+        self.assertEqual(TaskReport.objects.count(), 2)
+
+    def test_expired_filter_falls_back_to_the_unique_constraint(self):
+        reports = [raw_report()]
+        bulk_ingest_reports(reports)
+        self.redis.flushall()
+        self.assertEqual(bulk_ingest_reports(reports)[0]['status'], RESULT_DUPLICATE)
+        self.assertTrue(self.redis.exists(report_dedupe_key(reports[0])))
+
+    def test_legacy_post_without_data_point_is_stored_once(self):
+        client, url = APIClient(), reverse('task_report_list_create')
+        report = raw_report(data_point=None)
+        self.assertEqual(client.post(url, {'data': [report]}, format='json').status_code, 201)
+        self.redis.flushall()
+        response = client.post(url, {'data': [report]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(TaskReport.objects.count(), 1)
+        self.assertTrue(self.redis.exists(report_dedupe_key(report)))
+
+    def test_rows_that_were_not_stored_stay_retryable(self):
+        reports = [raw_report()]
+        with mock.patch.object(ingestion, '_insert_reports', return_value=set()):
+            result = bulk_ingest_reports(reports)[0]
+        self.assertEqual(result['status'], RESULT_ERROR)
+        self.assertFalse(self.redis.exists(report_dedupe_key(reports[0])))
+        self.assertEqual(bulk_ingest_reports(reports)[0]['status'], RESULT_CREATED)
+
+    def test_warm_from_recent_reports(self):
+        reports = [raw_report(), raw_report(data_point=None)]
+        bulk_ingest_reports(reports)
+        self.redis.flushall()
+        self.assertEqual(dedupe.warm_from_recent_reports(hours=1), 2)
+        self.assertEqual(dedupe.seen_keys(map(report_dedupe_key, reports)), set(map(report_dedupe_key, reports)))
+
+
+class StaleKnownTaskTests(FakeRedisMixin, TransactionTestCase):
+    """Ingestion when the known-task cache lists a Task whose row is gone (foreign keys are checked at commit)."""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.url = reverse('task_report_list_create')
+
+    def _stale_task_uuid(self):
+        task = Task.objects.create(name='deleted', task_type='scraping')
+        task.delete()
+        known_tasks.remember([task.uuid])
+        return task.uuid
+
+    def test_legacy_post_recreates_the_task(self):
+        report = raw_report(self._stale_task_uuid())
+        response = self.client.post(self.url, {'data': [report]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(TaskReport.objects.filter(task_id=report['task_uuid']).count(), 1)
+        self.assertTrue(self.redis.exists(report_dedupe_key(report)))
+
+    def test_bulk_post_recreates_the_task(self):
+        report = raw_report(self._stale_task_uuid())
+        response = self.client.post(f'{self.url}?mode=bulk', {'data': [report]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['results'][0]['status'], RESULT_CREATED)
+
+    def test_ndjson_post_recreates_the_task(self):
+        report = raw_report(self._stale_task_uuid())
+        response = self.client.post(
+            reverse('task_report_stream_ingest'), ndjson([report]), content_type='application/x-ndjson',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Task.objects.filter(uuid=report['task_uuid']).exists())
+
+    def test_async_drain_recreates_the_task(self):
+        report = raw_report(self._stale_task_uuid())
+        batch_id = ingest_queue.enqueue_reports([report])
+        ingest_queue.drain_stream()
+        self.assertEqual(ingest_queue.get_batch_status(batch_id)['created'], 1)
+        self.assertTrue(Task.objects.filter(uuid=report['task_uuid']).exists())
+
+    def test_legacy_post_does_not_record_failed_reports(self):
+        report = raw_report()
+        with mock.patch.object(TaskReport.objects, 'create', side_effect=IntegrityError('not null')), \
+                self.assertLogs('reporting.views', 'ERROR'):
+            response = self.client.post(self.url, {'data': [report]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.redis.exists(report_dedupe_key(report)))
+
+        response = self.client.post(self.url, {'data': [report]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post(self.url, {'data': [report]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(TaskReport.objects.count(), 1)
+
+
+# --- Dirty-task set (dirty_tasks) ---
+
+class DirtyTaskLeaseTests(FakeRedisMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.task_uuids = [uuid.uuid4(), uuid.uuid4()]
+        dirty_tasks.mark_dirty(self.task_uuids)
+
+    def _leased(self):
+        return {uuid.UUID(member.decode()) for member in self.redis.zrange(dirty_tasks.LEASE_KEY, 0, -1)}
+
+    def test_popped_tasks_are_leased_until_acked(self):
+        popped = dirty_tasks.pop_due(debounce_seconds=0)
+        self.assertEqual(set(popped), set(self.task_uuids))
+        self.assertEqual(dirty_tasks.pop_due(debounce_seconds=0), [])
+        self.assertEqual(self._leased(), set(self.task_uuids))
+        dirty_tasks.ack(popped)
+        self.assertEqual(self._leased(), set())
+
+    def test_expired_lease_makes_the_task_due_again(self):
+        dirty_tasks.pop_due(debounce_seconds=0)
+        dirty_tasks.ack(self.task_uuids[:1])
+        later = time.time() + dirty_tasks.LEASE_SECONDS + 1
+        with mock.patch.object(dirty_tasks.time, 'time', return_value=later), self.assertLogs('reporting.dirty_tasks', 'WARNING'):
+            self.assertEqual(dirty_tasks.pop_due(), self.task_uuids[1:])
+
+    def test_failed_dispatch_releases_the_tasks(self):
+        with mock.patch.object(tasks.process_task_summary_batch, 'delay', side_effect=ConnectionError('broker down')), \
+                mock.patch.object(dirty_tasks, 'DEBOUNCE_SECONDS', 0), \
+                self.assertLogs('reporting.tasks', 'ERROR'), self.assertRaises(ConnectionError):
+            tasks.process_all_task_summaries.run()
+        self.assertEqual(self._leased(), set())
+        # Due again, ahead of tasks that became dirty since.
+        dirty_tasks.mark_dirty([uuid.uuid4()])
+        self.assertEqual(set(dirty_tasks.pop_due(debounce_seconds=0, limit=2)), set(self.task_uuids))
+
+    def test_dispatched_tasks_are_acked(self):
+        with mock.patch.object(tasks.process_task_summary_batch, 'delay') as delay, \
+                mock.patch.object(dirty_tasks, 'DEBOUNCE_SECONDS', 0):
+            tasks.process_all_task_summaries.run()
+        self.assertEqual({uuid.UUID(task_uuid) for task_uuid in delay.call_args.args[0]}, set(self.task_uuids))
+        self.assertEqual(self._leased(), set())
+        self.assertEqual(self.redis.zcard(dirty_tasks.DIRTY_KEY), 0)
+
+
+# --- Typed report metrics (metrics) ---
+
+class ReportMetricsTests(TestCase):
+
+    def test_backfill_matches_the_python_extraction(self):
+        task = Task.objects.create(name='metrics', task_type='scraping')
+        full_reports = [
+            {
+                'critical_events_count': 3, 'downloaded_file_count': '7', 'total_login_attempts': 2, 'successful_logins': 1,
+                '2fa_attempts': 1, 'total_login_time': 4.5, '2fa_total_time': '1.25', 'has_billing_exception': True,
+                'bot_login_status_for_run': 'Logged In', 'has_next_page_info': False,
+                'scraped_data_summary': {'total_users_scraped': 40},
+            },
+            # No login block: login columns stay zero even when keys are present elsewhere.
+            {'successful_logins': 9, 'critical_events_count': None, 'failed_to_download_file_count': 'x', 'scraped_data_summary': []},
+            json.dumps({'critical_events_count': 2, 'has_next_page_info': 1}),
+            [1, 2],
+        ]
+        reports = [
+            TaskReport.objects.create(task=task, run_id=uuid.uuid4(), full_report=full_report) for full_report in full_reports
+        ]
+        self.assertEqual(backfill_missing_metrics(TaskReport.objects.all()), 4)
+        self.assertEqual(backfill_missing_metrics(TaskReport.objects.all()), 0)
+
+        columns = list(extract_metrics({}))
+        for report in reports:
+            expected = extract_metrics(load_full_report(report.full_report))
+            stored = TaskReportMetrics.objects.filter(report_id=report.id).values(*columns).get()
+            self.assertEqual(stored, expected, report.full_report)
+
+        totals = aggregate_report_metrics(TaskReportMetrics.objects.filter(task=task))
+        self.assertEqual((totals['critical_events_count'], totals['successful_logins'], totals['total_users_scraped']), (5, 1, 40))
+        self.assertEqual((totals['any_has_billing_exception'], totals['any_storage_house_upload_failures']), (True, False))
+
+
+# --- Watermarked summary fold (summary_engine, report_sequence) ---
+
+class SummaryFoldTests(FakeRedisMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.task_uuid = uuid.uuid4()
+
+    def _ingest(self, count, **fields):
+        reports = [raw_report(self.task_uuid, critical_events_count=2, **fields) for _ in range(count)]
+        self.assertEqual({r['status'] for r in bulk_ingest_reports(reports)}, {RESULT_CREATED})
+        return reports
+
+    def _fold(self, **kwargs):
+        summary, folded = fold_task_summaries([self.task_uuid], **kwargs)[self.task_uuid]
+        return summary, folded
+
+    def test_fold_is_incremental_and_idempotent(self):
+        self._ingest(3)
+        summary, folded = self._fold()
+        self.assertEqual((folded, summary.total_reports_considered, summary.total_critical_events), (3, 3, 6))
+
+        summary, folded = self._fold()
+        self.assertEqual((folded, summary.total_reports_considered, summary.total_critical_events), (0, 3, 6))
+
+        self._ingest(2)
+        summary, folded = self._fold()
+        self.assertEqual((folded, summary.total_reports_considered, summary.total_critical_events), (2, 5, 10))
+        self.assertEqual(summary.last_processed_report_sequence, TaskReport.objects.get(
+            created_at=TaskReport.objects.latest('created_at').created_at).sequence)
+        self.assertFalse(has_unfolded_reports(summary))
+
+    def test_late_committed_report_is_folded_once(self):
+        self._ingest(2)
+        summary, _ = self._fold()
+        latest_run_id = summary.run_id_of_latest_report
+        last_report_datetime = summary.last_report_datetime
+
+        # A report from a transaction that started before the fold but
+        # committed after it: older created_at, no sequence number yet.
+        late = self._ingest(1)[0]
+        TaskReport.objects.filter(run_id=late['run_id']).update(
+            created_at=summary.first_report_datetime - datetime.timedelta(minutes=5),
+        )
+        self.assertTrue(has_unfolded_reports(summary))
+        self.assertEqual(list(tasks_with_unfolded_reports([self.task_uuid])), [self.task_uuid])
+
+        summary, folded = self._fold()
+        self.assertEqual((folded, summary.total_reports_considered, summary.total_critical_events), (1, 3, 6))
+        # The older report does not replace the latest one.
+        self.assertEqual(str(summary.run_id_of_latest_report), str(latest_run_id))
+        self.assertEqual(summary.last_report_datetime, last_report_datetime)
+        self.assertLess(summary.first_report_datetime, last_report_datetime)
+        self.assertEqual(list(tasks_with_unfolded_reports([self.task_uuid])), [])
+
+        self.assertEqual(self._fold()[1], 0)
+        rebuilt, folded = self._fold(full_rebuild=True)
+        self.assertEqual((folded, rebuilt.total_critical_events), (3, 6))
+
+    def test_sequence_follows_numbering_order(self):
+        self._ingest(2)
+        self.assertEqual(assign_report_sequence(), 2)
+        late = self._ingest(1)[0]
+        TaskReport.objects.filter(run_id=late['run_id']).update(created_at=timezone.now() - datetime.timedelta(days=1))
+        self.assertEqual(assign_report_sequence(), 1)
+        self.assertEqual(assign_report_sequence(), 0)
+        self.assertEqual(
+            list(TaskReport.objects.order_by('sequence').values_list('sequence', flat=True)), [1, 2, 3],
+        )
+        self.assertEqual(TaskReport.objects.get(sequence=3).run_id, uuid.UUID(late['run_id']))
+
+    def test_tasks_without_a_summary_are_unfolded(self):
+        self._ingest(1)
+        self.assertEqual(list(tasks_with_unfolded_reports()), [self.task_uuid])
+        self._fold()
+        self.assertFalse(TaskSummaryReportNew.objects.get(task_id=self.task_uuid).last_processed_report_sequence is None)
+        self.assertEqual(list(tasks_with_unfolded_reports()), [])
+
+
+# --- Capped summary lists (summary_engine) ---
+
+@mock.patch.object(summary_engine, 'MAX_COUNT_KEYS', 3)
+@mock.patch.object(summary_engine, 'SAMPLE_SIZE', 4)
+class CappedSummaryListTests(FakeRedisMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.task_uuid = uuid.uuid4()
+        self.client = APIClient()
+
+    def _ingest(self, *event_types):
+        report = raw_report(self.task_uuid, critical_events_summary=[{'type': t} for t in event_types])
+        self.assertEqual(bulk_ingest_reports([report])[0]['status'], RESULT_CREATED)
+
+    def _fold(self):
+        return fold_task_summaries([self.task_uuid])[self.task_uuid][0]
+
+    def test_sample_keeps_the_most_recent_entries(self):
+        self._ingest('a', 'b', 'c')
+        self._ingest('a', 'a', 'b')
+        summary = self._fold()
+        self.assertEqual([e['type'] for e in summary.critical_events_summary], ['c', 'a', 'a', 'b'])
+        self.assertEqual(summary.critical_events_counts, {'a': 3, 'b': 2, 'c': 1})
+
+        self._ingest('c', 'a')
+        summary = self._fold()
+        self.assertEqual([e['type'] for e in summary.critical_events_summary], ['a', 'b', 'c', 'a'])
+        self.assertEqual(summary.critical_events_counts, {'a': 4, 'b': 2, 'c': 2})
+
+    def test_new_types_past_the_cap_are_counted_as_other(self):
+        other = summary_engine.OTHER_COUNT_KEY
+        self._ingest('a', 'b', 'c', 'd')
+        counts = self._fold().critical_events_counts
+        counted_types = set(counts) - {other}
+        self.assertEqual((len(counted_types), counts[other], sum(counts.values())), (3, 1, 4))
+
+        # Types already counted keep their key; new ones go to '__other__'.
+        self._ingest('e', 'f', *counted_types)
+        counts = self._fold().critical_events_counts
+        self.assertEqual(set(counts) - {other}, counted_types)
+        self.assertEqual({counts[t] for t in counted_types}, {2})
+        self.assertEqual((counts[other], sum(counts.values())), (3, 9))
+
+        rebuilt, _ = fold_task_summaries([self.task_uuid], full_rebuild=True)[self.task_uuid]
+        self.assertEqual(len(rebuilt.critical_events_counts), 4)
+        self.assertEqual(sum(rebuilt.critical_events_counts.values()), 9)
+
+    def test_history_endpoint_returns_every_entry(self):
+        for event_types in (('a', 'b', 'c'), ('d', 'e'), ()):
+            self._ingest(*event_types)
+        self.assertEqual(len(self._fold().critical_events_summary), 4)
+
+        url = reverse('task_summary_history', args=[self.task_uuid, 'critical_events_summary'])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        entries = [entry['type'] for item in response.json()['results'] for entry in item['entries']]
+        self.assertEqual(sorted(entries), ['a', 'b', 'c', 'd', 'e'])
+
+        url = reverse('task_summary_history', args=[self.task_uuid, 'total_reports_considered'])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+# --- Report compilation (analysis_report) ---
+
+def edge_case_reports() -> list:
+    """Reports with the values compile_reports() must total exactly as written."""
+    return [
+        {
+            'task_id': 't', 'run_id': 'r1', 'total_login_attempts': True, 'successful_logins': 1, 'failed_logins': 0,
+            'total_login_time': -0.0, '2fa_total_time': None, '2fa_attempts': 2,
+            'critical_events_summary': [{'type': 'captcha'}, {'type': ''}, {}],
+            'page_load_details': {'https://a': {'start_attempts': 1, 'total_page_load_time': 1}},
+        },
+        {
+            'task_id': 't', 'run_id': 'r2', 'total_login_attempts': 2, 'successful_logins': None,
+            'total_login_time': float('nan'), '2fa_total_time': 1.5, '2fa_attempts': 1.0,
+            'attempt_failed_errors': [{'type': 'timeout'}], 'critical_events_summary': None,
+            'page_load_details': {
+                'https://a': {'start_attempts': 1.5, 'total_page_load_time': '2.5', 'load_failed': None},
+                'https://b': {'refresh_failed': False},
+            },
+        },
+        {},
+        'not a report',
+    ]
+
+
+class CompileReportsTests(SimpleTestCase):
+
+    def test_edge_case_values(self):
+        result = compile_reports(edge_case_reports())
+        main = result['main_report']
+        # Bools and ints stay ints; one float makes the total a float.
+        self.assertEqual(repr(main['total_login_attempts']), '3')
+        self.assertEqual(repr(main['total_2fa_attempts']), '3.0')
+        self.assertEqual(repr(main['total_login_time_seconds']), 'nan')
+        self.assertEqual(main['total_login_time'], '0:00:00')
+        self.assertEqual(repr(main['total_2fa_time_seconds']), '1.5')
+        self.assertEqual((main['total_reports_count'], main['final_logins']), (3, '1 out of 3'))
+        self.assertEqual((main['total_critical_events_count'], main['total_attempts_failed']), (3, 1))
+        self.assertEqual(main['unique_critical_event_types'], ['captcha'])
+        self.assertEqual(main['unique_attempts_failed_reasons'], ['timeout'])
+        self.assertEqual(repr(result['aggregate_page_loads']), repr({
+            'https://a': {'start_attempts': 2.5, 'success_page_load': 0, 'total_page_load_time': 3.5,
+                          'refresh_success': 0, 'refresh_failed': 0, 'load_failed': 0},
+            'https://b': {'start_attempts': 0, 'success_page_load': 0, 'total_page_load_time': 0.0,
+                          'refresh_success': 0, 'refresh_failed': 0, 'load_failed': 0},
+        }))
+
+        first, second, absent = result['detailed_reports']
+        self.assertEqual(repr(first['total_login_time_seconds']), '-0.0')
+        self.assertEqual(first['critical_event_types'], ['captcha', '', 'unknown'])
+        self.assertEqual((second['successful_logins'], second['critical_events_summary']), (0, []))
+        self.assertEqual((absent['task'], absent['total_login_attempts'], absent['page_load_summary']), (None, 0, {}))
+
+    def test_merged_halves_match_one_pass(self):
+        def report(i):
+            return {
+                'run_id': f'r{i}', 'total_login_attempts': 1, 'successful_logins': i % 2, 'total_login_time': 0.1 * i,
+                '2fa_total_time': 0.3, 'critical_events_summary': [{'type': f'event-{i % 3}'}],
+                'attempt_failed_errors': [{'type': 'timeout' if i < 4 else f'reason-{i}'}],
+                'page_load_details': {
+                    'https://shared': {'start_attempts': 1, 'success_page_load': i % 2, 'total_page_load_time': 0.7 * i},
+                    f'https://only/{i // 4}': {'start_attempts': 2, 'load_failed': 1, 'total_page_load_time': 1.1},
+                },
+            }
+
+        a, b = [report(i) for i in range(4)], [report(i) for i in range(4, 9)]
+        merged = accumulate_reports(a).merge(accumulate_reports(b)).result()
+        expected = accumulate_reports(a + b).result()
+
+        self.assertEqual(merged['main_report'].keys(), expected['main_report'].keys())
+        for key, value in expected['main_report'].items():
+            if isinstance(value, float):
+                self.assertAlmostEqual(merged['main_report'][key], value, msg=key)
+            else:
+                self.assertEqual(merged['main_report'][key], value, key)
+        self.assertEqual(expected['main_report']['unique_critical_event_types'], ['event-0', 'event-1', 'event-2'])
+        self.assertEqual(len(expected['main_report']['unique_attempts_failed_reasons']), 6)
+
+        self.assertEqual(merged['aggregate_page_loads'].keys(), expected['aggregate_page_loads'].keys())
+        self.assertEqual(len(expected['aggregate_page_loads']), 4)
+        for url, totals in expected['aggregate_page_loads'].items():
+            for key, value in totals.items():
+                self.assertAlmostEqual(merged['aggregate_page_loads'][url][key], value, msg=f'{url} {key}')
+        self.assertEqual(merged['detailed_reports'], expected['detailed_reports'])
+
+    def test_any_iterable_gives_the_same_result(self):
+        self.assertEqual(
+            repr(compile_reports(report for report in edge_case_reports())), repr(compile_reports(edge_case_reports())),
+        )
+
+
+# --- Parallel compilation (parallel_reports) ---
+
+class ParallelCompileTests(TestCase):
+
+    def setUp(self):
+        base = timezone.now() - datetime.timedelta(days=1)
+        tasks = [Task.objects.create(name=f'parallel-{i}', task_type='scraping') for i in range(3)]
+        # 5, 3 and 1 reports per task, interleaved in time. Times are multiples of
+        # 0.25 so float totals do not depend on the order they are added in.
+        for i, task in enumerate(tasks[0:1] * 5 + tasks[1:2] * 3 + tasks[2:3]):
+            report = TaskReport.objects.create(task=task, run_id=uuid.uuid4(), full_report={
+                'total_login_attempts': 1, 'successful_logins': i % 2, 'total_login_time': 0.25 * i,
+                'critical_events_summary': [{'type': f'event-{i % 3}'}],
+                'attempt_failed_errors': [{'type': f'reason-{i % 2}'}] if i % 4 == 0 else [],
+                'page_load_details': {f'https://page/{i % 2}': {'start_attempts': 1, 'total_page_load_time': 0.5 + i}},
+            })
+            TaskReport.objects.filter(id=report.id).update(created_at=base + datetime.timedelta(minutes=7 * ((i * 5) % 9)))
+        self.reports = TaskReport.objects.all()
+
+    def assertSlicesCover(self, slices):
+        ids = [set(self.reports.filter(**report_slice).values_list('id', flat=True)) for report_slice in slices]
+        self.assertEqual(sum(len(slice_ids) for slice_ids in ids), self.reports.count())
+        self.assertEqual(set().union(*ids), set(self.reports.values_list('id', flat=True)))
+
+    def test_slices_are_disjoint_and_cover_every_report(self):
+        for count in (2, 3, 4, 10):
+            task_slices = _task_slices(self.reports, count)
+            self.assertEqual(len(task_slices), min(count, 3))
+            self.assertSlicesCover(task_slices)
+            created_at_slices = _created_at_slices(self.reports, count)
+            self.assertEqual(len(created_at_slices), count)
+            self.assertSlicesCover(created_at_slices)
+
+        # One created_at for every report: the range has no length to split.
+        self.reports.update(created_at=timezone.now())
+        self.assertEqual(_created_at_slices(self.reports, 4), [{}])
+        self.assertSlicesCover(_created_at_slices(self.reports, 4))
+        self.assertEqual(_created_at_slices(TaskReport.objects.none(), 4), [])
+
+    def test_merged_slices_match_compile_reports(self):
+        expected = compile_reports(report_dicts(self.reports.order_by('created_at', 'id')))
+        for partition in PARTITIONS:
+            # workers=1 folds in this process; more slices than one exercise the merge.
+            with mock.patch.object(parallel_reports, 'partition_reports',
+                                   lambda qs, partition, count: partition_reports(qs, partition, 3)):
+                result = compile_reports_parallel(workers=1, partition=partition)
+            self.assertEqual(result['main_report'], expected['main_report'], partition)
+            self.assertEqual(result['aggregate_page_loads'], expected['aggregate_page_loads'], partition)
+            self.assertEqual(len(result['detailed_reports']), 9)
+        self.assertEqual(compile_reports_parallel({'task__name': 'parallel-0'})['main_report']['total_reports_count'], 5)
+
+
+# --- Mergeable sketches (latency_sketch, distinct_sketch) ---
+
+class SketchMergeTests(TestCase):
+
+    def test_hyperloglog_merge_is_the_union(self):
+        values = [f'run-{i}' for i in range(30000)]
+        whole = HyperLogLog()
+        parts = [HyperLogLog() for _ in range(6)]
+        for i, value in enumerate(values):
+            whole.add(value)
+            # Overlapping parts: every value lands in two of them.
+            parts[i % 6].add(value)
+            parts[(i + 1) % 6].add(value)
+        merged = HyperLogLog()
+        for part in parts:
+            merged.merge(HyperLogLog.from_dict(part.to_dict()))
+        self.assertEqual(merged.registers, whole.registers)
+        self.assertAlmostEqual(merged.count(), len(values), delta=len(values) * 0.05)
+
+    def test_hyperloglog_small_counts_and_mixed_precision(self):
+        small = HyperLogLog()
+        for value in range(50):
+            small.add(value)
+        self.assertEqual(small.count(), 50)
+        coarse = HyperLogLog(precision=10)
+        for value in range(50, 5050):
+            coarse.add(value)
+        merged = HyperLogLog().merge(small).merge(coarse)
+        self.assertEqual(merged.precision, 10)
+        self.assertAlmostEqual(merged.count(), 5050, delta=5050 * 0.1)
+
+    def test_latency_merge_keeps_relative_accuracy(self):
+        values = [1.05 ** i for i in range(200)] * 3
+        parts = [LatencySketch() for _ in range(4)]
+        for i, value in enumerate(values):
+            parts[i % 4].add(value)
+        merged = LatencySketch()
+        for part in parts:
+            merged.merge(LatencySketch.from_dict(part.to_dict()))
+        self.assertEqual(merged.count, len(values))
+        ordered = sorted(values)
+        for q in (0.5, 0.9, 0.99):
+            exact = ordered[int(q * (len(ordered) - 1))]
+            self.assertLessEqual(abs(merged.quantile(q) - exact) / exact, 0.02)
+
+
+class SketchRollupViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.job_uuid = uuid.uuid4()
+        for i in range(3):
+            task = Task.objects.create(job_uuid=cls.job_uuid, name=f'task {i}', task_type='scraping')
+            latencies, distincts = LatencySketches(), DistinctSketches()
+            latencies.add('login', 2.0 + i)
+            distincts.add_all('runs', [f'run-{i}', 'shared-run'])
+            TaskSummaryReportNew.objects.create(
+                task=task, latency_sketches=latencies.to_dict(), distinct_sketches=distincts.to_dict(),
+            )
+
+    def test_merges_the_matching_summaries(self):
+        response = self.client.get(reverse('distinct_counts'), {'job_uuid': str(self.job_uuid)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['tasks'], response.json()['distinct_counts']['runs']), (3, 4))
+        response = self.client.get(reverse('latency_percentiles'), {'task_type': 'scraping'})
+        self.assertEqual(response.json()['latency_percentiles']['login']['count'], 3)
+
+    def test_requires_a_filter(self):
+        for name in ('distinct_counts', 'latency_percentiles'):
+            self.assertEqual(self.client.get(reverse(name)).status_code, 400)
+
+    def test_caps_the_number_of_summaries(self):
+        with mock.patch('reporting.views.SummarySketchRollupView.max_tasks', 2):
+            response = self.client.get(reverse('distinct_counts'), {'job_uuid': str(self.job_uuid)})
+        self.assertEqual(response.status_code, 400)
+
+
+# --- Task and job cost (cost_engine, job_rollup) ---
+
+class CostPricingTests(FakeRedisMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.job_uuid = uuid.uuid4()
+        CostUnitConfig.objects.create(unit_name='per_user_scraped', cost_per_unit=Decimal('0.012345'))
+        CostUnitConfig.objects.create(unit_name='per_report', cost_per_unit=Decimal('0.5'))
+        CostUnitConfig.objects.create(unit_name='per_gb_downloaded', cost_per_unit=Decimal('9'))
+
+    def _summary(self, users, reports=1):
+        task = Task.objects.create(job_uuid=self.job_uuid, name='task', task_type='scraping')
+        return TaskSummaryReportNew.objects.create(task=task, total_users_scraped=users, total_reports_considered=reports)
+
+    def _job_cost(self):
+        return JobAnalysisReport.objects.get(job_uuid=self.job_uuid).total_job_cost
+
+    def test_tasks_are_priced_and_summed_into_the_job(self):
+        first, second = self._summary(1000, reports=3), self._summary(7)
+        roll_up_summaries(TaskSummaryReportNew.objects.all())
+        first.refresh_from_db()
+        second.refresh_from_db()
+        # Units without a summary counter (per_gb_downloaded) are not charged.
+        self.assertEqual(first.task_cost, Decimal('13.8450'))
+        self.assertEqual(second.task_cost, Decimal('0.5864'))  # 0.586415 rounded half up
+        self.assertEqual(self._job_cost(), Decimal('14.4314'))
+        self.assertEqual(roll_up_summaries(TaskSummaryReportNew.objects.all()), 0)
+
+    def test_rate_change_reprices_tasks(self):
+        self._summary(1000)
+        roll_up_summaries(TaskSummaryReportNew.objects.all())
+        with self.captureOnCommitCallbacks(execute=True):
+            CostUnitConfig.objects.get(unit_name='per_user_scraped').delete()
+        self.assertEqual(roll_up_summaries(TaskSummaryReportNew.objects.all()), 1)
+        self.assertEqual(self._job_cost(), Decimal('0.5'))
+
+    def test_job_cost_wider_than_a_task_cost(self):
+        # Near the 12-digit task_cost limit each; their sum needs more digits.
+        CostUnitConfig.objects.filter(unit_name='per_user_scraped').update(cost_per_unit=Decimal('0.09'))
+        for _ in range(2):
+            self._summary(1_000_000_000)
+        roll_up_summaries(TaskSummaryReportNew.objects.all())
+        self.assertEqual(self._job_cost(), Decimal('180000001.0000'))
+
+
+# --- Job totals (job_rollup) ---
+
+class JobRollupTests(FakeRedisMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.job_uuid = uuid.uuid4()
+        self.task = Task.objects.create(job_uuid=self.job_uuid, name='task', task_type='scraping')
+        self.summary = TaskSummaryReportNew.objects.create(
+            task=self.task, total_users_scraped=10, total_attempt_failed=3, failed_to_download_file_count=2,
+            latest_task_status='Completed', has_billing_exception=True,
+        )
+        roll_up_summaries(TaskSummaryReportNew.objects.all())
+
+    def _job(self, job_uuid=None):
+        return JobAnalysisReport.objects.get(job_uuid=job_uuid or self.job_uuid)
+
+    def assertJobTotals(self, job, tasks, completed, users, failed, billing_tasks):
+        self.assertEqual(
+            (job.total_tasks_in_job, job.tasks_completed_successfully, job.total_users_scraped,
+             job.total_requests_failed, job.billing_issue_tasks, job.has_any_billing_issue),
+            (tasks, completed, users, failed, billing_tasks, bool(billing_tasks)),
+        )
+
+    def test_contributions_add_up(self):
+        other = Task.objects.create(job_uuid=self.job_uuid, name='other', task_type='scraping')
+        TaskSummaryReportNew.objects.create(task=other, total_users_scraped=5, latest_task_status='Failed')
+        self.assertEqual(roll_up_summaries(TaskSummaryReportNew.objects.all()), 1)
+        self.assertJobTotals(self._job(), 2, 1, 15, 5, [str(self.task.uuid)])
+        self.assertEqual(roll_up_summaries(TaskSummaryReportNew.objects.all()), 0)
+
+    def test_deleted_task_is_retracted(self):
+        self.task.delete()
+        self.assertJobTotals(self._job(), 0, 0, 0, 0, [])
+
+    def test_task_moved_to_another_job(self):
+        new_job_uuid = uuid.uuid4()
+        Task.objects.filter(pk=self.task.pk).update(job_uuid=new_job_uuid)
+        roll_up_summaries(TaskSummaryReportNew.objects.all())
+        self.assertJobTotals(self._job(), 0, 0, 0, 0, [])
+        self.assertJobTotals(self._job(new_job_uuid), 1, 1, 10, 5, [str(self.task.uuid)])
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_reset_touches_and_publishes_the_reset_summaries(self):
+        cache.clear()
+        before = TaskSummaryReportNew.objects.get(pk=self.summary.pk).updated_at
+        with self.captureOnCommitCallbacks(execute=True):
+            reset_job_rollups()
+        summary = TaskSummaryReportNew.objects.get(pk=self.summary.pk)
+        self.assertEqual(summary.job_contribution, {})
+        self.assertGreater(summary.updated_at, before)
+        self.assertEqual(self._job().updated_at, summary.updated_at)
+        self.assertEqual(cache.get(summary_cache.version_key(self.task.uuid)), summary.updated_at.isoformat())
+        self.assertJobTotals(self._job(), 0, 0, 0, 0, [])
+
+        self.assertEqual(roll_up_summaries(TaskSummaryReportNew.objects.all()), 1)
+        self.assertJobTotals(self._job(), 1, 1, 10, 5, [str(self.task.uuid)])
+
+    def test_issue_update_view_moves_the_job_totals(self):
+        url = reverse('update_task_summaries')
+        payload = {'task_uuid': str(self.task.uuid), 'status': 'resolved', 'issues': ['login attempts failed']}
+        with mock.patch('builtins.print'):
+            response = self.client.post(url, json.dumps(payload), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.summary.refresh_from_db()
+        self.assertEqual(self.summary.total_attempt_failed, 0)
+        self.assertEqual(self.summary.job_contribution['total_requests_failed'], 2)
+        self.assertJobTotals(self._job(), 1, 1, 10, 2, [str(self.task.uuid)])
+
+    def test_issue_update_view_saves_only_the_changed_fields(self):
+        url = reverse('update_task_summaries')
+        payload = {'task_uuid': str(self.task.uuid), 'status': 'resolved', 'issue': 'login attempts failed'}
+        original_save = TaskSummaryReportNew.save
+        saved_fields = []
+
+        def save(summary, *args, **kwargs):
+            saved_fields.append(kwargs.get('update_fields'))
+            return original_save(summary, *args, **kwargs)
+
+        with mock.patch.object(TaskSummaryReportNew, 'save', save), mock.patch('builtins.print'):
+            self.client.post(url, json.dumps(payload), content_type='application/json')
+        self.assertEqual(saved_fields, [['total_attempt_failed', 'task_cost', 'job_contribution', 'updated_at']])
+
+
+# --- Summary response cache (summary_cache) ---
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SummaryCacheTests(FakeRedisMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client = APIClient()
+        self.task_uuid = uuid.uuid4()
+        self.url = reverse('task_summary_detail', args=[self.task_uuid])
+        self._ingest()
+        with self.captureOnCommitCallbacks(execute=True):
+            fold_task_summaries([self.task_uuid])
+
+    def _ingest(self):
+        self.assertEqual(bulk_ingest_reports([raw_report(self.task_uuid)])[0]['status'], RESULT_CREATED)
+
+    def _reports_considered(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['total_reports_considered']
+
+    def test_payload_is_served_until_a_new_version_is_published(self):
+        self.assertEqual(self._reports_considered(), 1)
+        # Only the validators query: the payload comes from the cache.
+        with self.assertNumQueries(1):
+            self.assertEqual(self._reports_considered(), 1)
+
+        # A write that publishes no version is not seen...
+        TaskSummaryReportNew.objects.filter(task_id=self.task_uuid).update(total_reports_considered=99)
+        self.assertEqual(self._reports_considered(), 1)
+
+        # ...while the fold publishes its new version once it commits.
+        self._ingest()
+        with self.captureOnCommitCallbacks(execute=True):
+            fold_task_summaries([self.task_uuid])
+        self.assertEqual(self._reports_considered(), 100)
+
+    def test_saved_summary_is_published(self):
+        self._reports_considered()
+        summary = TaskSummaryReportNew.objects.get(task_id=self.task_uuid)
+        summary.total_reports_considered = 7
+        with self.captureOnCommitCallbacks(execute=True):
+            summary.save()
+        self.assertEqual(self._reports_considered(), 7)
+
+    def test_deleted_summary_is_forgotten(self):
+        self._reports_considered()
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.filter(uuid=self.task_uuid).delete()
+        self.assertIsNone(cache.get(summary_cache.version_key(self.task_uuid)))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_unreachable_cache_reads_the_database(self):
+        with mock.patch.object(summary_cache.cache, 'get', side_effect=RedisError('down')), \
+                self.assertLogs(summary_cache.logger, 'WARNING'):
+            self.assertEqual(self._reports_considered(), 1)
+
+    def test_request_behind_a_slow_rebuild_reads_the_database(self):
+        cache.add(summary_cache.lock_key(self.task_uuid), 1)
+        with mock.patch.object(summary_cache, 'LOCK_WAIT_SECONDS', 0.1):
+            self.assertEqual(self._reports_considered(), 1)
+        # The request holding the lock stores the payload, not this one.
+        version = cache.get(summary_cache.version_key(self.task_uuid))
+        self.assertIsNone(cache.get(summary_cache.payload_key(self.task_uuid, version)))
+
+
+# --- Sparse fieldsets (sparse_fields) ---
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SparseFieldsTests(FakeRedisMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client = APIClient()
+        self.task_uuid = uuid.uuid4()
+        bulk_ingest_reports([raw_report(self.task_uuid, big={'rows': list(range(100))}) for _ in range(2)])
+        fold_task_summaries([self.task_uuid])
+        TaskSummaryReport.objects.create(task_id=self.task_uuid, total_runs_completed=3, aggregated_scraped_data={'users': 1})
+
+    def _page(self, url, params):
+        """(rows, SQL of the page query) of a list GET."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        page_sql = [query['sql'] for query in queries if 'ORDER BY' in query['sql']]
+        self.assertEqual(len(page_sql), 1)
+        return response.json()['results'], page_sql[0]
+
+    def test_report_list_loads_only_the_selected_columns(self):
+        url = reverse('raw_task_report_list')
+        rows, sql = self._page(url, {})
+        self.assertNotIn('full_report', rows[0])
+        self.assertNotIn('"full_report"', sql)
+
+        rows, sql = self._page(url, {'fields': 'service,task_uuid'})
+        self.assertEqual(set(rows[0]), {'service', 'task_uuid'})
+        self.assertNotIn('"full_report"', sql)
+        self.assertNotIn('"data_point"', sql)
+
+        rows, sql = self._page(url, {'exclude': 'data_point'})
+        self.assertIn('full_report', rows[0])
+        self.assertNotIn('data_point', rows[0])
+        self.assertEqual(rows[0]['full_report']['big']['rows'][-1], 99)
+
+        rows, sql = self._page(url, {'fields': '__all__'})
+        self.assertIn('full_report', rows[0])
+        self.assertIn('"full_report"', sql)
+
+    def test_summary_list_leaves_out_the_aggregated_columns(self):
+        url = reverse('task_summary_list')
+        rows, sql = self._page(url, {})
+        self.assertNotIn('aggregated_scraped_data', rows[0])
+        self.assertNotIn('"aggregated_scraped_data"', sql)
+
+        rows, sql = self._page(url, {'fields': 'total_runs_completed,aggregated_scraped_data'})
+        self.assertEqual(rows, [{'total_runs_completed': 3, 'aggregated_scraped_data': {'users': 1}}])
+        self.assertNotIn('"all_exceptions"', sql)
+        self.assertNotIn('"reporting_task"', sql)
+
+    def test_detail_view_selects_from_the_cached_payload(self):
+        url = reverse('task_summary_detail', args=[self.task_uuid])
+        full = self.client.get(url).json()
+        response = self.client.get(url, {'fields': 'total_reports_considered,task_details'})
+        self.assertEqual(response.json(), {name: full[name] for name in ('task_details', 'total_reports_considered')})
+        response = self.client.get(url, {'exclude': 'critical_events_summary'})
+        self.assertEqual(set(response.json()), set(full) - {'critical_events_summary'})
+
+    def test_unknown_fields_are_rejected(self):
+        for url in (reverse('raw_task_report_list'), reverse('task_summary_list'), reverse('task_summary_detail', args=[self.task_uuid])):
+            response = self.client.get(url, {'fields': 'service,nope'})
+            self.assertEqual(response.status_code, 400, url)
+            self.assertIn('nope', response.json()['fields'])
+            self.assertEqual(self.client.get(url, {'exclude': 'nope'}).status_code, 400, url)
+
+
+# --- Conditional GET (conditional_get) ---
+
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        self.jobs = [JobAnalysisReport.objects.create(job_uuid=uuid.uuid4(), has_any_billing_issue=True) for _ in range(3)]
+        self.url = reverse('job_report_list')
+
+    def _get(self, url, params=None, **headers):
+        return self.client.get(url, params or {}, headers=headers)
+
+    def test_unchanged_list_is_not_modified(self):
+        response = self._get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+        response = self._get(self.url, if_none_match=response['ETag'])
+        self.assertEqual((response.status_code, response.content), (304, b''))
+
+    def test_deleted_row_changes_the_list_etag(self):
+        etag = self._get(self.url)['ETag']
+        newest = max(self.jobs, key=lambda job: job.updated_at)
+        JobAnalysisReport.objects.exclude(pk=newest.pk).first().delete()
+        response = self._get(self.url, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_row_leaving_the_filter_changes_the_list_etag(self):
+        params = {'has_any_billing_issue': 'true'}
+        etag = self._get(self.url, params)['ETag']
+        self.jobs[0].has_any_billing_issue = False
+        self.jobs[0].save()
+        response = self._get(self.url, params, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_changed_row_on_the_page_changes_the_list_etag(self):
+        etag = self._get(self.url)['ETag']
+        # Not the newest row, and updated_at is left alone.
+        JobAnalysisReport.objects.filter(pk=self.jobs[0].pk).update(total_tasks_in_job=5)
+        self.assertEqual(self._get(self.url, if_none_match=etag).status_code, 200)
+
+    def test_report_list_poll_reads_only_the_page(self):
+        task = Task.objects.create(name='polled', task_type='scraping')
+        TaskReport.objects.bulk_create([TaskReport(task=task, run_id=uuid.uuid4(), full_report={}) for _ in range(3)])
+        url = reverse('raw_task_report_list')
+        etag = self._get(url, {'limit': 2})['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self._get(url, {'limit': 2}, if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('COUNT(', queries[0]['sql'].upper())
+        self.assertNotIn('MAX(', queries[0]['sql'].upper())
+
+    def test_detail_view_answers_if_modified_since(self):
+        url = reverse('job_report_detail', args=[self.jobs[0].job_uuid])
+        response = self._get(url)
+        self.assertEqual(self._get(url, if_modified_since=response['Last-Modified']).status_code, 304)
+        self.assertEqual(self._get(url, if_none_match=response['ETag']).status_code, 304)
+        self.jobs[0].updated_at = timezone.now() + datetime.timedelta(seconds=2)
+        JobAnalysisReport.objects.filter(pk=self.jobs[0].pk).update(updated_at=self.jobs[0].updated_at)
+        self.assertEqual(self._get(url, if_none_match=response['ETag']).status_code, 200)
+
+
+# --- Metric rollups (metric_rollup) ---
+
+class MetricRollupTests(FakeRedisMixin, TestCase):
+
+    def _ingest(self, count, created_at):
+        reports = [raw_report(critical_events_count=1) for _ in range(count)]
+        bulk_ingest_reports(reports)
+        run_ids = [r['run_id'] for r in reports]
+        TaskReport.objects.filter(run_id__in=run_ids).update(created_at=created_at)
+        TaskReportMetrics.objects.filter(report__run_id__in=run_ids).update(created_at=created_at)
+
+    def _hourly(self):
+        return dict(ReportMetricRollupHourly.objects.values_list('bucket_start').annotate(total=Sum('report_count')))
+
+    def test_rollup_is_incremental_and_counts_late_reports_once(self):
+        hour = timezone.now().replace(minute=0, second=0, microsecond=0, tzinfo=datetime.timezone.utc)
+        earlier = hour - datetime.timedelta(hours=1)
+        self._ingest(3, hour + datetime.timedelta(minutes=5))
+        self.assertIsNone(rolled_up_until())
+        self.assertEqual(roll_up_report_metrics(batch_size=2), 3)
+        self.assertEqual(self._hourly(), {hour: 3})
+        self.assertEqual(rolled_up_until(), hour + datetime.timedelta(minutes=5))
+        self.assertEqual(roll_up_report_metrics(), 0)
+
+        # Committed after the run, with a created_at in an hour already rolled up.
+        self._ingest(2, earlier + datetime.timedelta(minutes=30))
+        self.assertEqual(roll_up_report_metrics(), 2)
+        self.assertEqual(roll_up_report_metrics(), 0)
+        self.assertEqual(self._hourly(), {earlier: 2, hour: 3})
+        self.assertEqual(
+            ReportMetricRollupDaily.objects.aggregate(total=Sum('critical_events_count'))['total'], 5,
+        )
+
+
+# --- Keyset pagination (pagination) ---
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        task = Task.objects.create(name='paged', task_type='scraping')
+        end = datetime.datetime(2025, 3, 1, 12, 0, 0, 123456, tzinfo=datetime.timezone.utc)
+        # Ties and NULLs in the ordering column; the primary key breaks them.
+        ends = [end, None, end, end + datetime.timedelta(microseconds=1), None, end - datetime.timedelta(hours=1), None]
+        for report_end_datetime in ends:
+            TaskReport.objects.create(task=task, run_id=uuid.uuid4(), full_report={}, report_end_datetime=report_end_datetime)
+        # NULLs sort as the largest value.
+        cls.ascending = [str(report.id) for report in sorted(
+            TaskReport.objects.all(), key=lambda r: (r.report_end_datetime is None, r.report_end_datetime or end, r.id),
+        )]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('raw_task_report_list')
+
+    def _walk(self, response, link):
+        """Ids of every page from `response` on, following `link` ('next' or 'previous')."""
+        pages = []
+        while True:
+            self.assertEqual(response.status_code, 200)
+            pages.append([row['id'] for row in response.json()['results']])
+            if response.json()[link] is None:
+                return pages
+            response = self.client.get(response.json()[link])
+
+    def test_every_row_appears_once_in_order(self):
+        for ordering, expected in (
+            ('report_end_datetime', self.ascending),
+            ('-report_end_datetime', self.ascending[::-1]),
+        ):
+            for limit in (1, 2, 3, 7):
+                pages = self._walk(self.client.get(self.url, {'ordering': ordering, 'limit': limit}), 'next')
+                self.assertEqual(sum(pages, []), expected, (ordering, limit))
+                self.assertTrue(all(len(page) == limit for page in pages[:-1]))
+
+    def test_previous_links_walk_back_to_the_first_page(self):
+        params = {'ordering': 'report_end_datetime', 'limit': 2}
+        response = self.client.get(self.url, params)
+        self.assertIsNone(response.json()['previous'])
+        while response.json()['next']:
+            response = self.client.get(response.json()['next'])
+        pages = self._walk(response, 'previous')
+        self.assertEqual(sum(pages[::-1], []), self.ascending)
+        self.assertEqual(pages[-1], self.ascending[:2])
+
+    def test_invalid_cursor_and_deep_offset(self):
+        self.assertEqual(self.client.get(self.url, {'cursor': 'garbage'}).status_code, 404)
+        response = self.client.get(self.url, {'offset': 2, 'limit': 2})
+        self.assertEqual((response.json()['count'], len(response.json()['results'])), (7, 2))
+        with mock.patch('reporting.pagination.MAX_OFFSET', 5):
+            self.assertEqual(self.client.get(self.url, {'offset': 6}).status_code, 404)
+
+
+# --- .values() list path (fast_serializers) ---
+
+def _render(data) -> bytes:
+    return JSONRenderer().render(data)
+
+
+def _render_list(data) -> list:
+    """`data` as the client sees it (JSON types)."""
+    return json.loads(_render(data))
+
+
+class ValuesSerializerParityTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        start = datetime.datetime(2025, 3, 1, 12, 0, 0, 123456, tzinfo=datetime.timezone.utc)
+        for i in range(5):
+            task = Task.objects.create(
+                job_uuid=uuid.uuid4() if i % 2 else None, name=f'task {i}', task_type='scraping', interact=bool(i % 2),
+            )
+            TaskAnalysisReport.objects.create(
+                task=task,
+                overall_task_status='Completed' if i % 2 else 'Failed',
+                report_start_datetime=start + datetime.timedelta(minutes=i) if i != 3 else None,
+                report_end_datetime=start + datetime.timedelta(minutes=i, seconds=30) if i != 4 else None,
+                total_task_runtime_text='30s',
+                total_task_runtime_seconds=30.5 + i,
+                runs_initiated=i, runs_completed=i, runs_failed_exception=0, runs_incomplete=0,
+                found_next_page_info_count=1, next_page_info_not_found_count=0,
+                saved_file_count=2, downloaded_file_count=2, failed_download_count=0,
+                overall_bot_login_status='Logged In',
+                last_status_of_task='done',
+                billing_issue_resolution_status='',
+                scraped_data_summary={'users': i, 'nested': {'posts': [1, 2]}},
+                data_enrichment_summary={},
+                non_fatal_errors_summary='',
+                exceptions_summary='none',
+                specific_exception_reasons='',
+                failed_downloads_summary='',
+            )
+            TaskSummaryReport.objects.create(
+                task=task,
+                total_runs_completed=i,
+                cumulative_total_runtime_seconds=1.25 * i,
+                latest_overall_task_status='Completed' if i % 2 else None,
+                latest_report_start_datetime=start if i % 2 else None,
+                run_id_of_latest_report=uuid.uuid4() if i % 2 else None,
+                aggregated_scraped_data={'users': i},
+                all_exceptions=['timeout'] * i,
+                has_next_page_info=[None, True, False][i % 3],
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def assertSameOutput(self, serializer_class, queryset):
+        expected = serializer_class(queryset, many=True).data
+        values_serializer = ValuesSerializer(serializer_class)
+        actual = values_serializer.to_representation(values_serializer.values(queryset))
+        self.assertEqual(_render(actual), _render(expected))
+
+    def test_task_summary_report_rows(self):
+        self.assertSameOutput(TaskSummaryReportSerializer, TaskSummaryReport.objects.select_related('task'))
+
+    def test_task_analysis_report_rows(self):
+        self.assertSameOutput(TaskAnalysisReportSerializer, TaskAnalysisReport.objects.select_related('task'))
+
+    def test_rows_in_current_timezone(self):
+        with timezone.override('Asia/Kolkata'):
+            self.assertSameOutput(TaskAnalysisReportSerializer, TaskAnalysisReport.objects.select_related('task'))
+
+    def test_selected_fields(self):
+        fields = ('task_details', 'total_runs_completed', 'updated_at')
+        queryset = TaskSummaryReport.objects.select_related('task')
+        serializer = TaskSummaryReportSerializer(queryset, many=True)
+        for name in list(serializer.child.fields):
+            if name not in fields:
+                serializer.child.fields.pop(name)
+        values_serializer = ValuesSerializer(TaskSummaryReportSerializer, fields)
+        actual = values_serializer.to_representation(values_serializer.values(queryset))
+        self.assertEqual(_render(actual), _render(serializer.data))
+
+    def _pages(self, url, params):
+        """Every row of a cursor-paginated list, following `next`."""
+        response = self.client.get(url, params)
+        results = []
+        while True:
+            self.assertEqual(response.status_code, 200)
+            results.extend(response.json()['results'])
+            if response.json()['next'] is None:
+                return results
+            response = self.client.get(response.json()['next'])
+
+    def test_task_summary_list_endpoint(self):
+        url = reverse('task_summary_list')
+        queryset = TaskSummaryReport.objects.select_related('task').order_by('-updated_at', '-task_id')
+        expected = TaskSummaryReportSerializer(queryset, many=True).data
+        rows = self._pages(url, {'fields': '__all__', 'limit': 2})
+        self.assertEqual(_render(rows), _render(expected))
+
+        rows = self._pages(url, {'limit': 2})
+        self.assertNotIn('aggregated_scraped_data', rows[0])
+        self.assertEqual(rows, [{name: row[name] for name in rows[0]} for row in _render_list(expected)])
+
+        rows = self._pages(url, {'fields': 'total_runs_completed', 'ordering': 'total_runs_completed'})
+        self.assertEqual(rows, [{'total_runs_completed': i} for i in range(5)])
+
+    def test_task_analysis_report_list_endpoint(self):
+        url = reverse('task_report_list_create')
+        for params in ({'limit': 2}, {'ordering': 'report_end_datetime', 'limit': 3}):
+            rows = self._pages(url, params)
+            ordering = params.get('ordering', '-report_start_datetime')
+            run_ids = [row['run_id'] for row in rows]
+            self.assertEqual(len(set(run_ids)), 5)
+            queryset = TaskAnalysisReport.objects.select_related('task').filter(run_id__in=run_ids)
+            by_run_id = {row['run_id']: row for row in _render_list(TaskAnalysisReportSerializer(queryset, many=True).data)}
+            self.assertEqual(rows, [by_run_id[run_id] for run_id in run_ids], ordering)
+
+        response = self.client.get(url, {'offset': 1, 'limit': 2})
+        self.assertEqual(response.json()['count'], 5)
+        self.assertEqual(len(response.json()['results']), 2)
@@ -1,15 +1,32 @@
 from django.urls import path
-from .views import update_task_summaries,TaskAnalysisReportListCreateAPIView,TaskSummaryReportListView,TaskSummaryReportDetailViewNew
+from .views import update_task_summaries,TaskAnalysisReportListCreateAPIView,TaskSummaryReportListView,TaskSummaryReportDetailViewNew,TaskSummaryHistoryView,ingest_task_reports_ndjson,TaskReportBatchStatusView,LatencyPercentilesView,DistinctCountsView,JobAnalysisReportListView,JobAnalysisReportDetailView,MetricTimeSeriesView,TaskReportListView
 
 urlpatterns = [
     # This single endpoint now handles both POST (ingestion) and GET (consumption)
     # for TaskAnalysisReport instances.
     path('task-reports/', TaskAnalysisReportListCreateAPIView.as_view(), name='task_report_list_create'),
+    # Streaming NDJSON ingestion (optionally gzip-encoded) for very large batches.
+    path('task-reports/stream/', ingest_task_reports_ndjson, name='task_report_stream_ingest'),
+    # Progress of a batch queued with POST task-reports/?mode=async
+    path('task-reports/batches/<uuid:batch_id>/', TaskReportBatchStatusView.as_view(), name='task_report_batch_status'),
+    # Raw TaskReports, cursor-paginated.
+    path('reports/', TaskReportListView.as_view(), name='raw_task_report_list'),
     path('task-summaries/', TaskSummaryReportListView.as_view(), name='task_summary_list'),
 
     # 2. Retrieves a single TaskSummaryReport instance.
     #    The lookup is performed using the 'task_uuid' (UUID of the related Task).
     #    The '<uuid:task_uuid>' part captures a UUID from the URL and passes it as 'task_uuid' to the view.
     path('task-summaries/<uuid:task_uuid>/', TaskSummaryReportDetailViewNew.as_view(), name='task_summary_detail'),
-    path('task-summaries/update/', update_task_summaries, name='update_task_summaries')
+    # Full history of a summary's capped event/error lists, paginated from TaskReport.
+    path('task-summaries/<uuid:task_uuid>/history/<str:field>/', TaskSummaryHistoryView.as_view(), name='task_summary_history'),
+    path('task-summaries/update/', update_task_summaries, name='update_task_summaries'),
+    # p50/p90/p99 latencies merged across the task summaries of a job and/or task type.
+    path('latency-percentiles/', LatencyPercentilesView.as_view(), name='latency_percentiles'),
+    # Approximate distinct runs / page URLs / critical event types across tasks of a job and/or task type.
+    path('distinct-counts/', DistinctCountsView.as_view(), name='distinct_counts'),
+    # Job-level totals, rolled up incrementally from the task summaries of each job.
+    path('jobs/', JobAnalysisReportListView.as_view(), name='job_report_list'),
+    path('jobs/<uuid:job_uuid>/', JobAnalysisReportDetailView.as_view(), name='job_report_detail'),
+    # Report metrics per hour/day bucket from the metric rollups, for trend dashboards.
+    path('timeseries/', MetricTimeSeriesView.as_view(), name='metric_timeseries'),
 ]
\ No newline at end of file
@@ -7,17 +7,41 @@ import json
 import logging
 import datetime
 import uuid
+from django.conf import settings
 from .analysis_report import generate_task_report_summary
+from .ingestion import bulk_ingest_reports, count_results, ensure_tasks, stored_report_keys, RESULT_CREATED, RESULT_DUPLICATE, RESULT_ERROR
+from .ingest_queue import enqueue_reports, get_batch_status
+from .dedupe import raw_report_dedupe_key, seen_keys, mark_seen
+from .task_cache import known_tasks
+from .dirty_tasks import mark_dirty
+from .metrics import build_report_metrics
+from .latency_sketch import merge_latency_sketches
+from .distinct_sketch import merge_distinct_sketches
+from .metric_rollup import METRIC_FIELDS, timeseries
+from redis.exceptions import RedisError
 
 from rest_framework import generics, filters, status
 from rest_framework.generics import RetrieveAPIView
+from rest_framework.views import APIView
+from rest_framework.reverse import reverse
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from django.db import transaction, IntegrityError
 from django.db.models import Q # For complex queries
-
-from .models import TaskAnalysisReport, TaskSummaryReport,TaskReport,Task,TaskSummaryReportNew
-from .serializers import TaskAnalysisReportSerializer,TaskSummaryReportSerializer,TaskSummaryReportNewSerializer
+from django.db.models.fields.json import KeyTransform
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import TaskAnalysisReport, TaskSummaryReport,TaskReport,Task,TaskSummaryReportNew,JobAnalysisReport
+from .serializers import TaskAnalysisReportSerializer,TaskSummaryReportSerializer,TaskSummaryReportNewSerializer,TaskReportHistoryEntrySerializer,JobAnalysisReportSerializer,TaskReportSerializer
+from .pagination import KeysetPagination
+from .summary_cache import get_summary_payload
+from .conditional_get import ConditionalGetMixin
+from .sparse_fields import SparseFieldsMixin, select_fields
+from .fast_serializers import ValuesListMixin
+from .summary_engine import HISTORY_REPORT_KEYS
+from .job_rollup import apply_job_deltas
 from django_filters.rest_framework import DjangoFilterBackend
 import django_filters
 # Removed: from .utils.redis_tracker import add_processed_task_report_run_id
@@ -25,12 +49,24 @@ import django_filters
 
 logger = logging.getLogger(__name__)
 
+def bulk_response_status(counts: dict) -> int:
+    """HTTP status for a set-based ingestion outcome (see ingestion.count_results)."""
+    if counts[RESULT_CREATED]:
+        return status.HTTP_201_CREATED
+    if counts[RESULT_DUPLICATE]:
+        # Retried batches are not an error; there was just nothing new to store.
+        return status.HTTP_200_OK
+    return status.HTTP_400_BAD_REQUEST
+
+
 # --- DRF View for Task Analysis Report Ingestion (POST) and Consumption (GET) ---
 
-class TaskAnalysisReportListCreateAPIView(generics.ListCreateAPIView):
+class TaskAnalysisReportListCreateAPIView(ValuesListMixin, generics.ListCreateAPIView):
     """
     API endpoint to ingest (POST) a batch of TaskAnalysisReport instances
     and to retrieve (GET) a list of TaskAnalysisReport instances.
+    GET pages are read with .values() and rendered without per-row serializers
+    (see fast_serializers).
     """
     queryset = TaskAnalysisReport.objects.all().select_related('task')
     serializer_class = TaskAnalysisReportSerializer
@@ -42,6 +78,8 @@ class TaskAnalysisReportListCreateAPIView(generics.ListCreateAPIView):
         'downloaded_file_count', 'saved_file_count', 'overall_task_status'
     ]
     ordering = ['-report_start_datetime']
+    # Cursor pages on (ordering, run_id); ?offset= for small admin listings.
+    pagination_class = KeysetPagination
     permission_classes = [AllowAny]
     def get_queryset(self):
         """
@@ -98,7 +136,7 @@ class TaskAnalysisReportListCreateAPIView(generics.ListCreateAPIView):
     def create(self, request, *args, **kwargs):
         payload = request.data
         reports = payload.get("data", [])
-        
+
 
         if not isinstance(reports, list):
             return Response(
@@ -106,10 +144,41 @@ class TaskAnalysisReportListCreateAPIView(generics.ListCreateAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        mode = request.query_params.get('mode')
+
+        # `?mode=bulk` ingests the whole batch with set-based statements and
+        # reports a created/duplicate/error status for every item.
+        if mode == 'bulk':
+            return self._bulk_create(reports)
+
+        # `?mode=async` only queues the batch in Redis and answers 202 with a batch id;
+        # the `drain_report_ingest_stream` Celery consumer writes it to TaskReport.
+        if mode == 'async':
+            return self._enqueue(reports)
+
         created_reports = []
-        print(reports)
+        dirty_tasks = set()
+        dedupe_keys = [raw_report_dedupe_key(report_data) if isinstance(report_data, dict) else None
+                       for report_data in reports]
+        already_stored = seen_keys(key for key in dedupe_keys if key)
+        stored_keys = []
+
+        # Insert every Task this batch needs up front, in one statement; known
+        # task UUIDs are answered by the known-task cache without a query.
+        task_uuids = set()
         for report_data in reports:
             try:
+                task_uuids.add(uuid.UUID(str(report_data.get('task_uuid'))))
+            except (AttributeError, ValueError):
+                pass  # reported as a failed item below
+        ensure_tasks(task_uuids)
+
+        for report_data, dedupe_key in zip(reports, dedupe_keys):
+            try:
+                if dedupe_key in already_stored:
+                    logger.warning(f"Duplicate report: run_id={report_data.get('run_id')}")
+                    continue  # skip this report
+
                 run_id = report_data.get('run_id')
                 task_uuid = report_data.get('task_uuid')  # Expecting this as input
                 service = report_data.get('service')
@@ -123,52 +192,43 @@ class TaskAnalysisReportListCreateAPIView(generics.ListCreateAPIView):
                 report_end_datetime = datetime.datetime.fromtimestamp(end_ts / 1000, tz=datetime.timezone.utc) if isinstance(end_ts, (int, float)) else None
 
                 # Ensure task_uuid is a UUID object
-                if isinstance(task_uuid, str):
-                    task_uuid = uuid.UUID(task_uuid)
-
-                task, created = Task.objects.get_or_create(
-                    uuid=task_uuid,
-                    defaults={
-                        "name": f"AutoCreated-{task_uuid.hex[:8]}",   # or just "Unnamed Task"
-                        "task_type": "unknown",                        # or any safe default
-                        "interact": False,
-                    }
-                )
-
-                if created:
-                    logger.info(f"Created new Task with uuid={task_uuid}")
-                else:
-                    logger.debug(f"Found existing Task with uuid={task_uuid}")
-
-                # Optional duplicate check
-                existing = TaskReport.objects.filter(
-                    report_start_datetime=report_start_datetime,
-                    report_end_datetime=report_end_datetime,
-                    run_id=run_id,
-                    task=task,
-                    data_point=data_point
-                ).first()
-
-                if existing:
-                    logger.warning(f"Duplicate report: run_id={run_id}")
+                task_uuid = uuid.UUID(str(task_uuid))
+                identity = (uuid.UUID(str(run_id)), task_uuid, None if data_point is None else str(data_point))
+
+                # Reports that slipped past the dedupe filter are rejected by the
+                # unique constraints on (run_id, task, data_point), NULL data_point
+                # included; any other integrity error leaves the report unstored
+                # and retryable.
+                try:
+                    report = self._insert_report(dict(
+                        task_id=task_uuid,
+                        run_id=run_id,
+                        service=service,
+                        end_point=end_point,
+                        data_point=data_point,
+                        report_start_datetime=report_start_datetime,
+                        report_end_datetime=report_end_datetime,
+                        full_report=full_report,
+                    ))
+                except IntegrityError:
+                    if identity in stored_report_keys([identity]):
+                        logger.warning(f"Duplicate report: run_id={run_id}")
+                        stored_keys.append(dedupe_key)
+                    else:
+                        logger.exception(f"Report could not be stored: run_id={run_id}")
                     continue  # skip this report
 
-                report = TaskReport.objects.create(
-                    task=task,
-                    run_id=run_id,
-                    service=service,
-                    end_point=end_point,
-                    data_point=data_point,
-                    report_start_datetime=report_start_datetime,
-                    report_end_datetime=report_end_datetime,
-                    full_report=full_report,
-                )
                 created_reports.append(str(report.id))
+                dirty_tasks.add(task_uuid)
+                stored_keys.append(dedupe_key)
 
             except Exception as e:
                 logger.exception(f"Failed to process report: {e}")
                 continue  # Skip this item but don't crash the entire batch
 
+        mark_seen(key for key in stored_keys if key)
+        mark_dirty(dirty_tasks)
+
         if created_reports:
             return Response(
                 {"message": f"{len(created_reports)} reports created.", "report_ids": created_reports},
@@ -180,6 +240,65 @@ class TaskAnalysisReportListCreateAPIView(generics.ListCreateAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+    def _insert_report(self, fields: dict):
+        """
+        Creates one TaskReport and its metrics in their own transaction. The
+        known-task cache can still list a Task that was deleted; if the report's
+        Task is missing, it is inserted without the cache and the report retried once.
+        """
+        for retry in (False, True):
+            try:
+                with transaction.atomic():
+                    if retry:
+                        ensure_tasks({fields['task_id']}, use_cache=False)
+                    report = TaskReport.objects.create(**fields)
+                    build_report_metrics(report).save(force_insert=True)
+                return report
+            except IntegrityError:
+                if retry or Task.objects.filter(uuid=fields['task_id']).exists():
+                    raise
+                logger.warning(f"Known-task cache was stale for task {fields['task_id']}; retrying without it.")
+                known_tasks.clear_local()
+
+    def _enqueue(self, reports):
+        if not reports:
+            return Response({"detail": "No reports to queue."}, status=status.HTTP_400_BAD_REQUEST)
+        if not all(isinstance(report_data, dict) for report_data in reports):
+            return Response(
+                {"detail": "Every item under 'data' must be a JSON object."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            batch_id = enqueue_reports(reports)
+        except RedisError as e:
+            # Never drop a batch because the buffer is unavailable; store it synchronously instead.
+            logger.warning(f"Could not queue reports for async ingestion ({e}); ingesting synchronously.")
+            return self._bulk_create(reports)
+
+        return Response(
+            {
+                "message": f"{len(reports)} reports queued for ingestion.",
+                "batch_id": batch_id,
+                "status_url": reverse('task_report_batch_status', kwargs={'batch_id': batch_id}),
+            },
+            status=status.HTTP_202_ACCEPTED
+        )
+
+    def _bulk_create(self, reports):
+        results = bulk_ingest_reports(reports)
+        counts = count_results(results)
+        return Response(
+            {
+                "message": f"{counts[RESULT_CREATED]} reports created.",
+                "created": counts[RESULT_CREATED],
+                "duplicates": counts[RESULT_DUPLICATE],
+                "errors": counts[RESULT_ERROR],
+                "results": results,
+            },
+            status=bulk_response_status(counts)
+        )
+
 
         
 
@@ -213,7 +332,7 @@ class TaskSummaryReportFilter(django_filters.FilterSet):
             'latest_overall_bot_login_status', 'has_next_page_info',
             'updated_at_gte', 'updated_at_lte',
         ]
-class TaskSummaryReportListView(generics.ListAPIView):
+class TaskSummaryReportListView(ConditionalGetMixin, SparseFieldsMixin, ValuesListMixin, generics.ListAPIView):
     """
     API endpoint to retrieve a list of TaskSummaryReport instances.
     
@@ -221,6 +340,9 @@ class TaskSummaryReportListView(generics.ListAPIView):
     - Filtering by `task_uuid`, `task_name`, various `latest_overall_status` fields,
       `has_next_page_info`, and `updated_at` date ranges.
     - Ordering by fields like `total_runs_completed`, `updated_at`, etc.
+    - Choosing the returned (and loaded) fields with `fields` / `exclude`.
+    Pages are read with .values() and rendered without per-row serializers
+    (see fast_serializers).
     """
     # Define the queryset: retrieves all TaskSummaryReport objects.
     # `.select_related('task')` is crucial for performance to avoid N+1 queries 
@@ -253,8 +375,20 @@ class TaskSummaryReportListView(generics.ListAPIView):
     # the most recently updated ones first by default.
     ordering = ['-updated_at']
 
+    # Cursor pages on (ordering, task_id) instead of OFFSET plus COUNT(*);
+    # ?offset= is still accepted for small admin listings.
+    pagination_class = KeysetPagination
 
-class TaskSummaryReportDetailViewNew(generics.RetrieveAPIView):
+    # The aggregated JSON columns are only loaded and returned when asked for with
+    # ?fields= / ?exclude= (?fields=__all__ for everything); see sparse_fields.
+    default_exclude = [
+        'latest_scraped_data_summary', 'latest_data_enrichment_summary',
+        'aggregated_scraped_data', 'aggregated_data_enrichment',
+        'all_non_fatal_errors', 'all_exceptions', 'all_specific_exception_reasons', 'all_failed_downloads_summary',
+    ]
+
+
+class TaskSummaryReportDetailViewNew(ConditionalGetMixin, generics.RetrieveAPIView):
 
 
 
@@ -279,6 +413,253 @@ class TaskSummaryReportDetailViewNew(generics.RetrieveAPIView):
     # For example, if your URL is `task-summaries/<uuid:task_uuid>/`, then `task_uuid` is the kwarg.
     lookup_url_kwarg = 'task_uuid'
 
+    def retrieve(self, request, *args, **kwargs):
+        # Dashboards poll this endpoint; the serialized summary is served from the
+        # summary cache until the summary changes (see summary_cache). ?fields= /
+        # ?exclude= select from the cached payload rather than from the database.
+        selected = select_fields(request, list(self.get_serializer().fields))
+        payload = get_summary_payload(self.kwargs['task_uuid'], self._build_payload)
+        if selected is not None:
+            payload = {name: payload[name] for name in selected}
+        return Response(payload)
+
+    def _build_payload(self):
+        instance = self.get_object()
+        return instance.updated_at, self.get_serializer(instance).data
+
+class JobAnalysisReportFilter(django_filters.FilterSet):
+    has_any_billing_issue = django_filters.BooleanFilter()
+    updated_at_gte = django_filters.DateTimeFilter(field_name='updated_at', lookup_expr='gte')
+    updated_at_lte = django_filters.DateTimeFilter(field_name='updated_at', lookup_expr='lte')
+
+    class Meta:
+        model = JobAnalysisReport
+        fields = ['has_any_billing_issue', 'updated_at_gte', 'updated_at_lte']
+
+
+class JobAnalysisReportListView(ConditionalGetMixin, generics.ListAPIView):
+    """
+    Job-level totals (JobAnalysisReport), kept up to date incrementally as task
+    summaries change. Filter with `has_any_billing_issue` and `updated_at_gte` /
+    `updated_at_lte`; order with `ordering`.
+    """
+    queryset = JobAnalysisReport.objects.all()
+    serializer_class = JobAnalysisReportSerializer
+    permission_classes = [AllowAny]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_class = JobAnalysisReportFilter
+    ordering_fields = [
+        'total_tasks_in_job', 'tasks_completed_successfully', 'total_users_scraped',
+        'total_requests_failed', 'total_job_cost', 'created_at', 'updated_at',
+    ]
+    ordering = ['-updated_at']
+
+
+class JobAnalysisReportDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
+    """Totals of a single job: GET jobs/<job_uuid>/."""
+    queryset = JobAnalysisReport.objects.all()
+    serializer_class = JobAnalysisReportSerializer
+    permission_classes = [AllowAny]
+    lookup_field = 'job_uuid'
+
+
+class TaskReportFilter(django_filters.FilterSet):
+    task_uuid = django_filters.UUIDFilter(field_name='task_id')
+    job_uuid = django_filters.UUIDFilter(field_name='task__job_uuid')
+    run_id = django_filters.UUIDFilter()
+    service = django_filters.CharFilter()
+    end_point = django_filters.CharFilter()
+    data_point = django_filters.CharFilter()
+    created_at_gte = django_filters.DateTimeFilter(field_name='created_at', lookup_expr='gte')
+    created_at_lte = django_filters.DateTimeFilter(field_name='created_at', lookup_expr='lte')
+
+    class Meta:
+        model = TaskReport
+        fields = [
+            'task_uuid', 'job_uuid', 'run_id', 'service', 'end_point', 'data_point',
+            'created_at_gte', 'created_at_lte',
+        ]
+
+
+class TaskReportListView(ConditionalGetMixin, SparseFieldsMixin, generics.ListAPIView):
+    """
+    Raw TaskReports, newest first, cursor-paginated on (created_at, id): GET reports/
+    filtered by task_uuid, job_uuid, run_id, service, end_point, data_point and
+    created_at_gte / created_at_lte.
+    """
+    queryset = TaskReport.objects.all()
+    serializer_class = TaskReportSerializer
+    permission_classes = [AllowAny]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_class = TaskReportFilter
+    ordering_fields = ['created_at', 'report_start_datetime', 'report_end_datetime']
+    ordering = ['-created_at']
+    last_modified_field = 'created_at'
+    pagination_class = KeysetPagination
+    # full_report only with ?fields= / ?exclude= (?fields=__all__ for everything)
+    default_exclude = ['full_report']
+
+
+class TaskSummaryHistoryView(generics.ListAPIView):
+    """
+    Full, paginated history behind one of a summary's capped lists, read from
+    TaskReport: GET task-summaries/<task_uuid>/history/<field>/, where <field> is
+    e.g. `critical_events_summary` or `failed_downloads_details`. Each item holds
+    the raw entries one report contributed, newest report first.
+    """
+    serializer_class = TaskReportHistoryEntrySerializer
+    permission_classes = [AllowAny]
+
+    def get_queryset(self):
+        report_key = HISTORY_REPORT_KEYS.get(self.kwargs['field'])
+        if report_key is None:
+            raise NotFound(f"Unknown summary field '{self.kwargs['field']}'. Expected one of: {', '.join(HISTORY_REPORT_KEYS)}.")
+
+        return (
+            TaskReport.objects.filter(task_id=self.kwargs['task_uuid'], full_report__has_key=report_key)
+            .exclude(**{f'full_report__{report_key}': []})
+            .order_by('-created_at', '-id')
+            .values('id', 'run_id', 'service', 'data_point', 'created_at', entries=KeyTransform(report_key, 'full_report'))
+        )
+
+
+class SummarySketchRollupView(APIView):
+    """
+    Base for endpoints that merge a sketch field stored on the task summaries
+    matching ?job_uuid=<uuid>&task_type=<type> (at least one is required), so
+    job- and service-level figures are computed without reading any report.
+    Sketches are merged in the request, so at most `max_tasks` summaries are.
+    """
+    permission_classes = [AllowAny]
+    sketch_field = None
+    result_key = None
+    max_tasks = getattr(settings, 'SKETCH_ROLLUP_MAX_TASKS', 5000)
+
+    def rollup(self, sketch_dicts) -> dict:
+        raise NotImplementedError
+
+    def get(self, request):
+        summaries = TaskSummaryReportNew.objects.all()
+        job_uuid = request.query_params.get('job_uuid')
+        task_type = request.query_params.get('task_type')
+        if not job_uuid and not task_type:
+            return Response({"detail": "job_uuid or task_type is required."}, status=status.HTTP_400_BAD_REQUEST)
+        if job_uuid:
+            try:
+                summaries = summaries.filter(task__job_uuid=uuid.UUID(job_uuid))
+            except ValueError:
+                return Response({"detail": f"Invalid job_uuid: {job_uuid}"}, status=status.HTTP_400_BAD_REQUEST)
+        if task_type:
+            summaries = summaries.filter(task__task_type=task_type)
+
+        tasks = summaries.count()
+        if tasks > self.max_tasks:
+            return Response(
+                {"detail": f"{tasks} task summaries match; narrow the filters to at most {self.max_tasks}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        sketches = summaries.order_by().values_list(self.sketch_field, flat=True)
+        return Response({
+            "job_uuid": job_uuid,
+            "task_type": task_type,
+            "tasks": tasks,
+            self.result_key: self.rollup(sketches.iterator()),
+        })
+
+
+class LatencyPercentilesView(SummarySketchRollupView):
+    """
+    p50/p90/p99 of login, 2FA and per-URL page load times across many tasks:
+    GET latency-percentiles/?job_uuid=<uuid>&task_type=<type>.
+    """
+    sketch_field = 'latency_sketches'
+    result_key = 'latency_percentiles'
+
+    def rollup(self, sketch_dicts) -> dict:
+        return merge_latency_sketches(sketch_dicts).percentiles()
+
+
+class DistinctCountsView(SummarySketchRollupView):
+    """
+    Approximate distinct runs, page URLs and critical event types across many
+    tasks (HyperLogLog, ~1.6% error): GET distinct-counts/?job_uuid=<uuid>&task_type=<type>.
+    """
+    sketch_field = 'distinct_sketches'
+    result_key = 'distinct_counts'
+
+    def rollup(self, sketch_dicts) -> dict:
+        return merge_distinct_sketches(sketch_dicts).counts()
+
+
+class MetricTimeSeriesView(APIView):
+    """
+    Report metrics per time bucket from the hourly/daily rollups:
+    GET timeseries/?metrics=successful_logins,failed_logins&start=<iso>&end=<iso>&max_points=<n>
+    optionally filtered by task_uuid, job_uuid, task_type, service and end_point and
+    split into one series per ?group_by=task,service,end_point. The finest
+    granularity with at most max_points buckets in [start, end) is used; the range
+    defaults to the last 24 hours.
+    """
+    permission_classes = [AllowAny]
+    group_by_fields = {'task': 'task_id', 'service': 'service', 'end_point': 'end_point'}
+
+    def _datetime(self, name, default):
+        value = self.request.query_params.get(name)
+        if not value:
+            return default
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValidationError({name: f"Invalid datetime: {value}"})
+        return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed, datetime.timezone.utc)
+
+    def _list(self, name, allowed, default=()):
+        values = [value for value in self.request.query_params.get(name, '').split(',') if value]
+        unknown = [value for value in values if value not in allowed]
+        if unknown:
+            raise ValidationError({name: f"Unknown values {', '.join(unknown)}. Expected some of: {', '.join(allowed)}."})
+        return values or list(default)
+
+    def get(self, request):
+        params = request.query_params
+        end = self._datetime('end', timezone.now())
+        start = self._datetime('start', end - datetime.timedelta(days=1))
+        if start >= end:
+            raise ValidationError({"start": "start must be before end."})
+        metrics = self._list('metrics', METRIC_FIELDS, default=['report_count'])
+        group_by = [self.group_by_fields[field] for field in self._list('group_by', self.group_by_fields)]
+        try:
+            max_points = int(params['max_points']) if params.get('max_points') else None
+        except ValueError:
+            raise ValidationError({"max_points": f"Invalid integer: {params['max_points']}"})
+        if max_points is not None and max_points < 1:
+            raise ValidationError({"max_points": "max_points must be at least 1."})
+
+        filters = {}
+        for param, lookup in (('task_uuid', 'task_id'), ('job_uuid', 'task__job_uuid')):
+            if params.get(param):
+                try:
+                    filters[lookup] = uuid.UUID(params[param])
+                except ValueError:
+                    raise ValidationError({param: f"Invalid UUID: {params[param]}"})
+        for param, lookup in (('task_type', 'task__task_type'), ('service', 'service'), ('end_point', 'end_point')):
+            if param in params:
+                filters[lookup] = params[param]
+
+        return Response(timeseries(start, end, metrics, max_points=max_points, filters=filters, group_by=group_by))
+
+
+class TaskReportBatchStatusView(APIView):
+    """
+    Progress of a batch queued with POST /reporting/task-reports/?mode=async.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, batch_id):
+        batch = get_batch_status(str(batch_id))
+        if batch is None:
+            return Response({"detail": "Unknown or expired batch id."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(batch)
+
 import json
 from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse, HttpResponseBadRequest
@@ -311,42 +692,93 @@ def update_task_summaries(request):
             "status": "200"
         })
 
-    try:
-        summary = TaskSummaryReportNew.objects.get(task=task_uuid)
-    except TaskSummaryReportNew.DoesNotExist:
-        return JsonResponse({"error": f"No TaskSummaryReportNew found for uuid {task_uuid}"}, status=404)
-
-    updated = False
-    for issue_item in issues:
-        # Normalize issue name
-        if isinstance(issue_item, dict):
-            issue_name = issue_item.get("issue_name", "").lower()
-        else:
-            issue_name = str(issue_item or "").lower()
-
-        if issue_name == "incorrect password":
-            original_len = len(summary.critical_events_summary or [])
-            summary.critical_events_summary = [
-                event for event in (summary.critical_events_summary or [])
-                if str(event).lower() != "incorrect_password"
-            ]
-            if len(summary.critical_events_summary) != original_len:
-                updated = True
-
-        elif issue_name == "storage house down":
-            if getattr(summary, "storage_upload_failed", True):
-                summary.storage_upload_failed = False
-                updated = True
-
-        elif issue_name == "login attempts failed":
-            if getattr(summary, "total_attempt_failed", 0) != 0:
-                summary.total_attempt_failed = 0
-                updated = True
-
-    if updated:
-        summary.save()
+    with transaction.atomic():
+        # Locked like the summary fold, so neither overwrites the other's changes.
+        try:
+            summary = TaskSummaryReportNew.objects.select_for_update().get(task=task_uuid)
+        except TaskSummaryReportNew.DoesNotExist:
+            return JsonResponse({"error": f"No TaskSummaryReportNew found for uuid {task_uuid}"}, status=404)
+
+        changed_fields = set()
+        for issue_item in issues:
+            # Normalize issue name
+            if isinstance(issue_item, dict):
+                issue_name = issue_item.get("issue_name", "").lower()
+            else:
+                issue_name = str(issue_item or "").lower()
+
+            if issue_name == "incorrect password":
+                original_len = len(summary.critical_events_summary or [])
+                summary.critical_events_summary = [
+                    event for event in (summary.critical_events_summary or [])
+                    if str(event).lower() != "incorrect_password"
+                ]
+                if len(summary.critical_events_summary) != original_len:
+                    changed_fields.add('critical_events_summary')
+                for event_type in list(summary.critical_events_counts or {}):
+                    if event_type.lower() == "incorrect_password":
+                        del summary.critical_events_counts[event_type]
+                        changed_fields.add('critical_events_counts')
+
+            elif issue_name == "storage house down":
+                if getattr(summary, "storage_upload_failed", True):
+                    summary.storage_upload_failed = False
+                    changed_fields.add('storage_upload_failed')
+
+            elif issue_name == "login attempts failed":
+                if getattr(summary, "total_attempt_failed", 0) != 0:
+                    summary.total_attempt_failed = 0
+                    changed_fields.add('total_attempt_failed')
+
+        if changed_fields:
+            # The job totals follow the summary (total_requests_failed counts failed attempts).
+            apply_job_deltas([summary])
+            summary.save(update_fields=sorted(changed_fields) + ['task_cost', 'job_contribution', 'updated_at'])
 
     return JsonResponse({
         "message": "TaskSummary updated based on issues.",
         "status": "200"
-    })
\ No newline at end of file
+    })
+
+import gzip
+from .ingestion import ingest_report_stream
+
+
+@csrf_exempt
+def ingest_task_reports_ndjson(request):
+    """
+    Streaming ingestion endpoint: one report per line (`application/x-ndjson`),
+    optionally sent with `Content-Encoding: gzip`. The body is read straight from
+    the request stream and written in fixed-size chunks, so worker memory does not
+    grow with the size of the batch.
+    """
+    if request.method != "POST":
+        return HttpResponseBadRequest("Only POST method allowed")
+
+    if request.content_type != "application/x-ndjson":
+        return JsonResponse({"error": "Expected Content-Type application/x-ndjson"}, status=415)
+
+    content_encoding = request.headers.get("Content-Encoding", "").lower()
+    if content_encoding not in ("", "identity", "gzip"):
+        return JsonResponse({"error": f"Unsupported Content-Encoding '{content_encoding}'"}, status=415)
+
+    stream = gzip.GzipFile(fileobj=request, mode="rb") if content_encoding == "gzip" else request
+
+    try:
+        outcome = ingest_report_stream(stream)
+    except (OSError, EOFError) as e:
+        # Corrupt or truncated gzip body; chunks before the failure are already stored.
+        logger.warning(f"Aborted NDJSON ingestion: {e}")
+        return JsonResponse({"error": f"Could not decode request body: {e}"}, status=400)
+
+    counts = outcome["counts"]
+    return JsonResponse(
+        {
+            "message": f"{counts[RESULT_CREATED]} reports created.",
+            "created": counts[RESULT_CREATED],
+            "duplicates": counts[RESULT_DUPLICATE],
+            "errors": counts[RESULT_ERROR],
+            "error_details": outcome["error_details"],
+        },
+        status=bulk_response_status(counts),
+    )
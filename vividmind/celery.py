@@ -17,6 +17,21 @@ celery_app.conf.beat_schedule = {
         'task': 'sessionbot.tasks.communicate_tasks_with_worker',
         'schedule': crontab(minute='*/5'),
     },
+    'drain_report_ingest_stream': {
+        'task': 'reporting.tasks.drain_report_ingest_stream',
+        'schedule': 5.0,
+        'options': {'expires': 30},
+    },
+    'process_all_task_summaries': {
+        'task': 'reporting.tasks.process_all_task_summaries',
+        'schedule': 30.0,
+        'options': {'expires': 60},
+    },
+    'roll_up_metric_buckets': {
+        'task': 'reporting.tasks.roll_up_metric_buckets',
+        'schedule': 60.0,
+        'options': {'expires': 120},
+    },
  }
 
 """
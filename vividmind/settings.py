@@ -184,6 +184,10 @@ CELERY_ACCEPT_CONTENT = ['application/json']
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TASK_SERIALIZER = 'json'
 DJANGO_CELERY_RESULTS_TASK_ID_MAX_LENGTH = 191
+CELERY_TASK_ROUTES = {
+    # Async report ingestion runs on its own worker so it never queues behind summaries.
+    'reporting.tasks.drain_report_ingest_stream': {'queue': 'report_ingest'},
+}
 
 
 REST_FRAMEWORK = {
@@ -195,6 +199,9 @@ REST_FRAMEWORK = {
      'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 100
 }
+# Keyset pagination of the report / summary lists (reporting/pagination.py)
+KEYSET_MAX_PAGE_SIZE = 1000  # upper bound for ?limit=
+OFFSET_PAGINATION_MAX_OFFSET = 10000  # deepest ?offset= still served, for small admin listings
 USE_LOCAL_ASSETS=True
 if USE_LOCAL_ASSETS:
     STATIC_ROOT = os.path.join(BASE_DIR, 'static')
@@ -215,6 +222,49 @@ DATA_HOUSE_URL='http://208.109.241.136:8080/'
 STORAGE_HOUSE_URL='https://b8fd-2603-3-610c-1060-00.ngrok-free.app/'
 DATA_UPLOAD_MAX_MEMORY_SIZE=None
 
+# Report ingestion
+REPORT_BULK_INSERT_BATCH_SIZE = 1000  # rows per INSERT statement
+REPORT_INGEST_CHUNK_SIZE = 500  # reports buffered per write by the NDJSON stream endpoint
+REPORT_NDJSON_MAX_LINE_BYTES = 10 * 1024 * 1024  # largest single report accepted on the stream
+REPORT_INGEST_DRAIN_BATCH_SIZE = 2000  # queued reports bulk inserted per round by the async consumer
+REPORT_INGEST_BATCH_TTL_SECONDS = 24 * 60 * 60  # how long async batch progress stays queryable
+REPORT_DEDUPE_TTL_SECONDS = 3 * 24 * 60 * 60  # how long a stored report identity stays in the Redis dedupe filter
+REPORT_DEDUPE_WARM_HOURS = 24  # hours of recent reports loaded into the filter at startup
+REPORT_KNOWN_TASK_CACHE_SIZE = 10000  # task UUIDs remembered per process by ingestion
+REPORT_KNOWN_TASK_GENERATION_CHECK_SECONDS = 5  # how quickly other processes notice deleted Tasks
+REPORT_READ_CHUNK_SIZE = 500  # rows fetched per round trip when streaming reports and summaries
+PARALLEL_COMPILE_SLICES_PER_WORKER = 4  # report slices per worker in compile_reports --workers (evens out uneven slices)
+
+# Task summaries
+REPORT_SEQUENCE_BATCH_SIZE = 5000  # reports numbered per transaction before summary folds read them
+SUMMARY_FOLD_CHUNK_SIZE = 500  # reports read per round trip while folding into a summary
+SUMMARY_DIRTY_DEBOUNCE_SECONDS = 30  # a dirty task waits this long so bursts of reports fold in one run
+SUMMARY_DIRTY_MAX_DISPATCH = 5000  # dirty tasks dispatched per sweep at most
+SUMMARY_DIRTY_LEASE_SECONDS = 300  # popped dirty tasks whose dispatch is not confirmed by then become due again
+SUMMARY_BATCH_SIZE = 200  # tasks folded by one summary batch job
+SUMMARY_SAMPLE_SIZE = 50  # most recent events/errors kept per summary list (full history: summary history endpoint)
+SUMMARY_ERROR_LOG_SAMPLE_SIZE = 20  # most recent runs kept in failed_attempt_error_logs
+SUMMARY_MAX_COUNT_KEYS = 200  # distinct event/error types counted per list before folding into '__other__'
+LATENCY_SKETCH_RELATIVE_ACCURACY = 0.01  # login/2FA/page load percentiles are within 1% of an observed value
+LATENCY_SKETCH_MAX_BUCKETS = 2048  # buckets per sketch before the fastest ones are folded together
+LATENCY_SKETCH_MAX_URLS = 200  # page load URLs sketched per summary before folding into '__other__'
+DISTINCT_SKETCH_PRECISION = 12  # HyperLogLog registers = 2**precision; 12 gives ~1.6% error in distinct counts
+SKETCH_ROLLUP_MAX_TASKS = 5000  # summaries merged per latency-percentiles / distinct-counts request at most
+
+# Job rollups
+JOB_ROLLUP_SUCCESS_STATUSES = ('completed', 'success')  # latest task statuses counted as tasks_completed_successfully
+COST_RATE_GENERATION_CHECK_SECONDS = 5  # how quickly other processes notice CostUnitConfig changes
+
+# Summary detail response cache (reporting/summary_cache.py)
+SUMMARY_CACHE_SECONDS = 300  # lifetime of cached summary payloads and version pointers
+SUMMARY_CACHE_LOCK_SECONDS = 10  # rebuild lock lifetime, in case its holder dies
+SUMMARY_CACHE_LOCK_WAIT_SECONDS = 2  # how long requests wait for another request's rebuild
+
+# Hourly / daily metric rollups
+METRIC_ROLLUP_BATCH_SIZE = 5000  # reports rolled up per transaction
+METRIC_ROLLUP_DEFAULT_MAX_POINTS = 200  # buckets per series when ?max_points is not given
+METRIC_ROLLUP_MAX_POINTS_LIMIT = 2000  # upper bound for ?max_points
+
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'  # Replace with your SMTP server
 EMAIL_PORT = 587